@@ -1,81 +1,74 @@
 import os
 import json
+import queue
+import multiprocessing
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
-from parsers import get_parser_for
-
-class HexEditor(tk.Text):
-    def __init__(self, parent, data: bytes, on_change=None, *args, **kwargs):
-        super().__init__(parent, *args, **kwargs)
-        self.data = bytearray(data)
-        self.on_change = on_change
-        self.configure(font=("Courier New", 10), undo=True, wrap="none", padx=4, pady=4)
-        self.insert("1.0", self.format_hex(self.data))
-        self.bind("<KeyRelease>", self.on_edit)
-        self.bind("<Button-1>", self.prevent_offset_edit)
-
-    def format_hex(self, data: bytes, width=16) -> str:
-        lines = []
-        for offset in range(0, len(data), width):
-            chunk = data[offset:offset + width]
-            hex_part = " ".join(f"{b:02X}" for b in chunk).ljust(width * 3)
-            ascii_part = "".join(chr(b) if 32 <= b <= 126 else "." for b in chunk)
-            lines.append(f"{offset:08X}:  {hex_part}  {ascii_part}")
-        return "\n".join(lines)
-
-    def prevent_offset_edit(self, event=None):
-        try:
-            index = self.index(tk.CURRENT)
-            line, col = map(int, index.split('.'))
-            if col < 9:
-                self.mark_set(tk.INSERT, f"{line}.9")
-                return "break"
-        except Exception:
-            pass
+from parsers import parse_file
+from parsers.batch import iter_ncs_files
+from parsers.source import FileSource
+from parsers.cache import MemoryLRU
+from parsers.export import safe_convert, write_json, write_ndjson
+from parsers.config import get_section
+from parsers.index import CorpusIndex
+from parsers.diff import diff_files, diff_folders
+from parsers.patch import EXT as PATCH_EXT, apply_to, check_source, make_patch, read_patch, write_in_place, write_patch
+from widgets import VirtualTable, HexEditor, JsonTree
 
-    def on_edit(self, event=None):
-        try:
-            content = self.get("1.0", tk.END).rstrip('\n').splitlines()
-            new_data = bytearray()
-            for line in content:
-                parts = line.split(":", 1)
-                if len(parts) < 2:
-                    continue
-                rest = parts[1].strip()
-                if "  " not in rest:
-                    continue
-                hex_str, _ = rest.split("  ", 1)
-                hex_bytes = []
-                for h in hex_str.split():
-                    try:
-                        hex_bytes.append(int(h, 16))
-                    except ValueError:
-                        hex_bytes.append(0x2E)
-                new_data.extend(hex_bytes)
-            self.data = new_data
-            self.delete("1.0", tk.END)
-            self.insert("1.0", self.format_hex(self.data))
-            if self.on_change:
-                try:
-                    self.on_change(bytes(self.data))
-                except Exception:
-                    pass
-        except Exception as e:
-            print("HexEditor parse error:", e)
+# parsed files and their rendered views kept for quick switching
+VIEW_CACHE_BYTES = 256 << 20
+# panes are filled a slice per event-loop turn so the window keeps responding
+FILL_CHARS = 1 << 18
+POLL_MS = 30
+# quiet period after the last hex edit before re-parsing
+REPARSE_MS = 250
+# the plain-text JSON view is offered for files up to this size
+RAW_JSON_LIMIT = 1 << 20
+# folder scans hand paths to the file list in batches of this many
+SCAN_BATCH = 500
+# quiet period after typing in the file filter
+FILTER_MS = 150
+# process pools started from worker threads must not fork the Tk process
+SPAWN = multiprocessing.get_context('spawn')
+
+class ParseCancelled(Exception):
+    pass
+
+def table_row(rec):
+    offset = rec.get('offset', ''); length = rec.get('length', '')
+    ascii_txt = (rec.get('ascii_text') or '')[:80].replace('\n',' ')
+    hex_preview = (rec.get('raw_hex') or '')[:192]
+    ints = ','.join(str(x) for x in (rec.get('int32_values') or [])[:6])
+    floats = ','.join(str(x) for x in (rec.get('float32_values') or [])[:6])
+    guessed = rec.get('guessed', '') or ''
+    return (offset, length, ascii_txt, hex_preview, ints, floats, guessed)
 
-    def get_bytes(self) -> bytes:
-        return bytes(self.data)
+def hit_row(hit):
+    return (hit.path, f'0x{hit.offset:X}', hit.kind, hit.text[:200])
 
-def safe_convert(obj):
-    if isinstance(obj, (bytes, bytearray)):
-        b = bytes(obj)
-        return {'_type': 'bytes', 'length': len(b), 'hex': b.hex(), 'ascii': ''.join(chr(x) if 32 <= x < 127 else '.' for x in b[:256])}
-    if isinstance(obj, dict):
-        return {k: safe_convert(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [safe_convert(x) for x in obj]
-    return obj
+def hit_length(hit):
+    return {'guid': 16, 'guid text': 32}.get(hit.kind) or len(hit.text.encode('utf-8', errors='replace'))
+
+def _refs(refs):
+    return ','.join(str(r['index']) for r in refs or [])
+
+def change_row(c):
+    return (c['op'], f"0x{c['a_offset']:X}", c['a_length'], f"0x{c['b_offset']:X}", c['b_length'],
+            _refs(c.get('a_records')), _refs(c.get('b_records')))
+
+def diff_file_row(item):
+    status, rel, d = item
+    return (status, rel, len(d['changes']) if d else '')
+
+def json_text(structured):
+    return json.dumps(safe_convert(structured), indent=4, ensure_ascii=False)
+
+def estimate_view_bytes(entry, raw_bytes=0):
+    # rough: per-record object overhead plus the bytes held in memory
+    recs = len(entry['parsed'].get('structured', {}).get('records', []))
+    return 400 * recs + raw_bytes
 
 class NCSReaderApp(tk.Tk):
     def __init__(self):
@@ -83,8 +76,41 @@ class NCSReaderApp(tk.Tk):
         self.title('NCS Reader - Fixed')
         self.geometry('1280x820')
         self.configure(bg='#1e1e1e')
-        self.files = {}
+        # every listed file by full path, with its label (path relative to
+        # the opened folder's parent); _shown maps listbox rows to indexes
+        self.file_paths = []
+        self.file_labels = []
+        self._labels_lower = []
+        self._known = set()
+        self._shown = []
+        self._filter = ''
+        self._filter_job = None
+        self._scans = 0
+        self._scan_results = queue.Queue()
         self.current = None
+        self.view_cache = MemoryLRU(VIEW_CACHE_BYTES, on_evict=self._evicted)
+        # source the hex editor reads from; detached once it is no longer cached
+        self._view_source = None
+        self._view_detached = False
+        # bumped on every selection; workers and fills from older generations stop
+        self._gen = 0
+        self._results = queue.Queue()
+        # one parse thread; only the newest request waits, older ones are dropped
+        self._parse_lock = threading.Lock()
+        self._parse_next = None
+        self._parsing = False
+        self._polling = False
+        self._dirty = None
+        self._reparse_job = None
+        self._json_stale = False
+        # (path, offset, length) to show in the hex view once that file is loaded
+        self._goto = None
+        self.index = None
+        self.index_window = None
+        self._index_msgs = queue.Queue()
+        # index updates queued or running; they take turns on the database
+        self._indexing = 0
+        self._index_lock = threading.Lock()
 
         self.create_toolbar()
         self.create_main_panes()
@@ -96,12 +122,24 @@ class NCSReaderApp(tk.Tk):
         tk.Button(bar, text='Open Folder', command=self.open_folder).pack(side=tk.LEFT, padx=6, pady=6)
         tk.Button(bar, text='Save JSON', command=self.save_json).pack(side=tk.LEFT, padx=6, pady=6)
         tk.Button(bar, text='Save Edited NCS', command=self.save_ncs).pack(side=tk.LEFT, padx=6, pady=6)
+        tk.Button(bar, text='Apply Patch', command=self.apply_patch).pack(side=tk.LEFT, padx=6, pady=6)
+        tk.Button(bar, text='Search Index', command=self.open_index_window).pack(side=tk.LEFT, padx=6, pady=6)
+        tk.Button(bar, text='Compare', command=self.compare).pack(side=tk.LEFT, padx=6, pady=6)
+        self.status = tk.Label(bar, text='', bg='#2b2b2b', fg='#cccccc')
+        self.status.pack(side=tk.RIGHT, padx=6)
+        self.progress = ttk.Progressbar(bar, mode='indeterminate', length=160)
+        self.progress.pack(side=tk.RIGHT, padx=6, pady=6)
 
     def create_main_panes(self):
         paned = tk.PanedWindow(self, orient=tk.HORIZONTAL, sashrelief=tk.RAISED, bg='#1e1e1e')
         paned.pack(fill=tk.BOTH, expand=True, padx=6, pady=6)
 
         left = tk.Frame(paned, bg='#252526')
+        self.file_filter = tk.Entry(left, bg='#1e1e1e', fg='white', insertbackground='white')
+        self.file_filter.pack(side=tk.TOP, fill=tk.X, padx=2, pady=2)
+        self.file_filter.bind('<KeyRelease>', self.on_filter_key)
+        self.file_count = tk.Label(left, text='', anchor='w', bg='#252526', fg='#cccccc')
+        self.file_count.pack(side=tk.BOTTOM, fill=tk.X)
         self.file_list = tk.Listbox(left, bg='#252526', fg='white', selectbackground='#007acc', width=40)
         self.file_list.pack(fill=tk.BOTH, expand=True)
         self.file_list.bind('<<ListboxSelect>>', self.on_select)
@@ -110,6 +148,7 @@ class NCSReaderApp(tk.Tk):
         notebook_frame = ttk.Frame(paned)
         self.notebook = ttk.Notebook(notebook_frame)
         self.notebook.pack(fill=tk.BOTH, expand=True)
+        self.notebook.bind('<<NotebookTabChanged>>', self.refresh_json)
         paned.add(notebook_frame)
         try:
             paned.paneconfigure(notebook_frame, stretch="always")
@@ -117,124 +156,463 @@ class NCSReaderApp(tk.Tk):
             pass
 
         json_tab = tk.Frame(self.notebook, bg='#1e1e1e')
-        self.json_text = tk.Text(json_tab, wrap='none', bg='#1e1e1e', fg='white', insertbackground='white', font=('Courier New',10))
+        json_bar = tk.Frame(json_tab, bg='#2b2b2b')
+        json_bar.pack(side=tk.TOP, fill=tk.X)
+        self.json_raw = tk.BooleanVar(value=False)
+        self.json_raw_toggle = tk.Checkbutton(json_bar, text='Raw text', variable=self.json_raw, command=self.set_json_mode,
+                                              bg='#2b2b2b', fg='#cccccc', selectcolor='#1e1e1e', activebackground='#2b2b2b')
+        self.json_raw_toggle.pack(side=tk.LEFT, padx=4)
+        self.json_tree = JsonTree(json_tab, bg='#1e1e1e')
+        self.json_tree.pack(fill=tk.BOTH, expand=True)
+        self.json_text_frame = tk.Frame(json_tab, bg='#1e1e1e')
+        self.json_text = tk.Text(self.json_text_frame, wrap='none', bg='#1e1e1e', fg='white', insertbackground='white', font=('Courier New',10))
         self.json_text.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
-        json_scroll = ttk.Scrollbar(json_tab, command=self.json_text.yview)
+        json_scroll = ttk.Scrollbar(self.json_text_frame, command=self.json_text.yview)
         json_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         self.json_text.config(yscrollcommand=json_scroll.set)
         self.notebook.add(json_tab, text='JSON View')
 
         table_tab = tk.Frame(self.notebook, bg='#1e1e1e')
         cols = ('Offset','Length','ASCII','HexPreview','Ints','Floats','Guessed')
-        self.table = ttk.Treeview(table_tab, columns=cols, show='headings')
-        for c in cols:
-            self.table.heading(c, text=c)
-            self.table.column(c, width=140 if c!='HexPreview' else 260, anchor='w')
-        self.table.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
-        table_scroll = ttk.Scrollbar(table_tab, command=self.table.yview)
-        table_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.table.config(yscrollcommand=table_scroll.set)
+        self.table = VirtualTable(table_tab, cols, table_row, widths={'HexPreview': 260}, bg='#1e1e1e')
+        self.table.pack(fill=tk.BOTH, expand=True)
         self.notebook.add(table_tab, text='Detailed Table')
 
         hex_tab = tk.Frame(self.notebook, bg='#1e1e1e')
         self.hex_editor = HexEditor(hex_tab, b'', on_change=self.on_hex_change, bg='#1e1e1e', fg='white', insertbackground='white')
-        self.hex_editor.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
-        hex_scroll = ttk.Scrollbar(hex_tab, command=self.hex_editor.yview)
-        hex_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.hex_editor.config(yscrollcommand=hex_scroll.set)
+        self.hex_editor.pack(fill=tk.BOTH, expand=True)
         self.notebook.add(hex_tab, text='Hex Editor')
 
     def open_file(self):
         p = filedialog.askopenfilename(filetypes=[('NCS files','*.ncs'),('All files','*.*')])
         if p:
-            name = os.path.basename(p)
-            self.files[name] = p
-            if name not in self.file_list.get(0, tk.END):
-                self.file_list.insert(tk.END, name)
+            self.add_paths([p])
+
+    def add_paths(self, paths, base=None):
+        # new paths are appended, and listed right away if they pass the filter
+        rows = []
+        for p in paths:
+            p = os.path.abspath(p)
+            if p in self._known:
+                continue
+            self._known.add(p)
+            label = os.path.relpath(p, base) if base else os.path.basename(p)
+            self.file_paths.append(p)
+            self.file_labels.append(label)
+            self._labels_lower.append(label.lower())
+            if self._filter in self._labels_lower[-1]:
+                rows.append(len(self.file_paths) - 1)
+        if rows:
+            self._shown.extend(rows)
+            self.file_list.insert(tk.END, *(self.file_labels[i] for i in rows))
+        self.update_file_count()
+
+    def update_file_count(self):
+        n, shown = len(self.file_paths), len(self._shown)
+        text = f'{n} files' if shown == n else f'{shown} of {n} files'
+        self.file_count.config(text=text + (' (scanning...)' if self._scans else ''))
 
     def open_folder(self):
         d = filedialog.askdirectory()
-        if d:
-            found = [os.path.join(d,f) for f in os.listdir(d) if f.lower().endswith('.ncs')]
-            for f in found:
-                name = os.path.basename(f)
-                self.files[name] = f
-                if name not in self.file_list.get(0, tk.END):
-                    self.file_list.insert(tk.END, name)
+        if not d:
+            return
+        base = os.path.dirname(os.path.abspath(d))
+        threading.Thread(target=self._scan_worker, args=(d, base), daemon=True).start()
+        self._scans += 1
+        self.update_file_count()
+        if self._scans == 1:
+            self.after(POLL_MS, self._poll_scan)
+
+    def _scan_worker(self, root, base):
+        batch = []
+        try:
+            for p in iter_ncs_files(root):
+                batch.append(p)
+                if len(batch) >= SCAN_BATCH:
+                    self._scan_results.put((base, batch))
+                    batch = []
+        finally:
+            self._scan_results.put((base, batch))
+            self._scan_results.put(None)
+
+    def _poll_scan(self):
+        while True:
+            try:
+                item = self._scan_results.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._scans -= 1
+                continue
+            base, batch = item
+            self.add_paths(batch, base)
+        self.update_file_count()
+        if self._scans:
+            self.after(POLL_MS, self._poll_scan)
+
+    def on_filter_key(self, event=None):
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_MS, self.apply_filter)
+
+    def apply_filter(self):
+        self._filter_job = None
+        q = self.file_filter.get().strip().lower()
+        if q == self._filter:
+            return
+        self._filter = q
+        self._shown = [i for i, label in enumerate(self._labels_lower) if q in label]
+        self.file_list.delete(0, tk.END)
+        if self._shown:
+            self.file_list.insert(tk.END, *(self.file_labels[i] for i in self._shown))
+        if self.current:
+            self.select_path(self.current[1])
+        self.update_file_count()
+
+    def select_path(self, path):
+        # highlight the row for path if the filter shows it
+        self.file_list.selection_clear(0, tk.END)
+        try:
+            row = self._shown.index(self.file_paths.index(path))
+        except ValueError:
+            return
+        self.file_list.selection_set(row)
+        self.file_list.see(row)
 
     def on_select(self, event):
         sel = self.file_list.curselection()
         if not sel:
             return
-        name = self.file_list.get(sel[0])
-        path = self.files.get(name)
-        if path:
-            self.load_file(name, path)
+        path = self.file_paths[self._shown[sel[0]]]
+        self.load_file(os.path.basename(path), path)
+
+    def build_view(self, path, cancelled=lambda: False):
+        # runs on a worker thread: no Tk calls in here
+        source = FileSource(path)
+        try:
+            parser, parsed = parse_file(source)
+            if cancelled():
+                raise ParseCancelled
+            raw = parsed.get('raw') or parsed.get('raw_bytes') or b''
+            entry = {
+                'stamp': (source.size, source.mtime_ns),
+                'source': source,
+                'parser': parser,
+                'parsed': parsed,
+            }
+        except BaseException:
+            source.close()
+            raise
+        entry['bytes'] = estimate_view_bytes(entry, 0 if source.mapped else len(raw))
+        return entry
 
     def load_file(self, name, path):
-        parser = get_parser_for(path)
-        parsed = parser.parse(path)
-        self.current = (name, path, parsed, parser)
+        if self._reparse_job is not None:
+            self.after_cancel(self._reparse_job)
+            self._reparse_job = None
+        self._dirty = None
+        self._json_stale = False
+        self._gen += 1
+        gen = self._gen
+        st = os.stat(path)
+        entry = self.view_cache.get(path)
+        if entry is not None and entry['stamp'] == (st.st_size, st.st_mtime_ns):
+            self.show_view(gen, name, path, entry)
+            return
+        self.status.config(text=f'Parsing {name}...')
+        self.progress.config(mode='indeterminate')
+        self.progress.start(12)
+        with self._parse_lock:
+            self._parse_next = (gen, name, path)
+            if not self._parsing:
+                self._parsing = True
+                threading.Thread(target=self._parse_worker, daemon=True).start()
+        if not self._polling:
+            self._polling = True
+            self.after(POLL_MS, self._poll_results)
+
+    def _parse_worker(self):
+        while True:
+            with self._parse_lock:
+                job, self._parse_next = self._parse_next, None
+                if job is None:
+                    self._parsing = False
+                    return
+            gen, name, path = job
+            try:
+                entry = self.build_view(path, cancelled=lambda: gen != self._gen)
+                self._results.put((gen, name, path, entry, None))
+            except ParseCancelled:
+                pass
+            except Exception as e:
+                self._results.put((gen, name, path, None, e))
+
+    def _poll_results(self):
+        while True:
+            try:
+                gen, name, path, entry, err = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if gen != self._gen:
+                # superseded by a later selection
+                if entry is not None:
+                    entry['source'].close()
+                continue
+            if err is not None:
+                self.progress.stop()
+                self.status.config(text=f'Failed to parse {name}')
+                messagebox.showerror('Parse error', f'{name}: {err}')
+                continue
+            self.view_cache.put(path, entry, entry['bytes'])
+            self.show_view(gen, name, path, entry)
+        if self._parsing or not self._results.empty():
+            self.after(POLL_MS, self._poll_results)
+        else:
+            self._polling = False
+
+    def _evicted(self, path, entry):
+        # sources dropped from the cache are closed, except the one on screen;
+        # the parse result goes first, as its records are slices of the mapping
+        if entry['source'] is self._view_source:
+            self._view_detached = True
+        else:
+            entry.pop('parsed', None)
+            entry['source'].close()
+
+    def _set_view_source(self, source, detached=False):
+        old = self._view_source
+        if old is not None and old is not source and self._view_detached:
+            old.close()
+        self._view_source = source
+        self._view_detached = detached
+
+    def show_view(self, gen, name, path, entry):
+        self._set_view_source(entry['source'])
+        self.current = (name, path, entry['parsed'], entry['parser'])
+        steps = self._fill_steps(entry)
+        self.progress.stop()
+        self.progress.config(mode='determinate', maximum=next(steps), value=0)
+        self.status.config(text=f'Loading {name}...')
+        self._run_fill(gen, name, steps)
 
-        safe = safe_convert(parsed.get('structured', {}))
+    def _fill_steps(self, entry):
+        structured = entry['parsed'].get('structured', {})
+        raw = entry['parsed'].get('raw') or entry['parsed'].get('raw_bytes') or b''
+        small = len(raw) <= RAW_JSON_LIMIT
+        self.json_raw_toggle.config(state=tk.NORMAL if small else tk.DISABLED)
+        if not small:
+            self.json_raw.set(False)
+            self.set_json_mode()
+        js = json_text(structured) if self.json_raw.get() else ''
+        yield len(js) // FILL_CHARS + 2
         self.json_text.delete('1.0', tk.END)
-        self.json_text.insert('1.0', json.dumps(safe, indent=4, ensure_ascii=False))
-
-        self.table.delete(*self.table.get_children())
-        for rec in parsed.get('structured', {}).get('records', []):
-            offset = rec.get('offset', ''); length = rec.get('length', '')
-            ascii_txt = (rec.get('ascii_text') or '')[:80].replace('\n',' ')
-            hex_preview = (rec.get('raw_hex') or '')[:192]
-            ints = ','.join(str(x) for x in (rec.get('int32_values') or [])[:6])
-            floats = ','.join(str(x) for x in (rec.get('float32_values') or [])[:6])
-            guessed = rec.get('guessed', '') or ''
-            self.table.insert('', 'end', values=(offset, length, ascii_txt, hex_preview, ints, floats, guessed))
-
-        raw = parsed.get('raw') or parsed.get('raw_bytes') or b''
-        self.hex_editor.delete('1.0', tk.END)
-        self.hex_editor.data = bytearray(raw)
-        self.hex_editor.insert('1.0', self.hex_editor.format_hex(raw))
-
-    def on_hex_change(self, data: bytes):
+        self.json_tree.set_data(structured)
+        self.hex_editor.set_data(raw)
+        self.table.set_records(structured.get('records', []))
+        yield
+        for i in range(0, len(js), FILL_CHARS):
+            self.json_text.insert(tk.END, js[i:i + FILL_CHARS])
+            yield
+
+    def _run_fill(self, gen, name, steps):
+        if gen != self._gen:
+            return
+        try:
+            next(steps)
+        except StopIteration:
+            self.progress.config(value=0)
+            self.status.config(text=name)
+            if self._goto and self.current and self._goto[0] == self.current[1]:
+                self.show_offset(*self._goto[1:])
+            self._goto = None
+            return
+        self.progress.step(1)
+        self.after(1, self._run_fill, gen, name, steps)
+
+    def show_offset(self, offset, length=1):
+        self.notebook.select(2)
+        self.hex_editor.goto(offset, offset + max(1, length))
+        self.hex_editor.text.focus_set()
+
+    def open_index_window(self):
+        if self.index_window is not None and self.index_window.winfo_exists():
+            self.index_window.lift()
+            return
+        if self.index is None:
+            try:
+                self.index = CorpusIndex()
+            except Exception as e:
+                messagebox.showerror('Index error', str(e))
+                return
+        win = self.index_window = tk.Toplevel(self, bg='#1e1e1e')
+        win.title('Search Index')
+        win.geometry('900x500')
+        bar = tk.Frame(win, bg='#2b2b2b')
+        bar.pack(side=tk.TOP, fill=tk.X)
+        query = tk.Entry(bar, width=48, bg='#1e1e1e', fg='white', insertbackground='white')
+        query.pack(side=tk.LEFT, padx=6, pady=6)
+        query.bind('<Return>', lambda e: self.search_index(query.get()))
+        tk.Button(bar, text='Search', command=lambda: self.search_index(query.get())).pack(side=tk.LEFT, padx=4, pady=6)
+        tk.Button(bar, text='Index Folder', command=self.index_folder).pack(side=tk.LEFT, padx=4, pady=6)
+        self.index_status = tk.Label(bar, text=f'{len(self.index)} files indexed', bg='#2b2b2b', fg='#cccccc')
+        self.index_status.pack(side=tk.RIGHT, padx=6)
+        self.index_hits = VirtualTable(win, ('File', 'Offset', 'Kind', 'Text'), hit_row,
+                                       widths={'File': 360, 'Offset': 90, 'Kind': 80, 'Text': 320}, bg='#1e1e1e')
+        self.index_hits.pack(fill=tk.BOTH, expand=True)
+        self.index_hits.on_select = lambda i, hit: self.open_hit(hit)
+        query.focus_set()
+
+    def search_index(self, text):
+        hits = self.index.lookup(text)
+        self.index_hits.set_records(hits)
+        self.index_status.config(text=f'{len(hits)} hits' if hits else 'No hits (strings need 3+ characters)')
+
+    def index_folder(self):
+        d = filedialog.askdirectory(parent=self.index_window)
+        if not d:
+            return
+        self.index_status.config(text='Indexing...' if not self._indexing else 'Queued after the running update...')
+        threading.Thread(target=self._index_worker, args=(d,), daemon=True).start()
+        self._indexing += 1
+        if self._indexing == 1:
+            self.after(200, self._poll_index)
+
+    def _index_worker(self, folder):
+        # its own connection: sqlite objects stay on the thread that made them
+        try:
+            with self._index_lock, CorpusIndex(self.index.path) as idx:
+                idx.update(folder, log=self._index_msgs.put, mp_context=SPAWN)
+        except Exception as e:
+            self._index_msgs.put(f'Indexing failed: {e}')
+        self._index_msgs.put(None)
+
+    def _poll_index(self):
+        # one poller for all updates; it stops when the last one is done
+        shown = self.index_window is not None and self.index_window.winfo_exists()
+        while True:
+            try:
+                msg = self._index_msgs.get_nowait()
+            except queue.Empty:
+                break
+            if msg is None:
+                self._indexing -= 1
+                if not self._indexing and shown:
+                    last = self.index_status.cget('text')
+                    self.index_status.config(text=f'{last} - {len(self.index)} files indexed')
+            elif shown:
+                self.index_status.config(text=msg)
+        if self._indexing:
+            self.after(200, self._poll_index)
+
+    def open_hit(self, hit):
+        length = hit_length(hit)
+        if self.current and self.current[1] == hit.path:
+            self.show_offset(hit.offset, length)
+            return
+        if not os.path.exists(hit.path):
+            messagebox.showwarning('Missing file', f'{hit.path} no longer exists; re-index its folder')
+            return
+        self.add_paths([hit.path])
+        self.select_path(hit.path)
+        self._goto = (hit.path, hit.offset, length)
+        self.load_file(os.path.basename(hit.path), hit.path)
+
+    def compare(self):
+        folders = messagebox.askyesnocancel('Compare', 'Compare two folders?\n(No compares two files)')
+        if folders is None:
+            return
+        if folders:
+            a = filedialog.askdirectory(title='Old folder')
+            b = a and filedialog.askdirectory(title='New folder')
+        else:
+            a = filedialog.askopenfilename(title='Old file', filetypes=[('NCS files','*.ncs'),('All files','*.*')])
+            b = a and filedialog.askopenfilename(title='New file', filetypes=[('NCS files','*.ncs'),('All files','*.*')])
+        if a and b:
+            DiffWindow(self, a, b)
+
+    def on_hex_change(self, start, end):
         if not self.current:
             return
+        # coalesce edits and re-parse once typing pauses
+        d = self._dirty
+        self._dirty = (start, end) if d is None else (min(d[0], start), max(d[1], end))
+        if self._reparse_job is not None:
+            self.after_cancel(self._reparse_job)
+        self._reparse_job = self.after(REPARSE_MS, self.flush_reparse)
+
+    def flush_reparse(self):
+        if self._reparse_job is not None:
+            self.after_cancel(self._reparse_job)
+            self._reparse_job = None
+        if not self.current or self._dirty is None:
+            return
+        (start, end), self._dirty = self._dirty, None
         name, path, parsed, parser = self.current
+        # the cached view reflects the file on disk, not the edited buffer
+        self.view_cache.pop(path)
         try:
-            if hasattr(parser, 'parse_bytes'):
-                new_parsed = parser.parse_bytes(data)
+            if hasattr(parser, 'reparse'):
+                parsed, changed = parser.reparse(parsed, self.hex_editor.data, start, end)
             else:
-                import tempfile
-                tf = tempfile.NamedTemporaryFile(delete=False)
-                tf.write(data); tf.close()
-                new_parsed = parser.parse(tf.name)
-                os.unlink(tf.name)
-            self.current = (name, path, new_parsed, parser)
-            safe = safe_convert(new_parsed.get('structured', {}))
-            self.json_text.delete('1.0', tk.END)
-            self.json_text.insert('1.0', json.dumps(safe, indent=4, ensure_ascii=False))
-
-            self.table.delete(*self.table.get_children())
-            for rec in new_parsed.get('structured', {}).get('records', []):
-                offset = rec.get('offset', ''); length = rec.get('length', '')
-                ascii_txt = (rec.get('ascii_text') or '')[:80].replace('\n',' ')
-                hex_preview = (rec.get('raw_hex') or '')[:192]
-                ints = ','.join(str(x) for x in (rec.get('int32_values') or [])[:6])
-                floats = ','.join(str(x) for x in (rec.get('float32_values') or [])[:6])
-                guessed = rec.get('guessed', '') or ''
-                self.table.insert('', 'end', values=(offset, length, ascii_txt, hex_preview, ints, floats, guessed))
+                parsed, changed = parser.parse_bytes(self.hex_editor.get_bytes()), None
         except Exception as e:
             print('Error re-parsing bytes:', e)
+            return
+        self.current = (name, path, parsed, parser)
+        records = parsed.get('structured', {}).get('records', [])
+        if changed is None:
+            self.table.set_records(records, keep_position=True)
+        else:
+            self.table.refresh()
+        self.refresh_json()
+
+    def refresh_json(self, event=None):
+        # the JSON text is only rebuilt while its tab is showing
+        if not self.current:
+            return
+        if self.notebook.index('current') != 0:
+            self._json_stale = True
+            return
+        if event is not None and not self._json_stale:
+            return
+        self._json_stale = False
+        structured = self.current[2].get('structured', {})
+        if structured is not self.json_tree.root:
+            self.json_tree.set_data(structured, keep_open=True)
+        else:
+            self.json_tree.refresh()
+        if self.json_raw.get():
+            self.json_text.delete('1.0', tk.END)
+            self.json_text.insert('1.0', json_text(structured))
+
+    def set_json_mode(self):
+        if self.json_raw.get():
+            self.json_tree.pack_forget()
+            self.json_text_frame.pack(fill=tk.BOTH, expand=True)
+            if self.current:
+                self.json_text.delete('1.0', tk.END)
+                self.json_text.insert('1.0', json_text(self.current[2].get('structured', {})))
+        else:
+            self.json_text_frame.pack_forget()
+            self.json_text.delete('1.0', tk.END)
+            self.json_tree.pack(fill=tk.BOTH, expand=True)
 
     def save_json(self):
         if not self.current:
             messagebox.showwarning('No file', 'No file selected')
             return
+        self.flush_reparse()
         name, path, parsed, parser = self.current
-        p = filedialog.asksaveasfilename(defaultextension='.json', initialfile=f'Edited_{name}.json')
+        p = filedialog.asksaveasfilename(defaultextension='.json', initialfile=f'Edited_{name}.json',
+                                         filetypes=[('JSON','*.json'),('NDJSON, one record per line','*.ndjson')])
         if not p: return
-        safe = safe_convert(parsed.get('structured', {}))
+        cfg = get_section('export')
+        structured = parsed.get('structured', {})
         with open(p, 'w', encoding='utf-8') as f:
-            json.dump(safe, f, indent=4, ensure_ascii=False)
+            if p.lower().endswith('.ndjson'):
+                write_ndjson(structured, f, cfg.get('bytes', 'hex'))
+            else:
+                write_json(structured, f, cfg.get('indent', 4), cfg.get('bytes', 'hex'))
         messagebox.showinfo('Saved', f'JSON exported to {p}')
 
     def save_ncs(self):
@@ -242,16 +620,180 @@ class NCSReaderApp(tk.Tk):
             messagebox.showwarning('No file', 'No file selected')
             return
         name, path, parsed, parser = self.current
-        savep = filedialog.asksaveasfilename(defaultextension='.ncs', initialfile=f'Edited_{name}')
+        savep = filedialog.asksaveasfilename(defaultextension='.ncs', initialfile=f'Edited_{name}',
+                                             filetypes=[('NCS files','*.ncs'),('Patch, changes only','*' + PATCH_EXT),
+                                                        ('All files','*.*')])
         if not savep: return
-        raw = self.hex_editor.get_bytes()
+        data = self.hex_editor.data
         try:
-            with open(savep, 'wb') as f:
-                f.write(raw)
-            messagebox.showinfo('Saved', f'Edited NCS written to {savep}')
+            if savep.lower().endswith(PATCH_EXT):
+                patch = make_patch(data.original, data)
+                write_patch(savep, patch)
+                messagebox.showinfo('Saved', f'Patch with {len(patch.records)} changes written to {savep}')
+            elif os.path.exists(savep) and os.path.samefile(savep, path):
+                # saving over the original: only the changed bytes are written
+                n = write_in_place(path, data.changes())
+                self.rebase_saved(path)
+                messagebox.showinfo('Saved', f'{n} changed bytes written to {savep}')
+            else:
+                with open(savep, 'wb') as f:
+                    for chunk in data.chunks():
+                        f.write(chunk)
+                messagebox.showinfo('Saved', f'Edited NCS written to {savep}')
         except Exception as e:
             messagebox.showerror('Save error', str(e))
 
+    def rebase_saved(self, path):
+        # The file now holds the editor's content: reopen it as the table's
+        # original, so later saves diff against what is on disk and undo
+        # still shows the old bytes (a mapped original changed under it).
+        self.view_cache.pop(path)
+        source = FileSource(path)
+        self.hex_editor.data.rebase(source.buffer)
+        self._set_view_source(source, detached=True)
+
+    def apply_patch(self):
+        if not self.current:
+            messagebox.showwarning('No file', 'No file selected')
+            return
+        p = filedialog.askopenfilename(filetypes=[('Patch','*' + PATCH_EXT),('All files','*.*')])
+        if not p: return
+        data = self.hex_editor.data
+        try:
+            patch = read_patch(p)
+        except (OSError, ValueError) as e:
+            messagebox.showerror('Patch error', str(e))
+            return
+        try:
+            check_source(patch, data)
+        except ValueError as e:
+            if not messagebox.askyesno('Apply Patch', f'{e}.\nApply it anyway?'):
+                return
+        try:
+            apply_to(data, patch)
+        except ValueError as e:
+            messagebox.showerror('Patch error', str(e))
+            return
+        # shown as ordinary edits: undoable, saved with Save Edited NCS
+        self.hex_editor.set_data(data, keep_position=True)
+        self.on_hex_change(0, len(data))
+
+class DiffWindow(tk.Toplevel):
+    # Side-by-side comparison of two files, or of two folders with a list of
+    # the files that differ. The diff runs on a worker thread; selecting a
+    # change shows its range in both hex views.
+    def __init__(self, master, a, b):
+        super().__init__(master, bg='#1e1e1e')
+        self.title(f'Compare {os.path.basename(a)} / {os.path.basename(b)}')
+        self.geometry('1400x820')
+        self.a, self.b = a, b
+        self.folders = os.path.isdir(a)
+        self.result = None
+        self.sources = []
+        self._done = queue.Queue()
+
+        bar = tk.Frame(self, bg='#2b2b2b')
+        bar.pack(side=tk.TOP, fill=tk.X)
+        tk.Button(bar, text='Export JSON', command=self.export).pack(side=tk.LEFT, padx=6, pady=6)
+        self.status = tk.Label(bar, text='Comparing...', bg='#2b2b2b', fg='#cccccc')
+        self.status.pack(side=tk.LEFT, padx=6)
+
+        panes = tk.PanedWindow(self, orient=tk.VERTICAL, sashrelief=tk.RAISED, bg='#1e1e1e')
+        panes.pack(fill=tk.BOTH, expand=True, padx=6, pady=6)
+        lists = tk.PanedWindow(panes, orient=tk.HORIZONTAL, sashrelief=tk.RAISED, bg='#1e1e1e')
+        panes.add(lists, height=240)
+        if self.folders:
+            self.file_table = VirtualTable(lists, ('Status', 'File', 'Changes'), diff_file_row,
+                                           widths={'Status': 70, 'File': 300, 'Changes': 70}, bg='#1e1e1e')
+            self.file_table.on_select = lambda i, item: self.show_file(item)
+            lists.add(self.file_table, width=460)
+        cols = ('Op', 'A offset', 'A length', 'B offset', 'B length', 'A records', 'B records')
+        self.change_table = VirtualTable(lists, cols, change_row, widths={c: 100 for c in cols}, bg='#1e1e1e')
+        self.change_table.on_select = lambda i, c: self.show_change(c)
+        lists.add(self.change_table)
+        hexes = tk.PanedWindow(panes, orient=tk.HORIZONTAL, sashrelief=tk.RAISED, bg='#1e1e1e')
+        panes.add(hexes)
+        self.hex_a = HexEditor(hexes, b'', bg='#1e1e1e', fg='white', insertbackground='white')
+        self.hex_b = HexEditor(hexes, b'', bg='#1e1e1e', fg='white', insertbackground='white')
+        hexes.add(self.hex_a, width=690)
+        hexes.add(self.hex_b)
+
+        self.bind('<Destroy>', lambda e: e.widget is self and self.close_sources())
+        threading.Thread(target=self._worker, daemon=True).start()
+        self.after(POLL_MS, self._poll)
+
+    def _worker(self):
+        try:
+            if self.folders:
+                res = diff_folders(self.a, self.b, mp_context=SPAWN)
+            else:
+                res = diff_files(self.a, self.b)
+            self._done.put((res, None))
+        except Exception as e:
+            self._done.put((None, e))
+
+    def _poll(self):
+        try:
+            res, err = self._done.get_nowait()
+        except queue.Empty:
+            self.after(POLL_MS, self._poll)
+            return
+        if not self.winfo_exists():
+            return
+        if err is not None:
+            self.status.config(text=f'Compare failed: {err}')
+            return
+        self.result = res
+        if self.folders:
+            items = ([('changed', d['file'], d) for d in res['changed']] +
+                     [('added', rel, None) for rel in res['added']] +
+                     [('removed', rel, None) for rel in res['removed']] +
+                     [('failed', f['file'], None) for f in res['failed']])
+            self.file_table.set_records(items)
+            self.status.config(text=f"{len(res['changed'])} changed, {len(res['added'])} added, "
+                                    f"{len(res['removed'])} removed, {res['unchanged']} identical")
+        else:
+            self.status.config(text='Identical' if res['identical'] else f"{len(res['changes'])} changes")
+            self.show_file(('changed', None, res))
+
+    def close_sources(self):
+        for src in self.sources:
+            src.close()
+        self.sources = []
+
+    def show_file(self, item):
+        status, rel, d = item
+        paths = (d['a'], d['b']) if d else (os.path.join(self.a, rel), os.path.join(self.b, rel))
+        self.hex_a.set_data(b'')
+        self.hex_b.set_data(b'')
+        self.close_sources()
+        for path, view in zip(paths, (self.hex_a, self.hex_b)):
+            if os.path.isfile(path):
+                src = FileSource(path)
+                self.sources.append(src)
+                view.set_data(src.buffer)
+        changes = d['changes'] if d else []
+        self.hex_a.set_marks((c['a_offset'], c['a_offset'] + max(1, c['a_length'])) for c in changes)
+        self.hex_b.set_marks((c['b_offset'], c['b_offset'] + max(1, c['b_length'])) for c in changes)
+        self.change_table.set_records(changes)
+        if changes:
+            self.change_table.select(0)
+
+    def show_change(self, c):
+        self.hex_a.goto(c['a_offset'], c['a_offset'] + max(1, c['a_length']))
+        self.hex_b.goto(c['b_offset'], c['b_offset'] + max(1, c['b_length']))
+
+    def export(self):
+        if self.result is None:
+            return
+        p = filedialog.asksaveasfilename(parent=self, defaultextension='.json', initialfile='diff.json',
+                                         filetypes=[('JSON', '*.json')])
+        if not p:
+            return
+        with open(p, 'w', encoding='utf-8') as f:
+            write_json(self.result, f, indent=2)
+        self.status.config(text=f'Diff exported to {p}')
+
 def main():
     app = NCSReaderApp()
     app.mainloop()
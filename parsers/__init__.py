@@ -1,33 +1,38 @@
-import os
 from .generic import GenericParser
-from .achievement import AchievementParser
-from .activity import ActivityParser
-from .activityrequest import ActivityrequestParser
-from .activityrequestsettingsdata import ActivityrequestsettingsdataParser
-from .aihitreactions import AihitreactionsParser
-from .aim_assist_parameters import AimAssistParametersParser
-from .animupdaterateparams import AnimupdaterateparamsParser
-from .attribute import AttributeParser
-from .audio_event import AudioEventParser
-from .audioprovider import AudioproviderParser
 from .base import BaseParser
-from .camera_mode import CameraModeParser
-from .camera_shake import CameraShakeParser
-from .camera_transition import CameraTransitionParser
-from .capital import CapitalParser
-from .character import CharacterParser
-from .generic import GenericParser
+from .schema import (
+    SCHEMA_PARSERS,
+    SchemaParser,
+    AchievementParser,
+    ActivityParser,
+    ActivityrequestParser,
+    ActivityrequestsettingsdataParser,
+    AihitreactionsParser,
+    AimAssistParametersParser,
+    AnimupdaterateparamsParser,
+    AttributeParser,
+    AudioEventParser,
+    AudioproviderParser,
+    CameraModeParser,
+    CameraShakeParser,
+    CameraTransitionParser,
+    CapitalParser,
+    CharacterParser,
+    InventoryParser,
+    LightBeamParser,
+    LightProjectileParser,
+    LuckCategoryParser,
+    ManagedActorParser,
+    MantleParser,
+    ManufacturerParser,
+    QuestParser,
+    QuestsParser,
+)
 from .inv_name_part import InvNamePartParser
-from .inventory import InventoryParser
-from .light_beam import LightBeamParser
-from .light_projectile import LightProjectileParser
 from .loot_config import LootConfigParser
-from .luck_category import LuckCategoryParser
-from .managed_actor import ManagedActorParser
-from .mantle import MantleParser
-from .manufacturer import ManufacturerParser
-from .quest import QuestParser
-from .quests import QuestsParser
+from .cache import ParseCache, default_cache
+from .registry import ParserRegistry
+from .source import FileSource, as_source
 
 ALL_PARSERS = [
     AchievementParser,
@@ -56,20 +61,26 @@ ALL_PARSERS = [
     ManufacturerParser,
     QuestParser,
     QuestsParser,
-    GenericParser,
 ]
+# file types declared in config.json
+ALL_PARSERS += [P for P in SCHEMA_PARSERS.values() if P not in ALL_PARSERS]
+ALL_PARSERS.append(GenericParser)
+
+REGISTRY = ParserRegistry(ALL_PARSERS, GenericParser)
 
 def get_parser_for(filepath):
-    fname = os.path.basename(filepath)
-    with open(filepath, 'rb') as f:
-        raw = f.read()
-    for P in ALL_PARSERS:
-        try:
-            if P.can_parse(fname, raw):
-                return P()
-        except Exception:
-            pass
-    return GenericParser()
+    return REGISTRY.parser_for(filepath)
 
 def get_parser(filepath):
-    return get_parser_for(filepath)
\ No newline at end of file
+    return get_parser_for(filepath)
+
+def parse_file(path, cache=None):
+    # one read (or one mapping) shared by detection and parsing; cache=None
+    # uses the configured on-disk parse cache, cache=False bypasses it
+    src = as_source(path)
+    parser = get_parser_for(src)
+    if cache is None:
+        cache = default_cache()
+    if cache:
+        return parser, cache.parse(parser, src)
+    return parser, parser.parse(src)
@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import argparse
+
+from . import get_parser_for
+from .batch import run_batch
+from .diff import diff_files, diff_folders
+from .export import BYTES_ENCODINGS, write_json
+from .index import CorpusIndex
+from .patch import apply_file, make_patch, read_patch, records_from_diff, write_patch
+from .source import FileSource, as_source
+
+
+def build_arg_parser():
+    ap = argparse.ArgumentParser(prog='python -m parsers', description='Headless NCS Reader tools')
+    sub = ap.add_subparsers(dest='command', required=True)
+
+    b = sub.add_parser('batch', help='parse every .ncs file under a folder to JSON')
+    b.add_argument('root', help='.ncs file or folder to walk recursively')
+    out = b.add_mutually_exclusive_group()
+    out.add_argument('-o', '--out-dir', help='write one <name>.ncs.json per input, mirroring the tree')
+    out.add_argument('--ndjson', metavar='FILE', help="write one JSON document per line to FILE ('-' for stdout, the default)")
+    b.add_argument('-j', '--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    b.add_argument('--indent', type=int, default=None, help='indentation for per-file JSON output')
+    b.add_argument('--format', choices=('json', 'ndjson'), default='json',
+                   help='per-file output: one JSON document, or NDJSON with one record per line')
+    b.add_argument('--bytes', choices=BYTES_ENCODINGS, default='hex', help='how byte fields are written (default: hex)')
+    b.add_argument('--no-cache', action='store_true', help='ignore and do not update the on-disk parse cache')
+
+    r = sub.add_parser('rebuild', help='write an .ncs file from edited JSON and the original file')
+    r.add_argument('json', help='edited .json (or .ndjson) export')
+    r.add_argument('original', help='the .ncs file the JSON was exported from')
+    r.add_argument('-o', '--output', required=True, help='where to write the rebuilt .ncs file')
+
+    i = sub.add_parser('index', help='add or refresh the .ncs files under a folder in the strings/GUID index')
+    i.add_argument('root', help='.ncs file or folder to walk recursively')
+    i.add_argument('--db', help='index database (default: next to the parse cache, or "index" in config.json)')
+    i.add_argument('-j', '--workers', type=int, default=None, help='worker processes (default: CPU count)')
+
+    f = sub.add_parser('find', help='list the indexed files containing a string or GUID')
+    f.add_argument('query', help='text (any substring of 3+ characters) or a GUID')
+    f.add_argument('--db', help='index database')
+    f.add_argument('-n', '--limit', type=int, default=200, help='maximum hits (default: 200)')
+
+    d = sub.add_parser('diff', help='compare two .ncs files or two dump folders')
+    d.add_argument('a', help='old file or folder')
+    d.add_argument('b', help='new file or folder')
+    d.add_argument('-o', '--output', help='write the full diff as JSON')
+    d.add_argument('-j', '--workers', type=int, default=None, help='worker processes for folders (default: CPU count)')
+    d.add_argument('--no-records', action='store_true', help='do not map changed ranges to parsed records')
+
+    p = sub.add_parser('patch', help='make, apply or inspect compact .ncspatch files')
+    actions = p.add_subparsers(dest='action', required=True)
+    mk = actions.add_parser('make', help='patch holding the differences between two files')
+    mk.add_argument('original')
+    mk.add_argument('edited')
+    mk.add_argument('-o', '--output', required=True, help='.ncspatch file to write')
+    apply = actions.add_parser('apply', help='apply a patch; same-size patches are written in place')
+    apply.add_argument('patch')
+    apply.add_argument('file', help='the original file')
+    apply.add_argument('-o', '--output', help='write the result here instead of changing the file')
+    apply.add_argument('--force', action='store_true', help='skip the source and target checksum checks')
+    info = actions.add_parser('info', help='describe a patch')
+    info.add_argument('patch')
+    return ap
+
+
+def load_export(path):
+    with open(path, encoding='utf-8') as f:
+        if not path.endswith('.ndjson'):
+            return json.load(f)
+        structured = json.loads(f.readline())
+        structured['records'] = [json.loads(line) for line in f if line.strip()]
+    return structured
+
+
+def rebuild(json_path, original, output):
+    with as_source(original) as src:
+        data = get_parser_for(src).to_bytes(load_export(json_path), src.buffer)
+    with open(output, 'wb') as f:
+        f.write(data)
+
+
+def _records(refs):
+    return ','.join(str(r['index']) for r in refs) or '-'
+
+
+def print_changes(d, prefix=''):
+    for c in d['changes']:
+        line = (f"{prefix}{c['op']:7} a 0x{c['a_offset']:X}+{c['a_length']}  "
+                f"b 0x{c['b_offset']:X}+{c['b_length']}")
+        if 'a_records' in c:
+            line += f"  records a[{_records(c['a_records'])}] b[{_records(c['b_records'])}]"
+        print(line)
+
+
+def run_diff(args):
+    log = lambda msg: print(msg, file=sys.stderr)
+    if os.path.isdir(args.a) and os.path.isdir(args.b):
+        out = diff_folders(args.a, args.b, workers=args.workers, records=not args.no_records, log=log)
+        for rel in out['removed']:
+            print(f'D {rel}')
+        for rel in out['added']:
+            print(f'A {rel}')
+        for d in out['changed']:
+            counts = d.get('changed_records')
+            extra = f", {counts['b']} of {counts['b_total']} records" if counts else ''
+            print(f"M {d['file']} ({len(d['changes'])} changes{extra})")
+        same = not (out['removed'] or out['added'] or out['changed'])
+    else:
+        out = diff_files(args.a, args.b, records=not args.no_records)
+        print_changes(out)
+        same = out['identical']
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            write_json(out, f, indent=2)
+    return 0 if same else 1
+
+
+def run_patch(args):
+    if args.action == 'make':
+        with FileSource(args.original) as a, FileSource(args.edited) as b:
+            patch = make_patch(a.buffer, b.buffer, records_from_diff(a.buffer, b.buffer))
+        write_patch(args.output, patch)
+        print(patch)
+    elif args.action == 'apply':
+        target = apply_file(read_patch(args.patch), args.file, args.output, verify=not args.force)
+        print(f'patched {target}')
+    else:
+        patch = read_patch(args.patch)
+        print(patch)
+        print(f'source {patch.source_size} bytes, blake2b {patch.source_hash.hex()}')
+        print(f'target {patch.target_size} bytes, blake2b {patch.target_hash.hex()}')
+        for off, length, new in patch.records:
+            print(f'0x{off:X}: {length} -> {len(new)} bytes')
+    return 0
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.command == 'batch':
+        try:
+            summary = run_batch(args.root, out_dir=args.out_dir, ndjson=args.ndjson,
+                                workers=args.workers, indent=args.indent, use_cache=not args.no_cache,
+                                fmt=args.format, bytes_encoding=args.bytes)
+        except OSError as e:
+            print(f'batch failed: {e}', file=sys.stderr)
+            return 2
+        return 1 if summary['failed'] else 0
+    if args.command == 'index':
+        with CorpusIndex(args.db) as idx:
+            summary = idx.update(args.root, workers=args.workers, log=lambda msg: print(msg, file=sys.stderr))
+        return 1 if summary['failed'] else 0
+    if args.command == 'find':
+        with CorpusIndex(args.db) as idx:
+            hits = idx.lookup(args.query, args.limit)
+        for h in hits:
+            print(f'{h.path}\t0x{h.offset:X}\t{h.kind}\t{h.text}')
+        return 0 if hits else 1
+    if args.command == 'diff':
+        try:
+            return run_diff(args)
+        except (OSError, ValueError) as e:
+            print(f'diff failed: {e}', file=sys.stderr)
+            return 2
+    if args.command == 'patch':
+        try:
+            return run_patch(args)
+        except (OSError, ValueError) as e:
+            print(f'patch failed: {e}', file=sys.stderr)
+            return 1
+    if args.command == 'rebuild':
+        try:
+            rebuild(args.json, args.original, args.output)
+        except (OSError, ValueError) as e:
+            print(f'rebuild failed: {e}', file=sys.stderr)
+            return 1
+        return 0
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
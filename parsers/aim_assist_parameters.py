@@ -1,19 +0,0 @@
-import os
-from .generic import GenericParser
-
-class AimAssistParametersParser(GenericParser):
-    @staticmethod
-    def can_parse(filename: str, raw: bytes) -> bool:
-        return 'aim_assist' in os.path.basename(filename).lower() or 'aimassist' in os.path.basename(filename).lower()
-
-    def parse_bytes(self, raw: bytes):
-        res = super().parse_bytes(raw)
-        s = res['structured']
-        s.setdefault('guessed', {})
-        s['guessed']['approx_fields'] = max(1, len(raw)//32)
-        return res
-
-    def to_bytes(self, data):
-        if isinstance(data, dict) and 'raw' in data:
-            return data['raw']
-        return super().to_bytes(data)
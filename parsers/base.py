@@ -1,82 +1,154 @@
-import struct, re, math, binascii
+import re, sys, math
+from collections import Counter
+from functools import lru_cache
+from . import scanner
+from .numeric import NumericViews, decode, clean_floats, np
+from .record import Record
+from .source import FileSource, as_view
+
+@lru_cache(maxsize=256)
+def _literal(needle):
+    return re.compile(re.escape(needle))
+
+
+def find_bytes(raw, needle: bytes, start=0, end=None):
+    # memoryviews have no find(); a cached literal regex searches them in place
+    if hasattr(raw, "find"):
+        return raw.find(needle, start, len(raw) if end is None else end)
+    m = _literal(bytes(needle)).search(raw, start, len(raw) if end is None else end)
+    return m.start() if m else -1
+
+# up to this many GUIDs, one search per GUID beats the word-table pass
+GUID_FIND_MAX = 16
+# 8-byte words looked up per step of the word-table pass
+WORD_CHUNK = 1 << 16
+
+
+def _find_each(raw, binary):
+    # (offset, guid bytes) of every occurrence, one literal search per GUID
+    hits = []
+    for g in binary:
+        search = _literal(g).search
+        m = search(raw)
+        while m:
+            hits.append((m.start(), g))
+            m = search(raw, m.start() + 1)
+    return hits
+
+
+def _find_by_words(raw, binary):
+    # Every 16-byte occurrence at p covers the 8-byte word at the next multiple
+    # of 4 (p + k, k < 4), so the GUIDs are keyed by their four such words and
+    # only the words at multiples of 4 are looked up: one linear pass however
+    # many GUIDs there are.
+    table = {}
+    for g in binary:
+        for k in range(4):
+            table.setdefault(int.from_bytes(g[k:k + 8], sys.byteorder), []).append((g, k))
+    raw = as_view(raw)
+    n = len(raw)
+    hits = set()
+    for base in (0, 4):
+        if n < base + 8:
+            continue
+        words = raw[base:base + (n - base) // 8 * 8].cast("Q")
+        for i0 in range(0, len(words), WORD_CHUNK):
+            chunk = words[i0:i0 + WORD_CHUNK].tolist()
+            if table.keys().isdisjoint(chunk):
+                continue
+            for j, w in enumerate(chunk):
+                if w in table:
+                    q = base + 8 * (i0 + j)
+                    for g, k in table[w]:
+                        p = q - k
+                        if p >= 0 and raw[p:p + 16] == g:
+                            hits.add((p, g))
+    return hits
+
 
 class BaseParser:
+    # bump when a parser's output changes so cached results are discarded
+    version = 1
+
+    def cache_tag(self):
+        return f"{type(self).__name__}/{self.version}"
+
     def read_file(self, filepath):
+        if isinstance(filepath, FileSource):
+            return filepath.buffer
         with open(filepath, "rb") as f:
             return f.read()
 
     def read_cstring(self, raw: bytes, offset: int):
         if offset >= len(raw):
             return "", offset
-        end = raw.find(b"\x00", offset)
+        end = find_bytes(raw, b"\x00", offset)
         if end == -1:
-            return raw[offset:].decode("utf-8", errors="replace"), len(raw)
-        return raw[offset:end].decode("utf-8", errors="replace"), end + 1
+            return str(raw[offset:], "utf-8", errors="replace"), len(raw)
+        return str(raw[offset:end], "utf-8", errors="replace"), end + 1
 
     def hex_spaced(self, data: bytes, limit=None):
-        h = binascii.hexlify(data).decode("ascii").upper()
         if limit:
-            h = h[:limit*2]
-        return " ".join(h[i:i+2] for i in range(0, len(h), 2))
+            data = data[:limit]
+        return bytes(data).hex(" ").upper()
+
+    def scan_tokens(self, raw: bytes, min_string=2, min_ascii=4, **kinds):
+        return scanner.scan(raw, min_string=min_string, min_ascii=min_ascii, **kinds)
 
     def find_ascii_runs(self, raw: bytes, min_len=4):
-        runs = re.findall(rb"[ -~]{%d,}" % (min_len,), raw)
-        return [r.decode("utf-8", errors="replace") for r in runs]
+        return [t.text for t in self.scan_tokens(raw, min_ascii=min_len, strings=False, guids=False)]
 
     def extract_null_strings(self, raw: bytes, min_len=2):
-        res = []
-        i = 0
-        L = len(raw)
-        while i < L:
-            j = raw.find(b"\x00", i)
-            if j == -1:
-                if L - i >= min_len:
-                    seg = raw[i:]
-                    res.append((i, seg.decode("utf-8", errors="replace")))
-                break
-            if j - i >= min_len:
-                seg = raw[i:j]
-                res.append((i, seg.decode("utf-8", errors="replace")))
-            i = j + 1
-        return res
-
-    def extract_guids(self, raw: bytes):
-        guids = set()
-        candidates = self.find_ascii_runs(raw, min_len=8)
-        candidates += [s for _, s in self.extract_null_strings(raw, min_len=8)]
-        for s in candidates:
-            for tok in re.split(r'[^0-9A-Fa-f]', s):
-                if len(tok) == 32 and all(c in '0123456789abcdefABCDEF' for c in tok):
-                    guids.add(tok.upper())
-        return list(guids)
+        return [(t.offset, t.text) for t in self.scan_tokens(raw, min_string=min_len, ascii=False, guids=False)]
+
+    def extract_guids(self, raw: bytes, tokens=None):
+        if tokens is None:
+            tokens = self.scan_tokens(raw, strings=False, ascii=False)
+        return list(dict.fromkeys(t.text for t in tokens if t.kind == scanner.GUID))
+
+    def find_guid_occurrences(self, raw: bytes, guids, tokens=None):
+        # (offset, length, guid) for every textual (32 hex chars) and binary
+        # (16 raw bytes) occurrence, sorted by offset
+        occ = []
+        if not guids:
+            return occ
+        if tokens is None:
+            tokens = self.scan_tokens(raw, strings=False, ascii=False)
+        occ.extend((t.offset, t.length, t.text) for t in tokens if t.kind == scanner.GUID)
+        binary = {bytes.fromhex(g): g for g in guids}
+        if len(binary) <= GUID_FIND_MAX:
+            hits = _find_each(raw, binary)
+        else:
+            hits = _find_by_words(raw, binary)
+        occ.extend((off, 16, binary[g]) for off, g in hits)
+        occ.sort()
+        return occ
 
     def ints_uints_floats(self, data: bytes, offset=0, max_items=64):
-        ints = []
-        uints = []
-        floats = []
-        L = len(data)
-        end = min(L//4*4, offset + 4*max_items)
-        for i in range(offset, end, 4):
-            try:
-                i32 = struct.unpack_from("<i", data, i)[0]
-                u32 = struct.unpack_from("<I", data, i)[0]
-                f32 = struct.unpack_from("<f", data, i)[0]
-            except Exception:
-                break
-            ints.append(i32)
-            uints.append(u32)
-            if f32 != f32 or abs(f32) > 1e8:
-                floats.append(None)
-            else:
-                floats.append(round(f32, 6))
+        n = max(0, min((len(data) - offset) // 4, max_items))
+        if not n:
+            return [], [], []
+        ints = decode(data, "int32", offset, n).tolist()
+        uints = decode(data, "uint32", offset, n).tolist()
+        floats = clean_floats(decode(data, "float32", offset, n).tolist())
         return ints, uints, floats
 
-    def entropy(self, data: bytes):
+    def numeric_views(self, raw: bytes):
+        return NumericViews(raw)
+
+    def byte_histogram(self, data: bytes):
+        if np is not None:
+            return np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256).tolist()
+        # Counter counts bytes in C; iterating a memoryview is slower, and
+        # one bytes.count() scan per value slower still
+        counts = Counter(data if isinstance(data, (bytes, bytearray)) else as_view(data))
+        return [counts.get(i, 0) for i in range(256)]
+
+    def entropy(self, data: bytes, freq=None):
         if not data:
             return 0.0
-        freq = [0]*256
-        for b in data:
-            freq[b] += 1
+        if freq is None:
+            freq = self.byte_histogram(data)
         e = 0.0
         L = len(data)
         for c in freq:
@@ -86,17 +158,5 @@ class BaseParser:
             e -= p * math.log2(p)
         return round(e, 4)
 
-    def make_record(self, raw: bytes, offset: int, length: int):
-        seg = raw[offset:offset+length]
-        i32, u32, f32 = self.ints_uints_floats(seg, offset=0, max_items=16)
-        return {
-            "offset": offset,
-            "length": length,
-            "ascii_text": seg.decode("latin-1", errors="replace"),
-            "raw_hex": self.hex_spaced(seg, limit=1024),
-            "raw_bytes": seg,
-            "int32_values": i32,
-            "uint32_values": u32,
-            "float32_values": f32,
-            "strings": [s for _,s in self.extract_null_strings(seg, min_len=2)],
-        }
+    def make_record(self, raw: bytes, offset: int, length: int, views=None):
+        return Record(self, as_view(raw), offset, length, views)
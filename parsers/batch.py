@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import parse_file
+from .source import FileSource
+from .export import iter_json, write_json, write_ndjson
+
+
+def iter_ncs_files(root, exts=('.ncs',)):
+    if os.path.isfile(root):
+        yield root
+        return
+    # scandir reports entry types without a stat per file; files of a folder
+    # come before its subfolders, both in name order
+    try:
+        with os.scandir(root) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+    dirs = []
+    for e in entries:
+        try:
+            if e.is_dir(follow_symlinks=False):
+                dirs.append(e.path)
+            elif e.name.lower().endswith(exts):
+                yield e.path
+        except OSError:
+            continue
+    for d in dirs:
+        yield from iter_ncs_files(d, exts)
+
+
+def _parse_one(job):
+    path, rel, out_path, indent, use_cache, fmt, bytes_encoding = job
+    t0 = time.perf_counter()
+    res = {'path': path, 'file': rel, 'ok': False, 'error': None, 'parser': None,
+           'size': 0, 'records': 0, 'line': None}
+    try:
+        with FileSource(path) as src:
+            parser, parsed = parse_file(src, cache=None if use_cache else False)
+            structured = parsed.get('structured', {})
+            res['parser'] = type(parser).__name__
+            res['size'] = structured.get('size', 0)
+            res['records'] = len(structured.get('records', []))
+            head = {'file': rel, 'parser': res['parser']}
+            if out_path:
+                os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+                with open(out_path, 'w', encoding='utf-8') as f:
+                    if fmt == 'ndjson':
+                        write_ndjson(structured, f, bytes_encoding, head=head)
+                    else:
+                        write_json(dict(head, structured=structured), f, indent, bytes_encoding)
+            else:
+                res['line'] = ''.join(iter_json(dict(head, structured=structured), None, bytes_encoding))
+            del parsed, structured
+        res['ok'] = True
+    except Exception as e:
+        res['error'] = f'{type(e).__name__}: {e}'
+    res['seconds'] = round(time.perf_counter() - t0, 4)
+    return res
+
+
+def run_batch(root, out_dir=None, ndjson=None, workers=None, indent=None, log=None, use_cache=True,
+              fmt='json', bytes_encoding='hex'):
+    log = log or (lambda msg: print(msg, file=sys.stderr))
+    if not os.path.isfile(root):
+        # a missing or unreadable root raises here instead of counting 0 files
+        with os.scandir(root):
+            pass
+    base = root if os.path.isdir(root) else os.path.dirname(root)
+    jobs = []
+    for p in iter_ncs_files(root):
+        rel = os.path.relpath(p, base)
+        out_path = os.path.join(out_dir, rel + '.' + fmt) if out_dir else None
+        jobs.append((p, rel, out_path, indent, use_cache, fmt, bytes_encoding))
+
+    stream = None
+    if not out_dir:
+        stream = sys.stdout if ndjson in (None, '-') else open(ndjson, 'w', encoding='utf-8')
+
+    t0 = time.perf_counter()
+    done, failures, total_bytes = 0, [], 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk = max(1, min(64, len(jobs) // ((workers or os.cpu_count() or 1) * 8) or 1))
+            for res in pool.map(_parse_one, jobs, chunksize=chunk):
+                done += 1
+                if not res['ok']:
+                    failures.append(res)
+                    log(f"FAIL {res['file']}: {res['error']}")
+                    continue
+                total_bytes += res['size']
+                if stream is not None:
+                    stream.write(res['line'])
+                    stream.write('\n')
+    finally:
+        if stream is not None and stream is not sys.stdout:
+            stream.close()
+
+    elapsed = max(time.perf_counter() - t0, 1e-9)
+    summary = {
+        'files': done,
+        'failed': len(failures),
+        'seconds': round(elapsed, 3),
+        'files_per_sec': round(done / elapsed, 1),
+        'mb_per_sec': round(total_bytes / elapsed / (1 << 20), 2),
+        'failures': [{'file': f['file'], 'error': f['error']} for f in failures],
+    }
+    log(f"{summary['files']} files ({summary['failed']} failed) in {summary['seconds']}s, "
+        f"{summary['files_per_sec']} files/s, {summary['mb_per_sec']} MB/s")
+    return summary
@@ -0,0 +1,221 @@
+import os
+import zlib
+import marshal
+import hashlib
+import tempfile
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from .config import get_section
+from .record import Record
+from .source import as_source
+
+FORMAT = 1
+
+
+def default_cache_dir():
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ncs-reader', 'parse-cache')
+
+
+def content_hash(buf):
+    h = hashlib.blake2b(digest_size=20)
+    h.update(buf)
+    return h.hexdigest()
+
+
+def _pack(structured):
+    # records become (offset, length, assigned keys); everything derived from
+    # the bytes is recomputed lazily after loading
+    s = {k: (None if k == 'records' else v) for k, v in structured.items()}
+    recs = [(r.offset, r.length, r.extras()) if isinstance(r, Record) else dict(r)
+            for r in structured.get('records', [])]
+    return zlib.compress(marshal.dumps((FORMAT, s, recs)), 1)
+
+
+def _unpack(blob, parser, buf, views):
+    fmt, s, recs = marshal.loads(zlib.decompress(blob))
+    if fmt != FORMAT:
+        raise ValueError('stale cache entry')
+    records = []
+    for r in recs:
+        if isinstance(r, Mapping):
+            records.append(r)
+            continue
+        off, length, extra = r
+        rec = parser.make_record(buf, off, length, views)
+        if extra:
+            rec.update(extra)
+        records.append(rec)
+    s['records'] = records
+    return s
+
+
+class ParseCache:
+    # Content-addressed, on-disk cache of parse results. Entries are keyed by
+    # the file's hash plus the parser's cache tag, and the least recently used
+    # ones are deleted once the directory grows past max_bytes.
+    def __init__(self, directory=None, max_bytes=512 << 20):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = int(max_bytes)
+        self._total = None
+        self.hits = self.misses = 0
+
+    def key(self, buf, parser):
+        tag = hashlib.blake2b(parser.cache_tag().encode('utf-8'), digest_size=8).hexdigest()
+        return f'{content_hash(buf)}-{tag}'
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.bin')
+
+    def load(self, buf, parser, views=None, key=None):
+        key = key or self.key(buf, parser)
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+            structured = _unpack(blob, parser, buf, views)
+        except (OSError, ValueError, EOFError, TypeError, zlib.error):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return structured
+
+    def store(self, buf, parser, structured, key=None):
+        key = key or self.key(buf, parser)
+        path = self._path(key)
+        try:
+            blob = _pack(structured)
+        except ValueError:
+            # something in the result marshal can't represent; skip caching it
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # an entry being overwritten no longer counts toward the total
+        try:
+            old = os.stat(path).st_size
+        except OSError:
+            old = 0
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return False
+        if self._total is None:
+            self._total = sum(sz for _, sz, _ in self._entries())
+        else:
+            self._total += len(blob) - old
+        if self._total > self.max_bytes:
+            self.evict()
+        return True
+
+    def _entries(self):
+        for dirpath, _, files in os.walk(self.directory):
+            for f in files:
+                if not f.endswith('.bin'):
+                    continue
+                p = os.path.join(dirpath, f)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                yield p, st.st_size, st.st_mtime
+
+    def evict(self, target=None):
+        target = int(self.max_bytes * 0.9) if target is None else target
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(sz for _, sz, _ in entries)
+        for p, sz, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(p)
+                total -= sz
+            except OSError:
+                pass
+        self._total = total
+
+    def clear(self):
+        self.evict(target=0)
+
+    def parse(self, parser, source):
+        source = as_source(source)
+        buf = parser.read_file(source)
+        key = self.key(buf, parser)
+        views = parser.numeric_views(buf)
+        structured = self.load(buf, parser, views, key)
+        if structured is not None:
+            structured['file'] = source.name
+            return {'raw': buf, 'structured': structured, 'views': views}
+        res = parser.parse(source)
+        self.store(buf, parser, res['structured'], key)
+        return res
+
+
+class MemoryLRU:
+    # in-memory LRU bounded by the callers' approximate byte sizes; the most
+    # recently added entry is always kept even if it alone exceeds the limit
+    def __init__(self, max_bytes, on_evict=None):
+        self.max_bytes = int(max_bytes)
+        self.on_evict = on_evict
+        self._items = OrderedDict()
+        self.total = 0
+
+    def get(self, key, default=None):
+        item = self._items.get(key)
+        if item is None:
+            return default
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value, size):
+        self.pop(key)
+        self._items[key] = (value, size)
+        self.total += size
+        while self.total > self.max_bytes and len(self._items) > 1:
+            k, (v, sz) = self._items.popitem(last=False)
+            self.total -= sz
+            if self.on_evict:
+                self.on_evict(k, v)
+
+    def pop(self, key, default=None):
+        item = self._items.pop(key, None)
+        if item is None:
+            return default
+        self.total -= item[1]
+        if self.on_evict:
+            self.on_evict(key, item[0])
+        return item[0]
+
+    def clear(self):
+        for k in list(self._items):
+            self.pop(k)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+
+_default = None
+
+
+def default_cache():
+    global _default
+    if _default is None:
+        cfg = get_section('cache')
+        if not cfg.get('enabled', True):
+            _default = False
+        else:
+            _default = ParseCache(cfg.get('dir'), int(cfg.get('max_mb', 512)) << 20)
+    return _default
@@ -0,0 +1,53 @@
+import os
+import json
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+
+DEFAULTS = {
+    'theme': 'dark',
+    'segmentation': {
+        'strategy': 'auto',
+        'stride': 64,
+        'max_records': 20000,
+    },
+    'cache': {
+        'enabled': True,
+        'dir': None,
+        'max_mb': 512,
+    },
+    'export': {
+        # bytes fields: 'hex', 'base64' or 'off' (length only)
+        'bytes': 'hex',
+        'indent': 4,
+    },
+    'index': {
+        # strings/GUID index database; None puts it next to the parse cache
+        'path': None,
+    },
+}
+
+_loaded = None
+
+
+def load_config(path=None, reload=False):
+    global _loaded
+    if _loaded is not None and not reload and path is None:
+        return _loaded
+    cfg = {k: (dict(v) if isinstance(v, dict) else v) for k, v in DEFAULTS.items()}
+    try:
+        with open(path or CONFIG_PATH, 'r', encoding='utf-8') as f:
+            user = json.load(f)
+    except (OSError, ValueError):
+        user = {}
+    for k, v in user.items():
+        if isinstance(v, dict) and isinstance(cfg.get(k), dict):
+            cfg[k].update(v)
+        else:
+            cfg[k] = v
+    if path is None:
+        _loaded = cfg
+    return cfg
+
+
+def get_section(name):
+    return load_config().get(name) or {}
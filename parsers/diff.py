@@ -0,0 +1,197 @@
+import os
+import re
+import time
+from difflib import SequenceMatcher
+from concurrent.futures import ProcessPoolExecutor
+
+from . import parse_file
+from .batch import iter_ncs_files
+from .cache import content_hash
+from .generic import _record_at
+from .source import FileSource, as_view
+
+# Content-defined chunking: a byte is "selected" when its value is in a fixed
+# pseudo-random quarter of 0..255, and a chunk ends after every run of WINDOW
+# selected bytes. Boundaries depend only on the bytes around them, so an
+# insertion shifts the chunks after it instead of changing them all.
+WINDOW = 4
+MIN_CHUNK = 32
+MAX_CHUNK = 4096
+_MASK = bytes.maketrans(bytes(range(256)), bytes(1 if (b * 167 + 13) & 3 == 0 else 0 for b in range(256)))
+_RUN = re.compile(b'\x01{%d,}' % WINDOW)
+
+
+def chunk_bounds(buf):
+    # chunk end offsets; the last one is len(buf)
+    n = len(buf)
+    bounds = []
+    last = 0
+    for m in _RUN.finditer(bytes(buf).translate(_MASK)):
+        cut = m.end()
+        while cut - last > MAX_CHUNK:
+            last += MAX_CHUNK
+            bounds.append(last)
+        if cut - last >= MIN_CHUNK and cut < n:
+            bounds.append(cut)
+            last = cut
+    while n - last > MAX_CHUNK:
+        last += MAX_CHUNK
+        bounds.append(last)
+    if n > last:
+        bounds.append(n)
+    return bounds
+
+
+def chunks(buf):
+    # (offset, bytes) per chunk
+    out = []
+    start = 0
+    for end in chunk_bounds(buf):
+        out.append((start, bytes(buf[start:end])))
+        start = end
+    return out
+
+
+def _common_prefix(a, b):
+    # length of the common prefix of two buffers, by halving slice compares
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, limit):
+    lo, hi = 0, min(len(a), len(b), limit)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def diff_bytes(a, b):
+    # Changed ranges between two buffers as (op, a_start, a_end, b_start,
+    # b_end), op being 'replace', 'delete' or 'insert'. Chunks are aligned by
+    # content, then each differing run is trimmed to its first and last
+    # differing byte.
+    a, b = as_view(a), as_view(b)
+    ca, cb = chunks(a), chunks(b)
+    sm = SequenceMatcher(None, [c for _, c in ca], [c for _, c in cb], autojunk=False)
+    starts_a = [o for o, _ in ca] + [len(a)]
+    starts_b = [o for o, _ in cb] + [len(b)]
+    out = []
+    for tag, i0, i1, j0, j1 in sm.get_opcodes():
+        if tag == 'equal':
+            continue
+        a0, a1, b0, b1 = starts_a[i0], starts_a[i1], starts_b[j0], starts_b[j1]
+        pre = _common_prefix(a[a0:a1], b[b0:b1])
+        a0, b0 = a0 + pre, b0 + pre
+        suf = _common_suffix(a[a0:a1], b[b0:b1], min(a1 - a0, b1 - b0))
+        a1, b1 = a1 - suf, b1 - suf
+        if a1 == a0 and b1 == b0:
+            continue
+        op = 'replace' if a1 > a0 and b1 > b0 else 'delete' if a1 > a0 else 'insert'
+        out.append((op, a0, a1, b0, b1))
+    return out
+
+
+def _touched(records, start, end):
+    # indexes of the records overlapping [start, end); an empty range gives
+    # the record it falls in (an insertion point)
+    i = _record_at(records, start)
+    hits = []
+    while i < len(records) and (records[i]['offset'] < end or (start == end and not hits)):
+        hits.append(i)
+        i += 1
+    return hits
+
+
+def _record_refs(records, indexes):
+    return [{'index': i, 'offset': records[i]['offset'], 'length': records[i]['length']} for i in indexes]
+
+
+def diff_files(path_a, path_b, records=True):
+    # Diff of two files as a JSON-ready dict. With records, every change lists
+    # the records of each side it touches (as segmented by the detected parser).
+    with FileSource(path_a) as sa, FileSource(path_b) as sb:
+        changes = diff_bytes(sa.buffer, sb.buffer)
+        out = {'a': path_a, 'b': path_b, 'a_size': sa.size, 'b_size': sb.size,
+               'identical': not changes and sa.size == sb.size, 'changes': []}
+        rec_a = rec_b = None
+        if records and changes:
+            pa, res_a = parse_file(sa)
+            pb, res_b = parse_file(sb)
+            rec_a = res_a['structured'].get('records', [])
+            rec_b = res_b['structured'].get('records', [])
+            out['parser'] = type(pb).__name__
+        changed_a, changed_b = set(), set()
+        for op, a0, a1, b0, b1 in changes:
+            c = {'op': op, 'a_offset': a0, 'a_length': a1 - a0, 'b_offset': b0, 'b_length': b1 - b0}
+            if rec_a is not None:
+                ia, ib = _touched(rec_a, a0, a1), _touched(rec_b, b0, b1)
+                c['a_records'] = _record_refs(rec_a, ia)
+                c['b_records'] = _record_refs(rec_b, ib)
+                changed_a.update(ia)
+                changed_b.update(ib)
+            out['changes'].append(c)
+        if rec_a is not None:
+            out['changed_records'] = {'a': len(changed_a), 'b': len(changed_b),
+                                      'a_total': len(rec_a), 'b_total': len(rec_b)}
+    return out
+
+
+def _diff_one(job):
+    path_a, path_b, rel, records = job
+    try:
+        if os.path.getsize(path_a) == os.path.getsize(path_b):
+            with FileSource(path_a) as sa, FileSource(path_b) as sb:
+                if content_hash(sa.buffer) == content_hash(sb.buffer):
+                    return rel, None, None
+        d = diff_files(path_a, path_b, records)
+        d['file'] = rel
+        return rel, d, None
+    except Exception as e:
+        return rel, None, f'{type(e).__name__}: {e}'
+
+
+def diff_folders(root_a, root_b, workers=None, records=True, log=None, mp_context=None):
+    # Files only in one tree are listed as added/removed; files in both are
+    # compared in parallel, byte-identical ones (same size and hash) skipped.
+    # Callers on a thread (the GUI) should pass a spawn mp_context.
+    log = log or (lambda msg: None)
+    t0 = time.perf_counter()
+    files_a = {os.path.relpath(p, root_a): p for p in iter_ncs_files(root_a)}
+    files_b = {os.path.relpath(p, root_b): p for p in iter_ncs_files(root_b)}
+    common = sorted(set(files_a) & set(files_b))
+    jobs = [(files_a[rel], files_b[rel], rel, records) for rel in common]
+    changed, failed = [], []
+    unchanged = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+        chunk = max(1, min(64, len(jobs) // ((workers or os.cpu_count() or 1) * 8) or 1))
+        for rel, d, error in pool.map(_diff_one, jobs, chunksize=chunk):
+            if error:
+                failed.append({'file': rel, 'error': error})
+                log(f'FAIL {rel}: {error}')
+            elif d is None or d['identical']:
+                unchanged += 1
+            else:
+                changed.append(d)
+    out = {
+        'a': root_a,
+        'b': root_b,
+        'added': sorted(set(files_b) - set(files_a)),
+        'removed': sorted(set(files_a) - set(files_b)),
+        'unchanged': unchanged,
+        'changed': changed,
+        'failed': failed,
+        'seconds': round(time.perf_counter() - t0, 3),
+    }
+    log(f"{len(common)} common files: {len(changed)} changed, {unchanged} unchanged, {len(failed)} failed; "
+        f"{len(out['added'])} added, {len(out['removed'])} removed in {out['seconds']}s")
+    return out
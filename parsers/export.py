@@ -0,0 +1,138 @@
+import json
+import base64
+from collections.abc import Mapping
+
+from .record import Record
+
+BYTES_ENCODINGS = ('hex', 'base64', 'off')
+# lists longer than this are written element by element
+STREAM_MIN = 64
+
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+_SCALARS = {str, int, float, bool, type(None)}
+
+
+def safe_convert(obj):
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        b = bytes(obj)
+        return {'_type': 'bytes', 'length': len(b), 'hex': b.hex(), 'ascii': ''.join(chr(x) if 32 <= x < 127 else '.' for x in b[:256])}
+    if isinstance(obj, Mapping):
+        return {k: safe_convert(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [safe_convert(x) for x in obj]
+    return obj
+
+
+def encode_bytes(b, encoding='hex'):
+    out = {'_type': 'bytes', 'length': len(b)}
+    if encoding == 'hex':
+        out['hex'] = bytes(b).hex()
+    elif encoding == 'base64':
+        out['base64'] = base64.b64encode(b).decode('ascii')
+    elif encoding != 'off':
+        raise ValueError(f'unknown bytes encoding {encoding!r}')
+    return out
+
+
+def decode_bytes(value):
+    # inverse of encode_bytes (and safe_convert); None when the value holds no bytes
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    if isinstance(value, Mapping) and value.get('_type') == 'bytes':
+        if 'hex' in value:
+            return bytes.fromhex(value['hex'])
+        if 'base64' in value:
+            return base64.b64decode(value['base64'])
+    return None
+
+
+def convert(obj, bytes_encoding='hex'):
+    # JSON-ready copy of one value; bytes become {'_type': 'bytes', ...}
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return encode_bytes(obj, bytes_encoding)
+    if isinstance(obj, Mapping):
+        return {k: convert(v, bytes_encoding) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [x if type(x) in _SCALARS else convert(x, bytes_encoding) for x in obj]
+    return obj
+
+
+def _streamable(obj):
+    if isinstance(obj, (list, tuple)):
+        return len(obj) > STREAM_MIN
+    if isinstance(obj, Record):
+        # derived values are per-segment and small; don't compute them here
+        obj = obj.extras()
+    if isinstance(obj, Mapping):
+        return any(_streamable(v) for v in obj.values() if isinstance(v, (list, tuple, Mapping)))
+    return False
+
+
+def _dumps(value, indent, level):
+    s = json.dumps(value, indent=indent, ensure_ascii=False)
+    if indent and level:
+        # JSON strings never contain a raw newline, so this only re-indents
+        s = s.replace('\n', '\n' + ' ' * (indent * level))
+    return s
+
+
+def _release(value):
+    # drop a record's lazily computed values once written
+    if isinstance(value, Record):
+        value.invalidate()
+
+
+def iter_json(obj, indent=None, bytes_encoding='hex', level=0):
+    # JSON text in chunks. Large lists are emitted one element at a time and
+    # keys holding them come last, so headers and metadata lead the output
+    # and memory stays bounded by the largest single element.
+    if not _streamable(obj):
+        yield _dumps(convert(obj, bytes_encoding), indent, level)
+        return
+    nl = '\n' + ' ' * (indent * (level + 1)) if indent else ''
+    end = '\n' + ' ' * (indent * level) if indent else ''
+    sep = ',' if indent else ', '
+    if isinstance(obj, Mapping):
+        items = list(obj.items())
+        items = [kv for kv in items if not _streamable(kv[1])] + [kv for kv in items if _streamable(kv[1])]
+        yield '{'
+        for i, (k, v) in enumerate(items):
+            yield (sep if i else '') + nl + json.dumps(str(k), ensure_ascii=False) + ': '
+            yield from iter_json(v, indent, bytes_encoding, level + 1)
+        yield end + '}'
+    else:
+        parts = ['[']
+        for i, v in enumerate(obj):
+            if i:
+                parts.append(sep)
+            parts.append(nl)
+            if v is None or isinstance(v, (str, int, float)):
+                parts.append(_encode(v))
+            else:
+                parts.extend(iter_json(v, indent, bytes_encoding, level + 1))
+                _release(v)
+            if len(parts) >= 4096:
+                yield ''.join(parts)
+                parts = []
+        parts.append(end + ']')
+        yield ''.join(parts)
+
+
+def write_json(obj, fp, indent=None, bytes_encoding='hex'):
+    for chunk in iter_json(obj, indent, bytes_encoding):
+        fp.write(chunk)
+
+
+def write_ndjson(structured, fp, bytes_encoding='hex', head=None):
+    # first line: everything but the records (plus record_count), then one
+    # line per record
+    records = structured.get('records', [])
+    header = {k: v for k, v in structured.items() if k != 'records'}
+    header.update(head or {})
+    header['record_count'] = len(records)
+    fp.write(json.dumps(convert(header, bytes_encoding), ensure_ascii=False))
+    fp.write('\n')
+    for rec in records:
+        fp.write(json.dumps(convert(rec, bytes_encoding), ensure_ascii=False))
+        fp.write('\n')
+        _release(rec)
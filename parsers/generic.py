@@ -1,109 +1,319 @@
-import os
-from .base import BaseParser
+from bisect import bisect_left
+from collections.abc import Mapping
+from .base import BaseParser, as_view
+from .export import decode_bytes
+from .record import Record
+from .scanner import STRING, ASCII, GUID
+from .segmentation import make_segmenter
+from .stride import detect_stride
+from .source import source_name
 
 class GenericParser(BaseParser):
+    # strategy name or options dict merged over config.json's "segmentation"
+    segmentation = None
+
     @staticmethod
     def can_parse(filename: str, raw: bytes) -> bool:
         return True
 
     def parse_bytes(self, raw: bytes):
+        raw = as_view(raw)
+        header = self.read_header(raw)
+
+        tokens = self.scan_tokens(raw, min_string=3, min_ascii=4)
+        strings = [(t.offset, t.text) for t in tokens if t.kind == STRING]
+        ascii_tokens = [t for t in tokens if t.kind == ASCII]
+        ascii_runs = [t.text for t in ascii_tokens]
+        guids = self.extract_guids(raw, tokens)
+        views = self.numeric_views(raw)
+        i32, u32, f32 = self.ints_uints_floats(raw, offset=0, max_items=128)
+
+        guid_occ = self.find_guid_occurrences(raw, guids, tokens)
+        layout = self.detect_layout(raw)
+        records, segmentation = self.segment_records(raw, tokens, guid_occ, layout, views)
+        self.assign_guids(records, guid_occ)
+
+        guessed = {}
+        if layout:
+            guessed['record_stride'] = layout.stride
+            guessed['header_size'] = layout.header
+            guessed['record_count'] = layout.count
+            guessed['stride_confidence'] = layout.confidence
+
+        structured = {
+            'file': None,
+            'size': len(raw),
+            'header': header,
+            'records': records,
+            'strings': [s for _,s in strings] + ascii_runs,
+            'guids': guids,
+            'guessed': guessed,
+            'metadata': {
+                'entropy': self.entropy(raw),
+                'string_count': len(strings) + len(ascii_runs),
+                'guid_count': len(guids),
+                'int_preview': i32[:32],
+                'float_preview': f32[:32],
+                'segmentation': segmentation,
+            }
+        }
+        self.guess(structured, raw)
+        return {'raw': raw, 'structured': structured, 'views': views}
+
+    def guess(self, structured, raw):
+        # Hook for parser-specific entries in structured['guessed'] (and the
+        # header); runs after every parse and incremental reparse.
+        pass
+
+    def read_header(self, raw):
         header = {}
         if len(raw) >= 4:
-            header['magic'] = raw[:4].decode('ascii', errors='replace').strip('\x00')
+            header['magic'] = str(raw[:4], 'ascii', errors='replace').strip('\x00')
         if len(raw) >= 8:
             header['uint32_at_4'] = int.from_bytes(raw[4:8], 'little')
+        return header
 
-        strings = self.extract_null_strings(raw, min_len=3)
-        ascii_runs = self.find_ascii_runs(raw, min_len=4)
-        guids = self.extract_guids(raw)
-        i32, u32, f32 = self.ints_uints_floats(raw, offset=0, max_items=128)
+    def reparse(self, res, data, start, end):
+        # Update a parse result after bytes [start, end) of `data` were
+        # overwritten in place. Record boundaries are kept; only records near
+        # the edit and the tokens around it are recomputed. Returns
+        # (res, changed record indices), or (full parse, None) if the size
+        # changed. `data` only needs len() and slicing (e.g. a PieceTable).
+        # The stride guess behind the boundaries is kept as well; guess()
+        # refreshes everything else in structured['guessed'].
+        s = res['structured']
+        records = s.get('records', [])
+        if len(data) != s.get('size') or not records:
+            full = self.parse_bytes(data[0:len(data)])
+            full['structured']['file'] = s.get('file')
+            return full, None
+        start, end = max(0, start), min(len(data), end)
+        state = res.get('incremental')
+        if state is None:
+            state = res['incremental'] = self._incremental_state(res)
+        buf = res['raw'].obj
+        new = data[start:end]
+        hist = state['hist']
+        for x in buf[start:end]:
+            hist[x] -= 1
+        for x in new:
+            hist[x] += 1
+        buf[start:end] = new
+
+        # every token lies between two NULs, so rescan the NUL-free span around the edit
+        a = buf.rfind(b'\0', 0, start) + 1
+        b = buf.find(b'\0', end)
+        b = len(buf) if b < 0 else b
+        fresh = {STRING: ([], []), ASCII: ([], []), GUID: ([], [])}
+        for t in self.scan_tokens(bytes(buf[a:b]), min_string=3, min_ascii=4):
+            fresh[t.kind][0].append(t.offset + a)
+            fresh[t.kind][1].append(t.text)
+        guids = s.get('guids', [])
+        for kind, (offs, texts) in state['tokens'].items():
+            lo, hi = bisect_left(offs, a), bisect_left(offs, b)
+            if kind == GUID and (lo < hi or fresh[GUID][0]):
+                # first-appearance order may have changed
+                guids = None
+            offs[lo:hi], texts[lo:hi] = fresh[kind]
+        strings = state['tokens'][STRING][1]
+        ascii_runs = state['tokens'][ASCII][1]
+        goffs, gtexts = state['tokens'][GUID]
+
+        g0, g1 = max(0, min(a, start - 15)), max(b, end)
+        guid_occ = state['guid_occ']
+        old_guids = s.get('guids', [])
+        if guids is None:
+            guids = list(dict.fromkeys(gtexts))
+        if set(guids) != set(old_guids):
+            # binary occurrences of a new or vanished GUID can be anywhere
+            textual = [(o, 32, g) for o, g in zip(goffs, gtexts)]
+            guid_occ[:] = sorted(self.find_guid_occurrences(res['raw'], guids, []) + textual)
+            g0, g1 = 0, len(buf)
+        else:
+            near = [(o + g0, n, g) for o, n, g in self.find_guid_occurrences(bytes(buf[g0:g1 + 15]), guids, [])
+                    if o + g0 < g1]
+            lo, hi = bisect_left(goffs, g0), bisect_left(goffs, g1)
+            near += [(o, 32, g) for o, g in zip(goffs[lo:hi], gtexts[lo:hi])]
+            gpos = state['guid_pos']
+            lo, hi = bisect_left(gpos, g0), bisect_left(gpos, g1)
+            guid_occ[lo:hi] = near = sorted(near)
+            gpos[lo:hi] = [o for o, _, _ in near]
+        if g0 == 0 and g1 == len(buf):
+            state['guid_pos'] = [o for o, _, _ in guid_occ]
+
+        first = _record_at(records, g0)
+        changed = []
+        for i in range(first, len(records)):
+            rec = records[i]
+            if rec['offset'] >= g1:
+                break
+            if hasattr(rec, 'invalidate'):
+                rec.invalidate()
+            changed.append(i)
+        self.assign_guids([records[i] for i in changed], guid_occ)
 
-        cand = set([0, len(raw)])
-        for off, s in strings:
-            cand.add(off); cand.add(off+len(s))
-        for s in ascii_runs:
-            try:
-                o = raw.find(s.encode('utf-8'))
-                if o >= 0:
-                    cand.add(o); cand.add(o+len(s))
-            except Exception:
-                pass
-        for g in guids:
-            try:
-                pos = raw.find(bytes.fromhex(g))
-                if pos >= 0:
-                    cand.add(pos); cand.add(pos+16)
-            except Exception:
-                pass
-
-        if len(raw) > 512:
-            for step in (16,32,64):
-                if len(raw) // step > 2:
-                    for i in range(0, len(raw), step):
-                        cand.add(i); cand.add(min(i+step, len(raw)))
+        s['strings'] = strings + ascii_runs
+        s['guids'] = guids
+        if start < 8:
+            s['header'].update(self.read_header(res['raw']))
+        meta = s['metadata']
+        meta['entropy'] = self.entropy(res['raw'], hist)
+        meta['string_count'] = len(strings) + len(ascii_runs)
+        meta['guid_count'] = len(guids)
+        if start < 512:
+            i32, _, f32 = self.ints_uints_floats(res['raw'], offset=0, max_items=128)
+            meta['int_preview'], meta['float_preview'] = i32[:32], f32[:32]
+        self.guess(s, res['raw'])
+        return res, changed
+
+    def _incremental_state(self, res):
+        # Move the result onto a private writable copy (records and views are
+        # rebound once) and rebuild what parse_bytes doesn't keep.
+        buf = bytearray(res['raw'])
+        raw = as_view(buf)
+        views = self.numeric_views(raw)
+        for rec in res['structured'].get('records', []):
+            if hasattr(rec, 'rebind'):
+                rec.rebind(raw, views)
+        res['raw'], res['views'] = raw, views
+        tokens = self.scan_tokens(raw, min_string=3, min_ascii=4)
+        guids = self.extract_guids(raw, tokens)
+        guid_occ = self.find_guid_occurrences(raw, guids, tokens)
+        # (offsets, texts) per token kind, each sorted by offset
+        by_kind = {STRING: ([], []), ASCII: ([], []), GUID: ([], [])}
+        for t in tokens:
+            by_kind[t.kind][0].append(t.offset)
+            by_kind[t.kind][1].append(t.text)
+        return {'tokens': by_kind, 'guid_occ': guid_occ,
+                'guid_pos': [o for o, _, _ in guid_occ], 'hist': self.byte_histogram(raw)}
+
+    def segment_records(self, raw, tokens, guid_occ, layout, views):
+        segmenter = self.segmenter()
+        cand = segmenter.boundaries(raw, tokens, guid_occ, layout, layout_known=True)
         offsets = sorted([o for o in cand if 0<=o<=len(raw)])
         merged = []
         for o in offsets:
             if not merged or o - merged[-1] > 2:
                 merged.append(o)
-        offsets = merged
+        offsets = segmenter.limit(merged)
 
         records = []
         for i in range(len(offsets)-1):
             a = offsets[i]; b = offsets[i+1]
             if a>=b: continue
-            rec = self.make_record(raw, a, b-a)
+            rec = self.make_record(raw, a, b-a, views)
             rec['type'] = 'segment'
-            rec['guids'] = [g for g in guids if raw.find(bytes.fromhex(g))>=a and raw.find(bytes.fromhex(g))<b]
             records.append(rec)
 
         if not records:
-            rec = self.make_record(raw, 0, len(raw))
+            rec = self.make_record(raw, 0, len(raw), views)
             rec['type']='full'
             records.append(rec)
+        return records, segmenter.describe()
 
-        structured = {
-            'file': None,
-            'size': len(raw),
-            'header': header,
-            'records': records,
-            'strings': [s for _,s in strings] + ascii_runs,
-            'guids': guids,
-            'metadata': {
-                'entropy': self.entropy(raw),
-                'string_count': len(strings) + len(ascii_runs),
-                'guid_count': len(guids),
-                'int_preview': i32[:32],
-                'float_preview': f32[:32]
-            }
-        }
-        return {'raw': raw, 'structured': structured}
+    def assign_guids(self, records, guid_occ):
+        guid_pos = [o for o, _, _ in guid_occ]
+        for rec in records:
+            a = rec.offset; b = a + rec.length
+            lo = bisect_left(guid_pos, a); hi = bisect_left(guid_pos, b, lo)
+            rec['guids'] = [g for _, _, g in guid_occ[lo:hi]]
+            rec['guid_offsets'] = guid_pos[lo:hi]
+
+    def detect_layout(self, raw):
+        return detect_stride(raw)
+
+    def segmenter(self):
+        return make_segmenter(self.segmentation)
+
+    def cache_tag(self):
+        return f"{super().cache_tag()}/{self.segmenter().describe()}"
 
     def parse(self, filepath: str):
         raw = self.read_file(filepath)
         res = self.parse_bytes(raw)
-        res['structured']['file'] = os.path.basename(filepath)
+        res['structured']['file'] = source_name(filepath)
         return res
 
-    def to_bytes(self, data) -> bytes:
-        if isinstance(data, (bytes, bytearray)):
+    def to_bytes(self, data, original=None) -> bytes:
+        # Rebuild the file from a parse result or (edited) structured JSON.
+        # Starts from the original buffer and splices in only the records
+        # whose bytes changed, in offset order: O(file size + edits).
+        if isinstance(data, (bytes, bytearray, memoryview)):
             return bytes(data)
-        if isinstance(data, dict) and 'raw' in data and isinstance(data['raw'], (bytes, bytearray)):
-            return data['raw']
-        recs = None
-        if isinstance(data, dict) and 'structured' in data:
-            recs = data['structured'].get('records', [])
-        elif isinstance(data, dict) and 'records' in data:
-            recs = data.get('records', [])
+        if not isinstance(data, Mapping):
+            raise ValueError('Cannot build bytes from provided structured data')
+        structured = data.get('structured', data)
+        if original is None:
+            original = data.get('raw')
+        records = structured.get('records') or []
+        if original is None:
+            return self._join_records(records)
+        original = as_view(original)
+        edits = []
+        for rec in records:
+            new = self.record_bytes(rec, original, structured)
+            if new is not None:
+                edits.append((rec['offset'], rec['length'], new))
+        edits.sort(key=lambda e: (e[0], e[1]))
         out = bytearray()
-        if recs:
-            for r in recs:
-                hx = r.get('raw_hex', '')
-                if hx:
-                    try:
-                        out += bytes.fromhex(hx.replace(' ', ''))
-                    except Exception:
-                        pass
-        if out:
-            return bytes(out)
-        raise ValueError('Cannot build bytes from provided structured data')
+        pos = 0
+        for off, length, new in edits:
+            if off < pos:
+                raise ValueError(f'edited records overlap at offset {off}')
+            if off + length > len(original):
+                raise ValueError(f'edited record at offset {off} runs past the end of the file')
+            out += original[pos:off]
+            out += new
+            pos = off + length
+        out += original[pos:]
+        return bytes(out)
+
+    def record_bytes(self, rec, original, structured=None):
+        # the bytes an edited record asks for, or None if it is unchanged
+        off, length = rec['offset'], rec['length']
+        old = bytes(original[off:off + length])
+        # a live Record's own values come from the buffer; only assigned ones count
+        src = rec.extras() if isinstance(rec, Record) else rec
+        found = {b for b in self.record_candidates(rec, src, old, structured) if b is not None and b != old}
+        if len(found) > 1:
+            raise ValueError(f'conflicting edits in record at offset {off}')
+        return found.pop() if found else None
+
+    def record_candidates(self, rec, src, old, structured):
+        if 'raw_bytes' in src:
+            yield decode_bytes(src['raw_bytes'])
+        hx = src.get('raw_hex')
+        if isinstance(hx, str) and hx:
+            b = bytes.fromhex(hx)
+            # raw_hex is cut at 1024 bytes; the rest is unchanged
+            yield b + old[len(b):] if len(b) < len(old) else b
+
+    def _join_records(self, records):
+        # no original: the records must tile the file and carry all their bytes
+        out = bytearray()
+        for rec in sorted(records, key=lambda r: r['offset']):
+            if rec['offset'] != len(out):
+                raise ValueError(f'records leave a gap or overlap at offset {len(out)}; the original file is needed')
+            b = decode_bytes(rec.get('raw_bytes'))
+            if b is None:
+                hx = rec.get('raw_hex') or ''
+                b = bytes.fromhex(hx)
+            if len(b) != rec['length']:
+                raise ValueError(f'record at offset {rec["offset"]} has incomplete bytes; the original file is needed')
+            out += b
+        if not out:
+            raise ValueError('Cannot build bytes from provided structured data')
+        return bytes(out)
+
+
+def _record_at(records, offset):
+    # index of the first record ending after offset (records are sorted)
+    lo, hi = 0, len(records)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        r = records[mid]
+        if r['offset'] + r['length'] <= offset:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
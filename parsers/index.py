@@ -0,0 +1,227 @@
+import os
+import re
+import sqlite3
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from . import get_parser_for
+from .batch import iter_ncs_files
+from .cache import default_cache_dir
+from .config import get_section
+from .scanner import STRING, ASCII
+from .source import FileSource
+
+# bump when the tables or what goes into them change; older indexes are rebuilt
+VERSION = 1
+# files written per transaction while updating
+COMMIT_EVERY = 64
+
+Hit = namedtuple('Hit', 'path offset kind text')
+
+_GUID = re.compile(r'[{(]?([0-9A-Fa-f]{8})-?([0-9A-Fa-f]{4})-?([0-9A-Fa-f]{4})-?([0-9A-Fa-f]{4})-?([0-9A-Fa-f]{12})[})]?')
+
+_TABLES = '''
+CREATE TABLE IF NOT EXISTS files(id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL,
+                                 size INTEGER, mtime_ns INTEGER, parser TEXT, error TEXT);
+CREATE TABLE IF NOT EXISTS guids(guid BLOB NOT NULL, file_id INTEGER NOT NULL, offset INTEGER, length INTEGER);
+CREATE INDEX IF NOT EXISTS guids_guid ON guids(guid);
+CREATE INDEX IF NOT EXISTS guids_file ON guids(file_id);
+'''
+
+
+def default_index_path():
+    cfg = get_section('index')
+    return cfg.get('path') or os.path.join(os.path.dirname(default_cache_dir()), 'index.sqlite')
+
+
+def parse_guid(text):
+    # 16 raw bytes for a GUID written as 32 hex digits (dashes/braces allowed), else None
+    m = _GUID.fullmatch(text.strip())
+    return bytes.fromhex(''.join(m.groups())) if m else None
+
+
+def extract(path):
+    # (strings, guid occurrences) for one file, from the parser's own token scan.
+    # Strings are kept once per file with their first offset and count.
+    with FileSource(path) as src:
+        parser = get_parser_for(src)
+        raw = parser.read_file(src)
+        tokens = parser.scan_tokens(raw, min_string=3, min_ascii=4)
+        strings = {}
+        for t in tokens:
+            if t.kind == ASCII or (t.kind == STRING and t.text.isprintable()):
+                s = strings.get(t.text)
+                strings[t.text] = [t.offset, 1] if s is None else [s[0], s[1] + 1]
+        guids = parser.extract_guids(raw, tokens)
+        occ = [(bytes.fromhex(g), off, n) for off, n, g in parser.find_guid_occurrences(raw, guids, tokens)]
+        return {'size': src.size, 'mtime_ns': src.mtime_ns, 'parser': type(parser).__name__,
+                'strings': [(off, n, text) for text, (off, n) in strings.items()], 'guids': occ}
+
+
+def _extract_one(path):
+    try:
+        return path, extract(path), None
+    except Exception as e:
+        return path, None, f'{type(e).__name__}: {e}'
+
+
+class CorpusIndex:
+    # SQLite index of the strings and GUIDs in every file under one or more
+    # dump folders. Strings go into an FTS5 table (trigram tokenizer, so any
+    # substring of 3+ characters matches); GUIDs map to (file, offset). Files
+    # are re-extracted only when their size or mtime changed.
+    def __init__(self, path=None):
+        self.path = path or default_index_path()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self._create()
+
+    def _create(self):
+        db = self.db
+        if db.execute('PRAGMA user_version').fetchone()[0] != VERSION:
+            db.executescript('DROP TABLE IF EXISTS strings; DROP TABLE IF EXISTS guids; DROP TABLE IF EXISTS files;')
+        # a file's strings get rowids (file id << 32) + n, so they are
+        # dropped with one rowid range delete
+        columns = 'text, offset UNINDEXED, count UNINDEXED'
+        try:
+            db.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS strings USING fts5({columns}, tokenize='trigram')")
+            self.trigram = True
+        except sqlite3.OperationalError:
+            # SQLite < 3.34: whole-word matching only
+            db.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS strings USING fts5({columns})')
+            self.trigram = False
+        db.executescript(_TABLES)
+        db.execute(f'PRAGMA user_version={VERSION}')
+        db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+    def _forget(self, file_id):
+        self.db.execute('DELETE FROM strings WHERE rowid BETWEEN ? AND ?', (file_id << 32, (file_id << 32) | 0xFFFFFFFF))
+        self.db.execute('DELETE FROM guids WHERE file_id = ?', (file_id,))
+
+    def _store(self, path, info, error, st=None):
+        db = self.db
+        row = db.execute('SELECT id FROM files WHERE path = ?', (path,)).fetchone()
+        if row:
+            self._forget(row[0])
+        if info is None:
+            # remember the failure so the file is retried only once it changes
+            size, mtime_ns = (st.st_size, st.st_mtime_ns) if st else (None, None)
+            info = {'size': size, 'mtime_ns': mtime_ns, 'parser': None, 'strings': [], 'guids': []}
+        values = (info['size'], info['mtime_ns'], info['parser'], error)
+        if row:
+            file_id = row[0]
+            db.execute('UPDATE files SET size = ?, mtime_ns = ?, parser = ?, error = ? WHERE id = ?', values + (file_id,))
+        else:
+            file_id = db.execute('INSERT INTO files(size, mtime_ns, parser, error, path) VALUES (?, ?, ?, ?, ?)',
+                                 values + (path,)).lastrowid
+        db.executemany('INSERT INTO strings(rowid, offset, count, text) VALUES (?, ?, ?, ?)',
+                       (((file_id << 32) | i, off, n, text) for i, (off, n, text) in enumerate(info['strings'])))
+        db.executemany('INSERT INTO guids(guid, file_id, offset, length) VALUES (?, ?, ?, ?)',
+                       ((g, file_id, off, n) for g, off, n in info['guids']))
+
+    def update(self, root, workers=None, log=None, mp_context=None):
+        # bring the index in line with the .ncs files under root: new and
+        # changed files are extracted (in parallel), deleted ones dropped;
+        # callers on a thread (the GUI) should pass a spawn mp_context
+        log = log or (lambda msg: None)
+        t0 = time.perf_counter()
+        root = os.path.abspath(root)
+        paths = [os.path.abspath(p) for p in iter_ncs_files(root)]
+        prefix = root if os.path.isfile(root) else os.path.join(root, '')
+        known = {p: (i, size, mtime) for i, p, size, mtime in
+                 self.db.execute('SELECT id, path, size, mtime_ns FROM files')
+                 if p == root or p.startswith(prefix)}
+        todo, stats = [], {}
+        for p in paths:
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            k = known.get(p)
+            if k is None or (k[1], k[2]) != (st.st_size, st.st_mtime_ns):
+                todo.append(p)
+                stats[p] = st
+        current = set(paths)
+        removed = [(p, k[0]) for p, k in known.items() if p not in current]
+        for _, file_id in removed:
+            self._forget(file_id)
+            self.db.execute('DELETE FROM files WHERE id = ?', (file_id,))
+        self.db.commit()
+
+        failed = 0
+        if len(todo) > 1 and workers != 1:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp_context)
+            results = pool.map(_extract_one, todo, chunksize=max(1, min(32, len(todo) // 64)))
+        else:
+            pool = None
+            results = map(_extract_one, todo)
+        try:
+            for n, (path, info, error) in enumerate(results, 1):
+                if error:
+                    failed += 1
+                    log(f'FAIL {path}: {error}')
+                self._store(path, info, error, stats.get(path))
+                if n % COMMIT_EVERY == 0:
+                    self.db.commit()
+                    log(f'indexed {n}/{len(todo)}')
+        finally:
+            self.db.commit()
+            if pool is not None:
+                pool.shutdown()
+        summary = {
+            'files': len(paths),
+            'indexed': len(todo),
+            'unchanged': len(paths) - len(todo),
+            'removed': len(removed),
+            'failed': failed,
+            'seconds': round(time.perf_counter() - t0, 3),
+        }
+        log(f"{summary['files']} files: {summary['indexed']} indexed, {summary['unchanged']} unchanged, "
+            f"{summary['removed']} removed, {summary['failed']} failed in {summary['seconds']}s")
+        return summary
+
+    def find_guid(self, guid, limit=None):
+        g = parse_guid(guid) if isinstance(guid, str) else bytes(guid)
+        if g is None:
+            return []
+        sql = ('SELECT f.path, g.offset, g.length FROM guids g JOIN files f ON f.id = g.file_id '
+               'WHERE g.guid = ? ORDER BY f.path, g.offset')
+        rows = self.db.execute(sql + (' LIMIT ?' if limit else ''), (g, limit) if limit else (g,))
+        return [Hit(path, off, 'guid' if n == 16 else 'guid text', g.hex().upper()) for path, off, n in rows]
+
+    def search(self, text, limit=200):
+        # strings containing `text` (case-insensitive); one hit per file and string
+        text = text.strip()
+        if not text or (self.trigram and len(text) < 3):
+            return []
+        rows = self.db.execute('SELECT rowid >> 32, offset, text FROM strings WHERE strings MATCH ? LIMIT ?',
+                               ('"' + text.replace('"', '""') + '"', limit)).fetchall()
+        paths = self._paths({file_id for file_id, _, _ in rows})
+        return [Hit(paths[file_id], off, 'string', s) for file_id, off, s in rows]
+
+    def _paths(self, ids):
+        ids = list(ids)
+        q = f"SELECT id, path FROM files WHERE id IN ({','.join('?' * len(ids))})"
+        return dict(self.db.execute(q, ids)) if ids else {}
+
+    def lookup(self, query, limit=200):
+        # GUID-shaped queries hit the GUID table, everything else the strings
+        if parse_guid(query) is not None:
+            return self.find_guid(query, limit)
+        return self.search(query, limit)
@@ -1,22 +1,17 @@
-import os
-from .generic import GenericParser
+from .schema import Schema, SchemaParser
 
-class InvNamePartParser(GenericParser):
-    @staticmethod
-    def can_parse(filename: str, raw: bytes) -> bool:
-        return 'inv_name_part' in os.path.basename(filename).lower()
+class InvNamePartParser(SchemaParser):
+    schema = Schema('InvNamePartParser', ['inv_name_part'])
 
-    def parse_bytes(self, raw: bytes):
-        res = super().parse_bytes(raw)
-        s = res['structured']
-        s.setdefault('guessed', {})
+    def guess(self, s, raw):
+        super().guess(s, raw)
+        # reparse passes the previous result back in: drop guesses whose source is gone
+        guessed = s['guessed']
         if s.get('strings'):
-            s['guessed']['display_name'] = max(s['strings'], key=len)
+            guessed['display_name'] = max(s['strings'], key=len)
+        else:
+            guessed.pop('display_name', None)
         if s.get('guids'):
-            s['guessed']['primary_guid'] = s['guids'][0]
-        return res
-
-    def to_bytes(self, data):
-        if isinstance(data, dict) and 'raw' in data:
-            return data['raw']
-        return super().to_bytes(data)
+            guessed['primary_guid'] = s['guids'][0]
+        else:
+            guessed.pop('primary_guid', None)
@@ -1,22 +1,10 @@
-import os
-from .generic import GenericParser
+from .schema import Schema, SchemaParser
 
-class LootConfigParser(GenericParser):
-    @staticmethod
-    def can_parse(filename: str, raw: bytes) -> bool:
-        n = os.path.basename(filename).lower()
-        return 'loot_config' in n or 'loot' in n
+class LootConfigParser(SchemaParser):
+    schema = Schema('LootConfigParser', ['loot_config'])
 
-    def parse_bytes(self, raw: bytes):
-        res = super().parse_bytes(raw)
-        s = res['structured']
-        s.setdefault('guessed', {})
+    def guess(self, s, raw):
+        super().guess(s, raw)
         ints = s.get('metadata', {}).get('int_preview', [])
         if ints:
             s['guessed']['weights_preview'] = ints[:8]
-        return res
-
-    def to_bytes(self, data):
-        if isinstance(data, dict) and 'raw' in data:
-            return data['raw']
-        return super().to_bytes(data)
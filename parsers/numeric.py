@@ -0,0 +1,88 @@
+import sys
+import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .source import as_view
+
+KINDS = {
+    'int32': ('i', '<i4', 4),
+    'uint32': ('I', '<u4', 4),
+    'float32': ('f', '<f4', 4),
+    'int16': ('h', '<i2', 2),
+    'uint16': ('H', '<u2', 2),
+}
+
+_LITTLE = sys.byteorder == 'little'
+BACKEND = 'numpy' if np is not None else 'memoryview'
+
+
+def decode(buf, kind, offset=0, count=None, backend=None):
+    # little-endian words of `kind` starting at byte `offset`, decoded in one
+    # batch; memoryview casts are zero-copy on little-endian hosts
+    code, dtype, size = KINDS[kind]
+    buf = as_view(buf)
+    n = max(0, (len(buf) - offset) // size)
+    if count is not None:
+        n = min(n, count)
+    if (backend or BACKEND) == 'numpy' and np is not None:
+        return np.frombuffer(buf, dtype=dtype, count=n, offset=offset)
+    view = buf[offset:offset + n * size]
+    if _LITTLE:
+        return view.cast(code)
+    arr = array.array(code, view)
+    arr.byteswap()
+    return arr
+
+
+def clean_floats(values):
+    return [None if (f != f or abs(f) > 1e8) else round(f, 6) for f in values]
+
+
+class NumericViews:
+    # typed views of a whole buffer at every alignment, built on first use
+    def __init__(self, buf, backend=None):
+        self.buf = as_view(buf)
+        self.backend = backend or BACKEND
+        self._views = {}
+
+    def view(self, kind, align=0):
+        key = (kind, align)
+        v = self._views.get(key)
+        if v is None:
+            v = self._views[key] = decode(self.buf, kind, align, backend=self.backend)
+        return v
+
+    def index(self, kind, offset):
+        size = KINDS[kind][2]
+        align = offset % size
+        return self.view(kind, align), (offset - align) // size
+
+    def at(self, kind, offset):
+        v, i = self.index(kind, offset)
+        return v[i]
+
+    def slice(self, kind, offset, count):
+        v, i = self.index(kind, offset)
+        return v[i:i + count]
+
+    def values(self, kind, offset, count):
+        return self.slice(kind, offset, count).tolist()
+
+    def int32(self, align=0):
+        return self.view('int32', align)
+
+    def uint32(self, align=0):
+        return self.view('uint32', align)
+
+    def float32(self, align=0):
+        return self.view('float32', align)
+
+    def int16(self, align=0):
+        return self.view('int16', align)
+
+    def uint16(self, align=0):
+        return self.view('uint16', align)
@@ -0,0 +1,239 @@
+import os
+import mmap
+import zlib
+import hashlib
+import tempfile
+
+from .diff import diff_bytes
+from .piecetable import PieceTable
+from .source import FileSource, as_view
+
+# .ncspatch layout (integers are LEB128 varints):
+#   b'NCSP', version byte, source size, 16-byte source hash,
+#   target size, 16-byte target hash, record count,
+#   per record: gap since the previous record's end, source length replaced,
+#               new length, new bytes,
+#   CRC32 of everything before it (4 bytes, little-endian)
+MAGIC = b'NCSP'
+VERSION = 1
+EXT = '.ncspatch'
+# header with one-byte sizes and no records, plus the CRC
+MIN_SIZE = len(MAGIC) + 1 + 1 + 16 + 1 + 16 + 1 + 4
+
+
+def checksum(data):
+    # 16-byte BLAKE2b of a buffer or a PieceTable's current content
+    h = hashlib.blake2b(digest_size=16)
+    for c in (data.chunks() if isinstance(data, PieceTable) else (as_view(data),)):
+        h.update(c)
+    return h.digest()
+
+
+class BinaryPatch:
+    __slots__ = ('source_size', 'source_hash', 'target_size', 'target_hash', 'records')
+
+    def __init__(self, source_size, source_hash, target_size, target_hash, records):
+        self.source_size = source_size
+        self.source_hash = source_hash
+        self.target_size = target_size
+        self.target_hash = target_hash
+        # (source offset, source length, new bytes), sorted and non-overlapping
+        self.records = records
+
+    @property
+    def in_place(self):
+        # every record overwrites as many bytes as it writes
+        return all(length == len(new) for _, length, new in self.records)
+
+    def __repr__(self):
+        return (f'BinaryPatch({len(self.records)} records, {self.source_size} -> {self.target_size} bytes, '
+                f'{sum(len(new) for _, _, new in self.records)} bytes of data)')
+
+
+def make_patch(source, target, records=None):
+    # patch turning source into target; records default to the net edits of a
+    # PieceTable target over source
+    if records is None:
+        records = target.changes()
+    return BinaryPatch(len(source), checksum(source), len(target), checksum(target), sorted(records))
+
+
+def records_from_diff(source, target):
+    # records for two plain buffers, from the chunk-aligned diff
+    target = as_view(target)
+    return [(a0, a1 - a0, bytes(target[b0:b1])) for _, a0, a1, b0, b1 in diff_bytes(source, target)]
+
+
+def _varint(n, out):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(buf, pos):
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def dumps(patch):
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    _varint(patch.source_size, out)
+    out += patch.source_hash
+    _varint(patch.target_size, out)
+    out += patch.target_hash
+    _varint(len(patch.records), out)
+    pos = 0
+    for off, length, new in patch.records:
+        if off < pos:
+            raise ValueError(f'patch records overlap at offset {off}')
+        _varint(off - pos, out)
+        _varint(length, out)
+        _varint(len(new), out)
+        out += new
+        pos = off + length
+    out += zlib.crc32(out).to_bytes(4, 'little')
+    return bytes(out)
+
+
+def loads(blob):
+    blob = bytes(blob)
+    if blob[:4] != MAGIC:
+        raise ValueError('not an .ncspatch file')
+    if len(blob) < MIN_SIZE:
+        raise ValueError('patch file is corrupt (truncated)')
+    if blob[4] != VERSION:
+        raise ValueError(f'unsupported patch version {blob[4]}')
+    body = blob[:-4]
+    if zlib.crc32(body) != int.from_bytes(blob[-4:], 'little'):
+        raise ValueError('patch file is corrupt (CRC mismatch)')
+    try:
+        source_size, pos = _read_varint(body, 5)
+        source_hash, pos = body[pos:pos + 16], pos + 16
+        target_size, pos = _read_varint(body, pos)
+        target_hash, pos = body[pos:pos + 16], pos + 16
+        count, pos = _read_varint(body, pos)
+        records = []
+        at = 0
+        for _ in range(count):
+            gap, pos = _read_varint(body, pos)
+            length, pos = _read_varint(body, pos)
+            n, pos = _read_varint(body, pos)
+            at += gap
+            records.append((at, length, body[pos:pos + n]))
+            pos += n
+            at += length
+    except IndexError:
+        pos = -1
+    if pos != len(body):
+        raise ValueError('patch file is corrupt (bad record layout)')
+    if at > source_size:
+        raise ValueError('patch file is corrupt (records run past the source size)')
+    return BinaryPatch(source_size, source_hash, target_size, target_hash, records)
+
+
+def write_patch(path, patch):
+    with open(path, 'wb') as f:
+        f.write(dumps(patch))
+
+
+def read_patch(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def check_source(patch, data):
+    if len(data) != patch.source_size or checksum(data) != patch.source_hash:
+        raise ValueError('file does not match the patch source (size or checksum differs)')
+
+
+def _check_records(records, size):
+    # records must be sorted, non-overlapping and inside a size-byte file
+    pos = 0
+    for off, length, _ in records:
+        if off < pos:
+            raise ValueError(f'patch records overlap at offset {off}')
+        pos = off + length
+        if pos > size:
+            raise ValueError(f'patch record at offset {off} runs past the end of the file')
+
+
+def apply_patch(data, patch, verify=True):
+    # patched copy of data as bytes
+    data = as_view(data)
+    if verify:
+        check_source(patch, data)
+    _check_records(patch.records, len(data))
+    out = bytearray()
+    pos = 0
+    for off, length, new in patch.records:
+        out += data[pos:off]
+        out += new
+        pos = off + length
+    out += data[pos:]
+    if verify and checksum(out) != patch.target_hash:
+        raise ValueError('patched data does not match the patch target checksum')
+    return bytes(out)
+
+
+def apply_to(table, patch):
+    # apply as PieceTable edits (undoable); last record first so the offsets
+    # of the earlier ones stay valid
+    _check_records(patch.records, len(table))
+    for off, length, new in reversed(patch.records):
+        table.replace(off, new, length)
+    table.seal()
+
+
+def write_in_place(path, records):
+    # Overwrite the given ranges of the file through a writable mapping; only
+    # the touched pages get dirty and written back. Records must not change
+    # the file size.
+    if any(length != len(new) for _, length, new in records):
+        raise ValueError('edits change the file size; save a new file instead')
+    if not records:
+        return 0
+    with open(path, 'r+b') as f:
+        size = os.fstat(f.fileno()).st_size
+        _check_records(records, size)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE) as m:
+            for off, length, new in records:
+                m[off:off + length] = new
+            m.flush()
+    return sum(length for _, length, _ in records)
+
+
+def apply_file(patch, path, output=None, verify=True):
+    # patch path in place when the size is unchanged and no output is given,
+    # otherwise write the result to output (or over path, via a temp file)
+    in_place = output is None and patch.in_place
+    with FileSource(path) as src:
+        if in_place:
+            if verify:
+                check_source(patch, src.buffer)
+            result = None
+        else:
+            result = apply_patch(src.buffer, patch, verify)
+    if in_place:
+        write_in_place(path, patch.records)
+        return path
+    target = output or path
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(result)
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return target
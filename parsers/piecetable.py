@@ -0,0 +1,259 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+from .source import as_view
+
+ORIG = 0
+ADD = 1
+
+
+class Patch:
+    __slots__ = ('offset', 'old', 'new')
+
+    def __init__(self, offset, old, new):
+        self.offset = offset
+        self.old = old
+        self.new = new
+
+    def __repr__(self):
+        return f'Patch(offset={self.offset}, old={self.old.hex()}, new={self.new.hex()})'
+
+
+class PieceTable:
+    # Edit buffer over a read-only original (bytes or an mmap view). Edits are
+    # appended to an add buffer and described by (source, start, length)
+    # pieces, so an edit costs O(pieces) regardless of file size. Every edit
+    # is journaled as a byte patch for undo/redo; consecutive overwrites are
+    # merged into one patch until seal() is called.
+    def __init__(self, original=b''):
+        self._orig = as_view(original)
+        self._add = bytearray()
+        self._pieces = [(ORIG, 0, len(self._orig))] if len(self._orig) else []
+        self._reindex()
+        self._undo = []
+        self._redo = []
+        self._open = False
+
+    @property
+    def original(self):
+        return self._orig
+
+    def _reindex(self):
+        self._starts = [0, *accumulate(n for _, _, n in self._pieces)]
+        self._len = self._starts[-1]
+
+    def __len__(self):
+        return self._len
+
+    def _src(self, src):
+        return self._orig if src == ORIG else self._add
+
+    def read(self, offset, n):
+        offset = max(0, offset)
+        n = max(0, min(n, self._len - offset))
+        out = bytearray()
+        i = bisect_right(self._starts, offset) - 1
+        while n > 0 and i < len(self._pieces):
+            src, start, length = self._pieces[i]
+            skip = offset - self._starts[i]
+            take = min(length - skip, n)
+            out += self._src(src)[start + skip:start + skip + take]
+            offset += take
+            n -= take
+            i += 1
+        return bytes(out)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._len)
+            if step != 1:
+                return self.read(0, self._len)[key]
+            return self.read(start, stop - start)
+        if key < 0:
+            key += self._len
+        if not 0 <= key < self._len:
+            raise IndexError('PieceTable index out of range')
+        i = bisect_right(self._starts, key) - 1
+        src, start, _ = self._pieces[i]
+        return self._src(src)[start + key - self._starts[i]]
+
+    def __bytes__(self):
+        return self.tobytes()
+
+    def tobytes(self):
+        return b''.join(bytes(c) for c in self.chunks())
+
+    def _splice(self, offset, length, data):
+        end = offset + length
+        ins = None
+        if data:
+            ins = (ADD, len(self._add), len(data))
+            self._add += data
+        pieces = []
+        pos = 0
+        for src, start, n in self._pieces:
+            pend = pos + n
+            if pend <= offset:
+                pieces.append((src, start, n))
+            elif pos >= end:
+                if ins:
+                    pieces.append(ins)
+                    ins = None
+                pieces.append((src, start, n))
+            else:
+                if pos < offset:
+                    pieces.append((src, start, offset - pos))
+                if ins:
+                    pieces.append(ins)
+                    ins = None
+                if pend > end:
+                    pieces.append((src, start + end - pos, pend - end))
+            pos = pend
+        if ins:
+            pieces.append(ins)
+        # merge pieces that are contiguous in the same source
+        merged = []
+        for p in pieces:
+            if merged and merged[-1][0] == p[0] and merged[-1][1] + merged[-1][2] == p[1]:
+                merged[-1] = (p[0], merged[-1][1], merged[-1][2] + p[2])
+            else:
+                merged.append(p)
+        self._pieces = merged
+        self._reindex()
+
+    def replace(self, offset, data, length=None):
+        # overwrite `length` bytes at offset with data (same length by default)
+        data = bytes(data)
+        length = len(data) if length is None else length
+        if offset < 0 or offset + length > self._len:
+            raise IndexError('edit outside the buffer')
+        old = self.read(offset, length)
+        if old == data:
+            return
+        self._splice(offset, length, data)
+        self._redo.clear()
+        last = self._undo[-1] if self._undo and self._open else None
+        if (last is not None and len(data) == length and len(last.new) == len(last.old)
+                and last.offset <= offset <= last.offset + len(last.new)):
+            rel = offset - last.offset
+            tail = rel + len(data) - len(last.new)
+            last.new = last.new[:rel] + data + last.new[rel + len(data):]
+            if tail > 0:
+                last.old += old[len(old) - tail:]
+        else:
+            self._undo.append(Patch(offset, old, data))
+        self._open = True
+
+    def insert(self, offset, data):
+        self.replace(offset, data, 0)
+
+    def delete(self, offset, length):
+        self.replace(offset, b'', length)
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            start, stop, _ = key.indices(self._len)
+            self.replace(start, value, stop - start)
+        else:
+            self.replace(key, bytes((value,)))
+
+    def seal(self):
+        # the next edit starts a new undo step
+        self._open = False
+
+    def rebase(self, original):
+        # Make `original` (a buffer equal to the current content, e.g. the
+        # file just saved) the new base: changes() starts empty and the add
+        # buffer is dropped. The journal holds bytes, not pieces, so undo and
+        # redo keep working across the rebase.
+        if len(original) != self._len:
+            raise ValueError('rebase needs a buffer equal to the current content')
+        self._orig = as_view(original)
+        self._add = bytearray()
+        self._pieces = [(ORIG, 0, self._len)] if self._len else []
+        self._reindex()
+        self._open = False
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo(self):
+        # returns the patch that was reverted, or None
+        if not self._undo:
+            return None
+        p = self._undo.pop()
+        self._splice(p.offset, len(p.new), p.old)
+        self._redo.append(p)
+        self._open = False
+        return p
+
+    def redo(self):
+        if not self._redo:
+            return None
+        p = self._redo.pop()
+        self._splice(p.offset, len(p.old), p.new)
+        self._undo.append(p)
+        self._open = False
+        return p
+
+    @property
+    def journal(self):
+        return list(self._undo)
+
+    @property
+    def modified(self):
+        return bool(self._undo)
+
+    def changes(self):
+        # The net edit as (original offset, original length, new bytes) runs in
+        # original order, however many edits and undos produced it; bytes that
+        # ended up equal to the original are trimmed off each run.
+        out = []
+        expected = 0
+        add = bytearray()
+        for src, start, n in self._pieces:
+            if src == ADD:
+                add += self._add[start:start + n]
+                continue
+            if start != expected or add:
+                out.append((expected, start - expected, bytes(add)))
+                add = bytearray()
+            expected = start + n
+        if expected < len(self._orig) or add:
+            out.append((expected, len(self._orig) - expected, bytes(add)))
+        trimmed = []
+        for off, length, new in out:
+            old = self._orig[off:off + length]
+            pre = 0
+            while pre < min(length, len(new)) and old[pre] == new[pre]:
+                pre += 1
+            suf = 0
+            while suf < min(length, len(new)) - pre and old[length - 1 - suf] == new[len(new) - 1 - suf]:
+                suf += 1
+            if length - pre - suf or len(new) - pre - suf:
+                trimmed.append((off + pre, length - pre - suf, new[pre:len(new) - suf]))
+        return trimmed
+
+    def chunks(self):
+        # the content as a sequence of buffer slices, without joining them
+        for src, start, n in self._pieces:
+            yield self._src(src)[start:start + n]
+
+    def edited_ranges(self):
+        # (offset, length) of every run that no longer comes from the original
+        run = None
+        pos = 0
+        for src, _, n in self._pieces:
+            if src == ADD:
+                run = (run[0], run[1] + n) if run else (pos, n)
+            elif run:
+                yield run
+                run = None
+            pos += n
+        if run:
+            yield run
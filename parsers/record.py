@@ -0,0 +1,119 @@
+from collections.abc import MutableMapping
+
+from .numeric import clean_floats
+
+LAZY_KEYS = ('ascii_text', 'raw_hex', 'raw_bytes', 'int32_values', 'uint32_values', 'float32_values', 'strings')
+KEYS = ('offset', 'length') + LAZY_KEYS
+
+
+class Record(MutableMapping):
+    # A segment of a shared buffer. Derived values are computed on first
+    # access and cached; anything assigned (type, guids, guessed, or an
+    # override of a derived key) lives in a small side dict.
+    __slots__ = ('offset', 'length', '_buf', '_parser', '_views',
+                 '_ascii', '_hex', '_nums', '_strings', '_extra')
+
+    def __init__(self, parser, buf, offset, length, views=None):
+        self.offset = offset
+        self.length = length
+        self._buf = buf
+        self._parser = parser
+        self._views = views
+        self._ascii = self._hex = self._nums = self._strings = None
+        self._extra = None
+
+    @property
+    def segment(self):
+        return self._buf[self.offset:self.offset + self.length]
+
+    def invalidate(self):
+        self._ascii = self._hex = self._nums = self._strings = None
+
+    def rebind(self, buf, views=None, offset=None):
+        self._buf = buf
+        self._views = views
+        if offset is not None:
+            self.offset = offset
+        self.invalidate()
+
+    def _numbers(self):
+        if self._nums is None:
+            n = min(self.length // 4, 16)
+            if self._views is not None:
+                v = self._views
+                self._nums = (v.values('int32', self.offset, n), v.values('uint32', self.offset, n),
+                              clean_floats(v.values('float32', self.offset, n)))
+            else:
+                self._nums = self._parser.ints_uints_floats(self.segment, offset=0, max_items=16)
+        return self._nums
+
+    def _derived(self, key):
+        if key == 'ascii_text':
+            if self._ascii is None:
+                self._ascii = str(self.segment, 'latin-1', errors='replace')
+            return self._ascii
+        if key == 'raw_hex':
+            if self._hex is None:
+                self._hex = self._parser.hex_spaced(self.segment, limit=1024)
+            return self._hex
+        if key == 'raw_bytes':
+            return self.segment
+        if key == 'int32_values':
+            return self._numbers()[0]
+        if key == 'uint32_values':
+            return self._numbers()[1]
+        if key == 'float32_values':
+            return self._numbers()[2]
+        if key == 'strings':
+            if self._strings is None:
+                self._strings = [s for _, s in self._parser.extract_null_strings(self.segment, min_len=2)]
+            return self._strings
+        raise KeyError(key)
+
+    def __getitem__(self, key):
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        if key == 'offset':
+            return self.offset
+        if key == 'length':
+            return self.length
+        return self._derived(key)
+
+    def __setitem__(self, key, value):
+        if key == 'offset':
+            self.offset = value
+            self.invalidate()
+        elif key == 'length':
+            self.length = value
+            self.invalidate()
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __iter__(self):
+        yield from KEYS
+        if self._extra:
+            for k in self._extra:
+                if k not in LAZY_KEYS:
+                    yield k
+
+    def __len__(self):
+        return len(KEYS) + sum(1 for k in (self._extra or ()) if k not in LAZY_KEYS)
+
+    def __contains__(self, key):
+        return key in KEYS or (self._extra is not None and key in self._extra)
+
+    def extras(self):
+        return dict(self._extra) if self._extra else {}
+
+    def to_dict(self):
+        return dict(self)
+
+    def __repr__(self):
+        return f'Record(offset={self.offset}, length={self.length}, extra={self._extra!r})'
@@ -0,0 +1,102 @@
+import os
+import re
+
+from .source import FileSource
+
+HEAD_BYTES = 64
+
+
+class ParserRegistry:
+    # Filename tokens of every schema parser are compiled into one regex; the
+    # longest matching token wins and ties go to registration order. Parsers
+    # whose schema declares a magic are preferred when the file header
+    # matches it. Parsers without a schema are asked through
+    # can_parse(filename, head), which gets only the first HEAD_BYTES of the
+    # file. Decisions are cached per (path, size, mtime).
+    def __init__(self, parsers, fallback):
+        self.fallback = fallback
+        self.parsers = [P for P in parsers if P is not fallback]
+        self._token_owner = {}
+        self._magic = []
+        self._custom = []
+        for order, P in enumerate(self.parsers):
+            schema = getattr(P, 'schema', None)
+            if schema is None:
+                self._custom.append(P)
+                continue
+            for t in schema.tokens:
+                self._token_owner.setdefault(t, (order, P))
+            if schema.magic:
+                self._magic.append((schema.magic, order, P))
+        alts = sorted(self._token_owner, key=len, reverse=True)
+        # longest alternative first, so each position reports its longest token
+        self._matcher = re.compile('|'.join(map(re.escape, alts))) if alts else None
+        self._by_name = {}
+        self._cache = {}
+
+    @property
+    def needs_head(self):
+        return bool(self._magic or self._custom)
+
+    def match_name(self, filename):
+        if self._matcher is None:
+            return []
+        name = filename.rsplit('/', 1)[-1].rsplit('\\', 1)[-1].lower()
+        found = self._by_name.get(name)
+        if found is not None:
+            return found
+        toks = self._matcher.findall(name)
+        if len(toks) == 1:
+            found = [self._token_owner[toks[0]][1]]
+        else:
+            # longest token first, then registration order
+            ranked = sorted(set(toks), key=lambda t: (-len(t), self._token_owner[t][0]))
+            found = list(dict.fromkeys(self._token_owner[t][1] for t in ranked))
+        self._by_name[name] = found
+        return found
+
+    def detect(self, filename, head=b''):
+        by_name = self.match_name(filename)
+        if self._magic and head:
+            signed = [P for magic, _, P in sorted(self._magic, key=lambda m: m[1]) if head.startswith(magic)]
+            if signed:
+                for P in by_name:
+                    if P in signed:
+                        return P
+                return signed[0]
+        if by_name:
+            return by_name[0]
+        for P in self._custom:
+            if P.can_parse(filename, head):
+                return P
+        return self.fallback
+
+    def parser_class_for(self, path_or_source):
+        if isinstance(path_or_source, FileSource):
+            src = path_or_source
+            path, size, mtime = src.path, src.size, src.mtime_ns
+        else:
+            src = None
+            path = path_or_source
+            st = os.stat(path)
+            size, mtime = st.st_size, st.st_mtime_ns
+        key = (os.path.abspath(path), size, mtime)
+        P = self._cache.get(key)
+        if P is not None:
+            return P
+        head = b''
+        if self.needs_head:
+            if src is not None:
+                head = src.head(HEAD_BYTES)
+            else:
+                with open(path, 'rb') as f:
+                    head = f.read(HEAD_BYTES)
+        P = self._cache[key] = self.detect(path, head)
+        return P
+
+    def parser_for(self, path_or_source):
+        return self.parser_class_for(path_or_source)()
+
+    def clear_cache(self):
+        self._cache.clear()
+        self._by_name.clear()
@@ -0,0 +1,36 @@
+import re
+from collections import namedtuple
+
+Token = namedtuple('Token', 'kind offset length text')
+
+STRING = 'string'   # NUL-delimited run
+ASCII = 'ascii'     # printable ASCII run
+GUID = 'guid'       # 32 hex digits bounded by non-hex bytes
+
+_NUL_RUN = re.compile(rb'[^\x00]+')
+_PRINTABLE = re.compile(rb'[ -~]+')
+_GUID_TEXT = re.compile(rb'(?<![0-9A-Fa-f])[0-9A-Fa-f]{32}(?![0-9A-Fa-f])')
+
+
+def scan(raw, min_string=2, min_ascii=4, strings=True, ascii=True, guids=True):
+    # Printable runs never contain NUL and GUIDs never contain non-printables,
+    # so each inner search is confined to the span of its enclosing match and
+    # every byte is visited a bounded number of times. Offsets are exact.
+    tokens = []
+    add = tokens.append
+    want_inner = ascii or guids
+    inner_min = min(min_ascii if ascii else 32, 32 if guids else min_ascii)
+    for m in _NUL_RUN.finditer(raw):
+        a, b = m.span()
+        if strings and b - a >= min_string:
+            add(Token(STRING, a, b - a, m.group().decode('utf-8', errors='replace')))
+        if not want_inner or b - a < inner_min:
+            continue
+        for r in _PRINTABLE.finditer(raw, a, b):
+            ra, rb = r.span()
+            if ascii and rb - ra >= min_ascii:
+                add(Token(ASCII, ra, rb - ra, r.group().decode('ascii')))
+            if guids and rb - ra >= 32:
+                for g in _GUID_TEXT.finditer(raw, ra, rb):
+                    add(Token(GUID, g.start(), 32, g.group().decode('ascii').upper()))
+    return tokens
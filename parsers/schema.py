@@ -0,0 +1,222 @@
+import os
+import struct
+
+from .generic import GenericParser
+from .config import load_config
+
+
+def _text(v):
+    return v.decode('ascii', errors='replace').strip('\x00')
+
+
+def _guid(v):
+    return v.hex().upper()
+
+
+def _encode(value, code):
+    if code == 'guid':
+        return bytes.fromhex(value)
+    if code.endswith('s'):
+        return value.encode('latin-1', errors='replace') if isinstance(value, str) else bytes(value)
+    return value
+
+
+class Layout:
+    # ordered (name, code) pairs compiled into one struct.Struct; codes are
+    # struct codes plus 'guid' (16 raw bytes shown as hex)
+    def __init__(self, fields, byteorder='<'):
+        self.fields = tuple((n, c) for n, c in fields)
+        self.struct = struct.Struct(byteorder + ''.join('16s' if c == 'guid' else c for _, c in self.fields))
+        self.size = self.struct.size
+        # pad bytes ('x') produce no value
+        values = [(n, c) for n, c in self.fields if not c.endswith('x')]
+        self.names = tuple(n for n, _ in values)
+        self._conv = tuple(_guid if c == 'guid' else _text if c.endswith('s') else None for _, c in values)
+        # same layout with pad bytes kept as strings, for lossless packing
+        self._raw = struct.Struct(byteorder + ''.join(
+            '16s' if c == 'guid' else (c[:-1] or '1') + 's' if c.endswith('x') else c for _, c in self.fields))
+        self._slots = tuple(i for i, (_, c) in enumerate(self.fields) if not c.endswith('x'))
+        self._codes = tuple(c for _, c in values)
+
+    def _convert(self, values):
+        return {n: (f(v) if f else v) for n, v, f in zip(self.names, values, self._conv)}
+
+    def unpack(self, buf, offset=0):
+        return self._convert(self.struct.unpack_from(buf, offset))
+
+    def pack(self, values, old):
+        # `old` with the fields whose value differs from it replaced; bytes of
+        # unchanged fields (padding, text after the NUL) are kept as they were
+        raw = list(self._raw.unpack_from(old))
+        current = self._convert([raw[i] for i in self._slots])
+        for name, code, i in zip(self.names, self._codes, self._slots):
+            if name in values and values[name] != current[name]:
+                raw[i] = _encode(values[name], code)
+        return self._raw.pack(*raw)
+
+    def iter_unpack(self, buf, offset=0, count=None):
+        n = max(0, (len(buf) - offset) // self.size)
+        if count is not None:
+            n = max(0, min(n, count))
+        for values in self.struct.iter_unpack(buf[offset:offset + n * self.size]):
+            yield self._convert(values)
+
+
+class Schema:
+    def __init__(self, name, tokens, guessed=None, header=None, record=None,
+                 record_offset=None, count_field=None, per_bytes=None, entries_per_bytes=None, magic=None):
+        self.name = name
+        self.tokens = tuple(t.lower() for t in tokens)
+        # optional file signature at offset 0
+        self.magic = magic.encode('latin-1') if isinstance(magic, str) else magic
+        self.guessed = dict(guessed or {})
+        self.header = Layout(header) if header else None
+        self.record = Layout(record) if record else None
+        # records start after the header unless told otherwise
+        self.record_offset = record_offset
+        self.count_field = count_field
+        # {'field': n} -> max(1, len(raw) // n)
+        self.per_bytes = dict(per_bytes or {})
+        # like per_bytes, but the detected record count wins when there is one
+        self.entries_per_bytes = dict(entries_per_bytes or {})
+
+    def signature(self):
+        return repr((self.tokens, sorted(self.guessed.items()),
+                     self.header.fields if self.header else None,
+                     self.record.fields if self.record else None,
+                     self.record_offset, self.count_field,
+                     sorted(self.per_bytes.items()), sorted(self.entries_per_bytes.items()), self.magic))
+
+    @classmethod
+    def from_dict(cls, d):
+        d = dict(d)
+        return cls(d.pop('name'), d.pop('tokens'), **d)
+
+
+class SchemaParser(GenericParser):
+    schema = None
+
+    @classmethod
+    def can_parse(cls, filename: str, raw: bytes) -> bool:
+        n = os.path.basename(filename).lower()
+        return any(t in n for t in cls.schema.tokens)
+
+    def cache_tag(self):
+        return f"{super().cache_tag()}/{self.schema.signature()}"
+
+    def detect_layout(self, raw):
+        if self.schema.record is not None:
+            return None
+        return super().detect_layout(raw)
+
+    def segment_records(self, raw, tokens, guid_occ, layout, views):
+        rec_layout = self.schema.record
+        if rec_layout is None:
+            return super().segment_records(raw, tokens, guid_occ, layout, views)
+        start = self.schema.record_offset
+        if start is None:
+            start = self.schema.header.size if self.schema.header else 0
+        count = None
+        if self.schema.count_field and self.schema.header and len(raw) >= self.schema.header.size:
+            count = self.schema.header.unpack(raw).get(self.schema.count_field)
+        size = rec_layout.size
+        desc = {'strategy': 'schema', 'record_size': size, 'record_offset': start}
+        bad = count is not None and (not isinstance(count, int) or count < 0)
+        if bad:
+            # keep everything after the header as one malformed record
+            desc['error'] = f'bad record count {count!r}'
+            count = 0
+        records = []
+        if start < len(raw):
+            for i, fields in enumerate(rec_layout.iter_unpack(raw, start, count)):
+                rec = self.make_record(raw, start + i * size, size, views)
+                rec['type'] = 'record'
+                rec['fields'] = fields
+                records.append(rec)
+        end = start + len(records) * size
+        if start > 0:
+            rec = self.make_record(raw, 0, min(start, len(raw)), views)
+            rec['type'] = 'header'
+            records.insert(0, rec)
+        if end < len(raw):
+            rec = self.make_record(raw, end, len(raw) - end, views)
+            rec['type'] = 'malformed' if bad else 'trailer'
+            records.append(rec)
+        return records, desc
+
+    def record_candidates(self, rec, src, old, structured):
+        yield from super().record_candidates(rec, src, old, structured)
+        sc = self.schema
+        kind = src.get('type')
+        if kind == 'record' and sc.record is not None and src.get('fields') and len(old) == sc.record.size:
+            yield sc.record.pack(src['fields'], old)
+        elif kind == 'header' and sc.header is not None and structured and len(old) >= sc.header.size:
+            yield sc.header.pack(structured.get('header', {}), old) + old[sc.header.size:]
+
+    def reparse(self, res, data, start, end):
+        sc = self.schema
+        # header edits can move or recount the records; start over
+        fixed = sc.record_offset if sc.record_offset is not None else (sc.header.size if sc.header else 0)
+        if start < max(fixed, sc.header.size if sc.header else 0, 8):
+            full = self.parse_bytes(data[0:len(data)])
+            full['structured']['file'] = res['structured'].get('file')
+            return full, None
+        res, changed = super().reparse(res, data, start, end)
+        if changed and sc.record is not None:
+            records = res['structured']['records']
+            for i in changed:
+                rec = records[i]
+                if rec.get('type') == 'record':
+                    rec['fields'] = sc.record.unpack(res['raw'], rec['offset'])
+        return res, changed
+
+    def guess(self, s, raw):
+        sc = self.schema
+        s.setdefault('guessed', {})
+        s['guessed'].update(sc.guessed)
+        if sc.header and len(raw) >= sc.header.size:
+            s['header'].update(sc.header.unpack(raw))
+        for k, n in sc.per_bytes.items():
+            s['guessed'][k] = max(1, len(raw)//n)
+        for k, n in sc.entries_per_bytes.items():
+            s['guessed'][k] = s['guessed'].get('record_count') or max(1, len(raw)//n)
+
+
+def compile_schema(schema, base=SchemaParser):
+    return type(schema.name, (base,), {'schema': schema, '__module__': __name__})
+
+
+# token order matters only for ties; see the registry for dispatch rules
+SCHEMAS = [
+    Schema('AchievementParser', ['achievement'],
+           header=[('magic_guess', '4s'), ('version_guess', 'I'), ('entry_count_guess', 'I')]),
+    Schema('ActivityParser', ['activity'], guessed={'type': 'activity'}),
+    Schema('ActivityrequestParser', ['activityrequest'], guessed={'type': 'activityrequest'}),
+    Schema('ActivityrequestsettingsdataParser', ['activityrequestsettingsdata'], guessed={'type': 'activityrequestsettingsdata'}),
+    Schema('AihitreactionsParser', ['aihit', 'aihitreactions'], entries_per_bytes={'approx_entries': 64}),
+    Schema('AimAssistParametersParser', ['aim_assist', 'aimassist'], per_bytes={'approx_fields': 32}),
+    Schema('AnimupdaterateparamsParser', ['animupdaterateparams'], guessed={'type': 'animupdaterateparams'}),
+    Schema('AttributeParser', ['attribute'], guessed={'type': 'attribute'}),
+    Schema('AudioEventParser', ['audio_event'], guessed={'type': 'audio_event'}),
+    Schema('AudioproviderParser', ['audioprovider'], guessed={'type': 'audioprovider'}),
+    Schema('CameraModeParser', ['camera_mode'], guessed={'type': 'camera_mode'}),
+    Schema('CameraShakeParser', ['camera_shake'], guessed={'type': 'camera_shake'}),
+    Schema('CameraTransitionParser', ['camera_transition'], guessed={'type': 'camera_transition'}),
+    Schema('CapitalParser', ['capital'], guessed={'type': 'capital'}),
+    Schema('CharacterParser', ['character'], guessed={'type': 'character'}),
+    Schema('InventoryParser', ['inventory'], guessed={'type': 'inventory'}),
+    Schema('LightBeamParser', ['light_beam'], guessed={'type': 'light_beam'}),
+    Schema('LightProjectileParser', ['light_projectile'], guessed={'type': 'light_projectile'}),
+    Schema('LuckCategoryParser', ['luck_category'], guessed={'type': 'luck_category'}),
+    Schema('ManagedActorParser', ['managed_actor'], guessed={'type': 'managed_actor'}),
+    Schema('MantleParser', ['mantle'], guessed={'type': 'mantle'}),
+    Schema('ManufacturerParser', ['manufacturer'], guessed={'type': 'manufacturer'}),
+    Schema('QuestParser', ['quest'], guessed={'type': 'quest'}),
+    Schema('QuestsParser', ['quests'], guessed={'type': 'quests'}),
+]
+
+# extra file types can be declared in config.json under "schemas"
+SCHEMAS += [Schema.from_dict(d) for d in load_config().get('schemas', [])]
+
+SCHEMA_PARSERS = {s.name: compile_schema(s) for s in SCHEMAS}
+globals().update(SCHEMA_PARSERS)
@@ -0,0 +1,90 @@
+import re
+import struct
+from collections import namedtuple
+
+from .piecetable import PieceTable
+
+MODES = ('hex', 'ascii', 'utf16', 'int32', 'float32')
+# bytes scanned per step; callers on the UI thread yield between steps
+CHUNK = 8 << 20
+# hits kept per search; the count is reported as a lower bound past this
+MAX_HITS = 1 << 20
+
+_HEX_TOKEN = re.compile(r'\?\?|[0-9A-Fa-f]{2}')
+_LOWER = bytes.maketrans(bytes(range(65, 91)), bytes(range(97, 123)))
+
+# every pattern matches `length` bytes; with fold, the buffer is lowercased
+# (ASCII letters only) before matching, which keeps literal search fast
+SearchPattern = namedtuple('SearchPattern', 'regex length fold')
+
+
+def compile_pattern(query, mode='hex', ignore_case=False):
+    # SearchPattern for a query; raises ValueError for one the mode can't read
+    query = query.strip()
+    if not query:
+        raise ValueError('empty search')
+    if mode == 'hex':
+        compact = re.sub(r'[\s,]+', '', query)
+        tokens = _HEX_TOKEN.findall(compact)
+        if len(tokens) * 2 != len(compact):
+            raise ValueError('hex search takes byte pairs like "4E 43 ?? 00"')
+        if all(t == '??' for t in tokens):
+            raise ValueError('hex search needs at least one fixed byte')
+        pattern = b''.join(b'.' if t == '??' else re.escape(bytes.fromhex(t)) for t in tokens)
+        return SearchPattern(re.compile(pattern, re.DOTALL), len(tokens), False)
+    if mode in ('ascii', 'utf16'):
+        data = query.encode('latin-1' if mode == 'ascii' else 'utf-16-le')
+        if ignore_case:
+            data = data.translate(_LOWER)
+        return SearchPattern(re.compile(re.escape(data)), len(data), ignore_case)
+    if mode == 'int32':
+        v = int(query, 0)
+        if not -(1 << 31) <= v < (1 << 32):
+            raise ValueError('value out of int32/uint32 range')
+        data = struct.pack('<i' if v < 0 else '<I', v)
+        return SearchPattern(re.compile(re.escape(data)), 4, False)
+    if mode == 'float32':
+        data = struct.pack('<f', float(query))
+        return SearchPattern(re.compile(re.escape(data)), 4, False)
+    raise ValueError(f'unknown search mode {mode!r}')
+
+
+def _contiguous(data):
+    # a buffer re can scan in place, or None if the bytes are split over pieces
+    if not isinstance(data, PieceTable):
+        return data
+    if len(data) == len(data.original) and next(data.edited_ranges(), None) is None:
+        return data.original
+    return None
+
+
+def iter_search(data, pattern, start=0, end=None, chunk=CHUNK):
+    # Yields the list of match offsets found in each chunk of [start, end).
+    # Chunks overlap by length - 1 bytes so no match is lost at a boundary; an
+    # unedited buffer (bytes, mmap view, or a clean PieceTable) is scanned in
+    # place, otherwise one copied chunk at a time.
+    end = len(data) if end is None else min(end, len(data))
+    buf = None if pattern.fold else _contiguous(data)
+    regex = pattern.regex
+    pos = max(0, start)
+    while pos < end:
+        stop = min(pos + chunk, end)
+        window_end = min(stop + pattern.length - 1, end)
+        if buf is not None:
+            hits = [m.start() for m in regex.finditer(buf, pos, window_end) if m.start() < stop]
+        else:
+            window = bytes(data[pos:window_end])
+            if pattern.fold:
+                window = window.translate(_LOWER)
+            hits = [pos + m.start() for m in regex.finditer(window) if m.start() < stop - pos]
+        yield hits
+        pos = stop
+
+
+def find_all(data, pattern, start=0, end=None, limit=MAX_HITS):
+    out = []
+    for hits in iter_search(data, pattern, start, end):
+        out.extend(hits)
+        if len(out) >= limit:
+            return out[:limit]
+    return out
@@ -0,0 +1,145 @@
+import math
+from abc import ABC, abstractmethod
+
+from .scanner import STRING, ASCII
+from .stride import detect_stride
+from .config import get_section
+
+
+class Segmenter(ABC):
+    # A strategy returns candidate record start offsets. `layout` is a stride
+    # guess; with layout_known the caller already ran detection, so a None
+    # layout means no stride was found rather than "not looked for".
+    name = None
+
+    @abstractmethod
+    def boundaries(self, raw, tokens, guid_occ, layout=None, layout_known=False):
+        pass
+
+    def limit(self, offsets):
+        # sorted boundaries kept after the candidates are merged; all by default
+        return offsets
+
+    def describe(self):
+        return {'strategy': self.name}
+
+
+class TokenBoundarySegmenter(Segmenter):
+    # cut only where a string, ASCII run or GUID starts or ends
+    name = 'tokens'
+
+    def boundaries(self, raw, tokens, guid_occ, layout=None, layout_known=False):
+        cand = {0, len(raw)}
+        for t in tokens:
+            if t.kind == STRING or t.kind == ASCII:
+                cand.add(t.offset); cand.add(t.offset + t.length)
+        for pos, n, _ in guid_occ:
+            cand.add(pos); cand.add(pos + n)
+        return cand
+
+
+class FixedStrideSegmenter(Segmenter):
+    name = 'fixed'
+
+    def __init__(self, stride=64, header=0):
+        self.stride = max(1, int(stride))
+        self.header = max(0, int(header))
+
+    def boundaries(self, raw, tokens, guid_occ, layout=None, layout_known=False):
+        L = len(raw)
+        cand = {0, L}
+        if self.header < L:
+            cand.update(range(self.header, L, self.stride))
+        return cand
+
+    def describe(self):
+        return {'strategy': self.name, 'stride': self.stride, 'header': self.header}
+
+
+class LegacySegmenter(TokenBoundarySegmenter):
+    # token boundaries plus every 16/32/64 byte boundary (the original behaviour)
+    name = 'legacy'
+
+    def boundaries(self, raw, tokens, guid_occ, layout=None, layout_known=False):
+        cand = super().boundaries(raw, tokens, guid_occ, layout, layout_known)
+        L = len(raw)
+        if L > 512:
+            for step in (16, 32, 64):
+                if L // step > 2:
+                    cand.update(range(0, L, step))
+        return cand
+
+
+class DetectedStrideSegmenter(Segmenter):
+    # fixed-size records when a stride can be detected, token boundaries otherwise
+    name = 'detected'
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback or TokenBoundarySegmenter()
+        self.result = None
+
+    def boundaries(self, raw, tokens, guid_occ, layout=None, layout_known=False):
+        self.result = layout if layout is not None or layout_known else detect_stride(raw)
+        if not self.result:
+            return self.fallback.boundaries(raw, tokens, guid_occ)
+        return FixedStrideSegmenter(self.result.stride, self.result.header).boundaries(raw, tokens, guid_occ)
+
+    def describe(self):
+        d = {'strategy': self.name}
+        if self.result:
+            d['stride'], d['header'] = self.result.stride, self.result.header
+        else:
+            d['fallback'] = self.fallback.name
+        return d
+
+
+class BudgetSegmenter(Segmenter):
+    # caps the record count of another strategy by keeping every k-th boundary
+    def __init__(self, inner, max_records):
+        self.inner = inner
+        self.max_records = int(max_records)
+        self.name = inner.name
+        self.thinned = 1
+
+    def boundaries(self, raw, tokens, guid_occ, layout=None, layout_known=False):
+        return self.inner.boundaries(raw, tokens, guid_occ, layout, layout_known)
+
+    def limit(self, offsets):
+        n = len(offsets) - 1
+        if self.max_records <= 0 or n <= self.max_records:
+            self.thinned = 1
+            return offsets
+        k = self.thinned = math.ceil(n / self.max_records)
+        kept = offsets[::k]
+        if kept[-1] != offsets[-1]:
+            kept.append(offsets[-1])
+        return kept
+
+    def describe(self):
+        d = self.inner.describe()
+        d['max_records'] = self.max_records
+        if self.thinned > 1:
+            d['thinned_by'] = self.thinned
+        return d
+
+
+STRATEGIES = {
+    'tokens': lambda opts: TokenBoundarySegmenter(),
+    'fixed': lambda opts: FixedStrideSegmenter(opts.get('stride', 64), opts.get('header', 0)),
+    'detected': lambda opts: DetectedStrideSegmenter(),
+    'auto': lambda opts: DetectedStrideSegmenter(),
+    'legacy': lambda opts: LegacySegmenter(),
+}
+
+
+def make_segmenter(spec=None):
+    opts = dict(get_section('segmentation'))
+    if isinstance(spec, str):
+        opts['strategy'] = spec
+    elif isinstance(spec, dict):
+        opts.update(spec)
+    name = opts.get('strategy') or 'auto'
+    if name not in STRATEGIES:
+        raise ValueError(f'Unknown segmentation strategy: {name!r}')
+    inner = STRATEGIES[name](opts)
+    return BudgetSegmenter(inner, opts.get('max_records') or 0)
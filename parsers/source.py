@@ -0,0 +1,77 @@
+import os
+import mmap
+import logging
+
+# files at or above this size are mapped instead of read into memory
+MMAP_THRESHOLD = 1 << 20
+
+log = logging.getLogger(__name__)
+
+
+def as_view(raw):
+    mv = raw if isinstance(raw, memoryview) else memoryview(raw)
+    if mv.ndim != 1 or mv.format != 'B':
+        mv = mv.cast('B')
+    return mv
+
+
+class FileSource:
+    def __init__(self, path, mmap_threshold=MMAP_THRESHOLD):
+        self.path = path
+        self.name = os.path.basename(path)
+        st = os.stat(path)
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self._map = None
+        with open(path, 'rb') as f:
+            if self.size and self.size >= mmap_threshold:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.buffer = memoryview(self._map)
+            else:
+                self.buffer = memoryview(f.read())
+
+    @property
+    def mapped(self):
+        return self._map is not None
+
+    def head(self, n=64):
+        return bytes(self.buffer[:n])
+
+    def close(self):
+        # Unmaps the file. While slices of the buffer are alive (a parse
+        # result, an editor) the mapping can't be closed: it is left open, to
+        # be unmapped when the last slice and this source are gone, or by a
+        # later close() once the slices are released.
+        self.buffer = memoryview(b'')
+        if self._map is None:
+            return
+        try:
+            self._map.close()
+        except BufferError:
+            log.debug('%s is still referenced; left mapped', self.path)
+            return
+        self._map = None
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f'FileSource({self.path!r}, size={self.size}, mapped={self.mapped})'
+
+
+def as_source(path_or_source):
+    if isinstance(path_or_source, FileSource):
+        return path_or_source
+    return FileSource(path_or_source)
+
+
+def source_name(path_or_source):
+    if isinstance(path_or_source, FileSource):
+        return path_or_source.name
+    return os.path.basename(path_or_source)
@@ -0,0 +1,125 @@
+from collections import Counter, namedtuple
+from itertools import accumulate
+
+from .numeric import np
+from .source import as_view
+
+StrideGuess = namedtuple('StrideGuess', 'stride header count confidence')
+
+SAMPLE_BYTES = 1 << 18
+COARSE_BYTES = 1 << 14
+REFINE_LAGS = 8
+MIN_CONFIDENCE = 0.2
+_IS_ZERO = bytes([1] + [0] * 255)
+
+
+def _lag_matches(sample, lag):
+    # number of positions i with sample[i] == sample[i + lag], done as one
+    # big-integer XOR (or one NumPy comparison) instead of a byte loop
+    n = len(sample) - lag
+    if np is not None:
+        a = np.frombuffer(sample, dtype=np.uint8)
+        return int(np.count_nonzero(a[:n] == a[lag:]))
+    x = int.from_bytes(sample[:n], 'little') ^ int.from_bytes(sample[lag:], 'little')
+    return x.to_bytes(n, 'little').count(0)
+
+
+def _match_mask(sample, lag):
+    n = len(sample) - lag
+    x = int.from_bytes(sample[:n], 'little') ^ int.from_bytes(sample[lag:], 'little')
+    return x.to_bytes(n, 'little').translate(_IS_ZERO)
+
+
+def autocorrelation(sample, min_stride=4, max_stride=1024, lags=None):
+    sample = bytes(sample)
+    L = len(sample)
+    freq = Counter(sample)
+    chance = sum((c / L) ** 2 for c in freq.values()) if L else 1.0
+    if lags is None:
+        lags = range(min_stride, min(max_stride, L // 4) + 1)
+    scores = {}
+    for lag in lags:
+        if lag >= L:
+            continue
+        rate = _lag_matches(sample, lag) / (L - lag)
+        scores[lag] = (rate - chance) / (1 - chance) if chance < 1 else 0.0
+    return scores
+
+
+def _fundamental(scores):
+    best = max(scores, key=scores.get)
+    top = scores[best]
+    # multiples of the true record size score about as well as the size itself
+    for d in range(1, best + 1):
+        if best % d == 0 and d in scores and scores[d] >= 0.85 * top:
+            return d, scores[d]
+    return best, top
+
+
+def _count_in_header(head, h, count):
+    for w in range(0, h - 3):
+        if int.from_bytes(head[w:w + 4], 'little') == count:
+            return True
+    return False
+
+
+def _is_counter(head, h, stride, rows=64):
+    vals = [int.from_bytes(head[o:o + 4], 'little') for o in range(h, len(head) - 4, stride)][:rows]
+    if len(vals) < 8:
+        return False
+    steps = sum(1 for a, b in zip(vals, vals[1:]) if b - a == 1)
+    return steps >= 0.8 * (len(vals) - 1)
+
+
+def _header_size(raw, stride, window=1 << 16):
+    head = bytes(raw[:window + stride])
+    L = len(raw)
+    if len(head) <= 2 * stride:
+        return 0
+    # first position from which bytes repeat one stride later about as often
+    # as they do in the body of the file
+    mask = _match_mask(head, stride)
+    tail_rate = sum(mask[len(mask) // 2:]) / max(1, len(mask) - len(mask) // 2)
+    need = 0.5 * tail_rate * stride
+    prefix = [0] + list(accumulate(mask))
+    start = 0
+    for i in range(0, len(mask) - stride):
+        if prefix[i + stride] - prefix[i] >= need:
+            start = i
+            break
+    # a header that stores the record count of a whole number of records wins
+    fits = list(range(L % stride, min(start + stride, len(head)) + 1, stride))
+    for h in fits:
+        if _count_in_header(head, h, (L - h) // stride):
+            return h
+    # otherwise a column that counts up by one per record marks the record start
+    for h in range(0, min(start + stride, len(head) - 8 * stride)):
+        if _is_counter(head, h, stride):
+            return h
+    near = [h for h in fits if start - stride < h <= start]
+    return near[-1] if near else start
+
+
+def detect_stride(raw, min_stride=4, max_stride=1024, sample_bytes=SAMPLE_BYTES, min_confidence=MIN_CONFIDENCE):
+    raw = as_view(raw)
+    L = len(raw)
+    if L < 8 * min_stride:
+        return None
+    # score every lag on a small prefix, then re-score the best few (and their
+    # divisors) on the full sample
+    scores = autocorrelation(raw[:COARSE_BYTES], min_stride, max_stride)
+    if not scores:
+        return None
+    top = sorted(scores, key=scores.get, reverse=True)[:REFINE_LAGS]
+    lags = sorted({d for lag in top for d in range(min_stride, lag + 1) if lag % d == 0})
+    scores = autocorrelation(raw[:sample_bytes], lags=lags)
+    if not scores:
+        return None
+    stride, confidence = _fundamental(scores)
+    if confidence < min_confidence:
+        return None
+    header = _header_size(raw, stride)
+    count = (L - header) // stride
+    if count < 4:
+        return None
+    return StrideGuess(stride, header, count, round(confidence, 4))
@@ -0,0 +1,43 @@
+import os
+import random
+import struct
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_ncs(count, stride=48, seed=1, text_guids=()):
+    # table-like file: 12-byte header, then fixed-size records with an id, a
+    # float, a binary GUID and a name; the GUIDs of the records listed in
+    # text_guids are appended as text after the table
+    rnd = random.Random(seed)
+    out = bytearray(b'NCS\x00' + struct.pack('<II', 3, count))
+    guids = []
+    for i in range(count):
+        g = uuid.UUID(int=rnd.getrandbits(128))
+        guids.append(g)
+        rec = struct.pack('<If', i, i * 0.5) + g.bytes + f'Item_{i:05d}'.encode().ljust(16, b'\x00')
+        out += rec[:stride].ljust(stride, b'\x00')
+    for i in text_guids:
+        out += b'\x00' + guids[i].hex.upper().encode() + b'\x00'
+    return bytes(out)
+
+
+@pytest.fixture(autouse=True)
+def no_parse_cache(monkeypatch):
+    # parse_file must not read or fill the user's on-disk parse cache
+    monkeypatch.setattr('parsers.cache._default', False)
+
+
+def plain(o):
+    # parse output as plain JSON-like values, for comparing two results
+    if isinstance(o, (bytes, bytearray, memoryview)):
+        return bytes(o).hex()
+    if hasattr(o, 'items'):
+        return {k: plain(v) for k, v in o.items()}
+    if isinstance(o, (list, tuple)):
+        return [plain(x) for x in o]
+    return o
@@ -0,0 +1,21 @@
+import pytest
+
+from conftest import make_ncs
+from parsers.__main__ import main
+from parsers.batch import run_batch
+
+
+def test_missing_root_fails(tmp_path, capsys):
+    with pytest.raises(FileNotFoundError):
+        run_batch(str(tmp_path / 'nope'))
+    assert main(['batch', str(tmp_path / 'nope')]) == 2
+    assert 'batch failed' in capsys.readouterr().err
+
+
+def test_batch_writes_json(tmp_path):
+    root = tmp_path / 'dump'
+    root.mkdir()
+    (root / 'a.ncs').write_bytes(make_ncs(20))
+    summary = run_batch(str(root), out_dir=str(tmp_path / 'out'), workers=1, use_cache=False, log=lambda msg: None)
+    assert (summary['files'], summary['failed']) == (1, 0)
+    assert (tmp_path / 'out' / 'a.ncs.json').exists()
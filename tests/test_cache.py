@@ -0,0 +1,54 @@
+from conftest import make_ncs, plain
+from parsers import parse_file
+from parsers.cache import MemoryLRU, ParseCache
+from parsers.inv_name_part import InvNamePartParser
+
+
+def test_parse_cache_round_trip(tmp_path):
+    path = tmp_path / 'inv_name_part0.ncs'
+    path.write_bytes(make_ncs(50))
+    cache = ParseCache(str(tmp_path / 'cache'))
+    _, first = parse_file(str(path), cache=cache)
+    _, second = parse_file(str(path), cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert plain(second['structured']) == plain(first['structured'])
+
+
+def test_cache_key_follows_parser_tag(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    buf = make_ncs(5)
+    P = type('P', (InvNamePartParser,), {'version': 99})
+    assert cache.key(buf, InvNamePartParser()) != cache.key(buf, P())
+
+
+def test_parse_cache_evicts_oldest(tmp_path):
+    cache = ParseCache(str(tmp_path), max_bytes=1)
+    parser = InvNamePartParser()
+    for n in (10, 20, 30):
+        buf = make_ncs(n, seed=n)
+        cache.store(buf, parser, parser.parse_bytes(buf)['structured'])
+    assert len(list(cache._entries())) <= 1
+
+
+
+def test_parse_cache_total_after_overwrite(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    parser = InvNamePartParser()
+    buf = make_ncs(10)
+    for _ in range(3):
+        cache.store(buf, parser, parser.parse_bytes(buf)['structured'])
+    assert cache._total == sum(sz for _, sz, _ in cache._entries())
+
+
+def test_memory_lru():
+    evicted = []
+    lru = MemoryLRU(10, on_evict=lambda k, v: evicted.append(k))
+    lru.put('a', 1, 4)
+    lru.put('b', 2, 4)
+    lru.get('a')
+    lru.put('c', 3, 4)
+    assert evicted == ['b'] and 'a' in lru and 'c' in lru
+    lru.put('big', 4, 100)
+    assert len(lru) == 1 and 'big' in lru
+    lru.pop('big')
+    assert evicted[-1] == 'big' and lru.total == 0
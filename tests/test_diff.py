@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+import random
+
+import pytest
+
+from conftest import make_ncs
+from parsers.diff import MAX_CHUNK, chunk_bounds, diff_bytes, diff_files, diff_folders
+from parsers.patch import apply_patch, make_patch, records_from_diff
+
+
+def rebuild(a, b, changes):
+    # b from a and the changed ranges
+    out = bytearray()
+    pos = 0
+    for op, a0, a1, b0, b1 in changes:
+        out += a[pos:a0] + b[b0:b1]
+        pos = a1
+    return bytes(out + a[pos:])
+
+
+def mutate(raw, rnd, edits):
+    data = bytearray(raw)
+    for _ in range(edits):
+        off = rnd.randrange(len(data))
+        kind = rnd.random()
+        if kind < 0.4:
+            data[off:off + 8] = rnd.randbytes(8)
+        elif kind < 0.7:
+            data[off:off] = rnd.randbytes(rnd.randrange(1, 300))
+        else:
+            del data[off:off + rnd.randrange(1, 300)]
+    return bytes(data)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_changes_rebuild_the_new_file(seed):
+    rnd = random.Random(seed)
+    a = make_ncs(300, seed=seed) if seed % 2 else rnd.randbytes(30000)
+    b = mutate(a, rnd, rnd.randrange(1, 10))
+    changes = diff_bytes(a, b)
+    assert rebuild(a, b, changes) == b
+    for op, a0, a1, b0, b1 in changes:
+        assert op == ('replace' if a1 > a0 and b1 > b0 else 'delete' if a1 > a0 else 'insert')
+    assert apply_patch(a, make_patch(a, b, records_from_diff(a, b))) == b
+
+
+def test_insertion_is_local():
+    a = random.Random(1).randbytes(100000)
+    b = a[:50000] + b'inserted' + a[50000:]
+    assert diff_bytes(a, b) == [('insert', 50000, 50000, 50000, 50008)]
+    assert diff_bytes(a, a) == []
+
+
+def test_chunk_bounds():
+    buf = random.Random(2).randbytes(50000) + bytes(20000)
+    bounds = chunk_bounds(buf)
+    assert bounds[-1] == len(buf)
+    sizes = [e - s for s, e in zip([0] + bounds, bounds)]
+    assert all(0 < n <= MAX_CHUNK for n in sizes)
+
+
+def test_diff_files_maps_records(tmp_path):
+    a = make_ncs(100)
+    b = bytearray(a)
+    b[12 + 48 * 5 + 4:12 + 48 * 5 + 8] = b'\xff' * 4
+    pa, pb = tmp_path / 'quests_a.ncs', tmp_path / 'quests_b.ncs'
+    pa.write_bytes(a)
+    pb.write_bytes(bytes(b))
+    d = diff_files(str(pa), str(pb))
+    assert not d['identical'] and len(d['changes']) == 1
+    c = d['changes'][0]
+    assert c['a_offset'] == 12 + 48 * 5 + 4
+    assert d['changed_records']['a'] == 1
+    assert diff_files(str(pa), str(pa))['identical']
+
+
+@pytest.mark.parametrize('method', [None, 'spawn'])
+def test_diff_folders(tmp_path, method):
+    for side in ('a', 'b'):
+        os.makedirs(tmp_path / side / 'sub')
+    (tmp_path / 'a' / 'same.ncs').write_bytes(make_ncs(20))
+    (tmp_path / 'b' / 'same.ncs').write_bytes(make_ncs(20))
+    (tmp_path / 'a' / 'sub' / 'changed.ncs').write_bytes(make_ncs(20))
+    (tmp_path / 'b' / 'sub' / 'changed.ncs').write_bytes(make_ncs(20)[:-10])
+    (tmp_path / 'a' / 'gone.ncs').write_bytes(b'x' * 10)
+    (tmp_path / 'b' / 'new.ncs').write_bytes(b'y' * 10)
+    ctx = method and multiprocessing.get_context(method)
+    d = diff_folders(str(tmp_path / 'a'), str(tmp_path / 'b'), workers=1, mp_context=ctx)
+    assert d['added'] == ['new.ncs'] and d['removed'] == ['gone.ncs']
+    assert d['unchanged'] == 1 and not d['failed']
+    assert [c['file'] for c in d['changed']] == [os.path.join('sub', 'changed.ncs')]
@@ -0,0 +1,52 @@
+import os
+import random
+import re
+
+import pytest
+
+from parsers.base import BaseParser, GUID_FIND_MAX
+
+
+def reference(raw, guids):
+    # the original single-regex search, overlaps included
+    alts = b'|'.join(re.escape(bytes.fromhex(g)) for g in sorted(guids))
+    return sorted((m.start(), 16, m.group(1).hex().upper()) for m in re.finditer(b'(?=(' + alts + b'))', raw))
+
+
+def make_blob(count, seed):
+    rnd = random.Random(seed)
+    guids = [rnd.randbytes(16) for _ in range(count)]
+    parts = []
+    for g in guids:
+        parts += [rnd.randbytes(rnd.randrange(80)), g]
+        if rnd.random() < 0.2:
+            parts.append(g[:rnd.randrange(16)])
+        if rnd.random() < 0.1:
+            parts.append(g)
+    return b''.join(parts), [g.hex().upper() for g in guids]
+
+
+@pytest.mark.parametrize('count', [1, GUID_FIND_MAX, GUID_FIND_MAX + 1, 300])
+def test_binary_offsets_match_reference(count):
+    raw, guids = make_blob(count, count)
+    p = BaseParser()
+    assert p.find_guid_occurrences(raw, guids, []) == reference(raw, guids)
+    assert p.find_guid_occurrences(memoryview(raw), guids, []) == reference(raw, guids)
+
+
+@pytest.mark.parametrize('extra', [0, 40])
+def test_overlapping_occurrences(extra):
+    g = bytes([1, 2] * 8)
+    raw = b'\0' + g * 3 + b'\1\2'
+    guids = [g.hex().upper()] + [os.urandom(16).hex().upper() for _ in range(extra)]
+    assert BaseParser().find_guid_occurrences(raw, guids, []) == reference(raw, guids)
+
+
+def test_textual_and_binary_occurrences():
+    g = bytes(range(16))
+    text = g.hex().upper().encode()
+    raw = b'\0' + text + b'\0' + g + b'\0\0\0' + g
+    p = BaseParser()
+    guids = p.extract_guids(raw)
+    assert guids == [g.hex().upper()]
+    assert p.find_guid_occurrences(raw, guids) == [(1, 32, guids[0]), (34, 16, guids[0]), (53, 16, guids[0])]
@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+import threading
+import uuid
+
+import pytest
+
+from conftest import make_ncs
+from parsers.index import CorpusIndex, parse_guid
+
+
+@pytest.fixture
+def dump(tmp_path):
+    root = tmp_path / 'dump'
+    os.makedirs(root / 'sub')
+    (root / 'quests.ncs').write_bytes(make_ncs(30, seed=1, text_guids=[0, 7]))
+    (root / 'sub' / 'inventory.ncs').write_bytes(make_ncs(30, seed=2) + b'\0Unique_Name\0')
+    return root
+
+
+def test_update_and_lookup(tmp_path, dump):
+    with CorpusIndex(str(tmp_path / 'idx.sqlite')) as idx:
+        s = idx.update(str(dump), workers=1)
+        assert (s['files'], s['indexed'], s['failed']) == (2, 2, 0)
+        assert len(idx) == 2
+
+        if idx.trigram:
+            hits = idx.search('unique_n')
+            assert [os.path.basename(h.path) for h in hits] == ['inventory.ncs']
+            assert hits[0].text == 'Unique_Name'
+
+        # record 0's GUID is stored in binary and, after the table, as text
+        raw = (dump / 'quests.ncs').read_bytes()
+        guid = uuid.UUID(bytes=raw[12 + 8:12 + 24])
+        hits = idx.lookup(str(guid))
+        assert {h.kind for h in hits} == {'guid', 'guid text'}
+        assert all(h.path.endswith('quests.ncs') for h in hits)
+        assert min(h.offset for h in hits) == 12 + 8
+
+
+def test_incremental_update(tmp_path, dump):
+    with CorpusIndex(str(tmp_path / 'idx.sqlite')) as idx:
+        idx.update(str(dump), workers=1)
+        assert idx.update(str(dump), workers=1)['unchanged'] == 2
+        os.remove(dump / 'quests.ncs')
+        (dump / 'sub' / 'inventory.ncs').write_bytes(make_ncs(30, seed=3))
+        s = idx.update(str(dump), workers=1)
+        assert (s['removed'], s['indexed'], s['unchanged']) == (1, 1, 0)
+        assert len(idx) == 1
+        if idx.trigram:
+            assert idx.search('unique_n') == []
+
+
+
+def test_spawn_pool_from_thread(tmp_path, dump):
+    # the GUI opens the index and updates it on a worker thread, with a spawn context
+    out = []
+
+    def work():
+        with CorpusIndex(str(tmp_path / 'idx.sqlite')) as idx:
+            out.append(idx.update(str(dump), workers=2, mp_context=multiprocessing.get_context('spawn')))
+            out.append(len(idx))
+
+    t = threading.Thread(target=work)
+    t.start()
+    t.join()
+    assert (out[0]['indexed'], out[0]['failed'], out[1]) == (2, 0, 2)
+
+
+def test_parse_guid():
+    g = uuid.UUID(int=12345)
+    assert parse_guid(str(g)) == g.bytes
+    assert parse_guid('{' + g.hex.upper() + '}') == g.bytes
+    assert parse_guid('not a guid') is None
@@ -0,0 +1,119 @@
+import os
+import zlib
+
+import pytest
+
+from parsers.patch import MIN_SIZE, BinaryPatch, apply_patch, apply_to, dumps, loads, make_patch, write_in_place
+from parsers.piecetable import PieceTable
+from parsers.source import FileSource
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('mapped', [False, True])
+def test_save_undo_save(tmp_path, mapped):
+    # what the editor does on saving over the open file
+    path = str(tmp_path / 'a.ncs')
+    # the edited bytes must differ from the originals, or changes() trims them
+    orig = os.urandom(100) + b'\0\0' + os.urandom(3994)
+    with open(path, 'wb') as f:
+        f.write(orig)
+    threshold = 1 if mapped else 1 << 30
+    sources = [FileSource(path, mmap_threshold=threshold)]
+    table = PieceTable(sources[0].buffer)
+
+    def save():
+        n = write_in_place(path, table.changes())
+        sources.append(FileSource(path, mmap_threshold=threshold))
+        table.rebase(sources[-1].buffer)
+        return n
+
+    table.replace(100, b'\xAA\xBB')
+    table.seal()
+    assert save() == 2
+    assert read(path) == table.tobytes()
+    assert table.changes() == []
+
+    assert table.undo() is not None
+    assert table.tobytes() == orig
+    assert save() == 2
+    assert read(path) == orig
+
+    assert table.redo() is not None
+    assert table[100:102] == b'\xAA\xBB'
+    assert save() == 2
+    assert read(path)[100:102] == b'\xAA\xBB'
+    for s in sources:
+        s.close()
+
+
+def test_rebase_needs_equal_length():
+    table = PieceTable(b'abc')
+    table.insert(0, b'x')
+    with pytest.raises(ValueError):
+        table.rebase(b'abc')
+
+
+def test_patch_round_trip():
+    source = os.urandom(10000)
+    table = PieceTable(source)
+    table.replace(10, b'xyz')
+    table.insert(5000, b'inserted')
+    table.delete(9000, 7)
+    patch = make_patch(source, table)
+    blob = dumps(patch)
+    back = loads(blob)
+    assert back.records == patch.records
+    assert apply_patch(source, back) == table.tobytes()
+    with pytest.raises(ValueError):
+        apply_patch(table.tobytes(), back)
+
+
+@pytest.mark.parametrize('cut', [0, 4, 5, 20, MIN_SIZE - 1])
+def test_loads_rejects_truncated(cut):
+    blob = dumps(make_patch(b'abcd', PieceTable(b'abcd')))
+    with pytest.raises(ValueError):
+        loads(blob[:cut])
+
+
+def test_loads_rejects_bad_layout():
+    table = PieceTable(b'abcdef')
+    table.replace(1, b'XY')
+    blob = bytearray(dumps(make_patch(b'abcdef', table)))
+    # claim one record more than stored, with a valid CRC
+    body = blob[:-4]
+    body[5 + 1 + 16 + 1 + 16] += 1
+    with pytest.raises(ValueError):
+        loads(bytes(body) + zlib.crc32(body).to_bytes(4, 'little'))
+
+
+@pytest.mark.parametrize('records', [
+    [(0, 2, b'XY'), (5, 2, b'XY'), (1, 1, b'Z')],  # unsorted: an earlier record runs past the end
+    [(2, 2, b'XY'), (0, 1, b'Z')],                 # unsorted
+    [(0, 3, b'XYZ'), (2, 1, b'Z')],                # overlapping
+])
+def test_bad_records_are_rejected(tmp_path, records):
+    path = tmp_path / 'a.ncs'
+    path.write_bytes(b'abcdef')
+    with pytest.raises(ValueError):
+        write_in_place(str(path), records)
+    assert path.read_bytes() == b'abcdef'
+    patch = BinaryPatch(6, b'', 6, b'', records)
+    with pytest.raises(ValueError):
+        apply_patch(b'abcdef', patch, verify=False)
+    table = PieceTable(b'abcdef')
+    with pytest.raises(ValueError):
+        apply_to(table, patch)
+    assert bytes(table) == b'abcdef'
+
+
+def test_loads_rejects_records_past_the_source():
+    table = PieceTable(b'abcdef')
+    table.replace(4, b'XY')
+    patch = make_patch(b'abcdef', table)
+    patch.source_size = 5
+    with pytest.raises(ValueError):
+        loads(dumps(patch))
@@ -0,0 +1,83 @@
+import random
+
+from parsers.patch import apply_patch, make_patch
+from parsers.piecetable import PieceTable
+
+
+def apply_changes(orig, changes):
+    out = bytearray()
+    pos = 0
+    for off, length, new in changes:
+        assert off >= pos
+        out += orig[pos:off] + new
+        pos = off + length
+    return bytes(out + orig[pos:])
+
+
+def test_random_edits_match_model():
+    rnd = random.Random(5)
+    for trial in range(200):
+        orig = rnd.randbytes(rnd.randrange(1, 200))
+        table = PieceTable(orig)
+        states = [orig]
+        for _ in range(rnd.randrange(1, 12)):
+            n = len(table)
+            off = rnd.randrange(n + 1)
+            op = rnd.random()
+            if op < 0.5 and off < n:
+                length = rnd.randrange(1, n - off + 1)
+                table.replace(off, rnd.randbytes(length))
+            elif op < 0.75:
+                table.insert(off, rnd.randbytes(rnd.randrange(1, 8)))
+            elif off < n:
+                table.delete(off, rnd.randrange(1, n - off + 1))
+            table.seal()
+            states.append(table.tobytes())
+            if rnd.random() < 0.3 and table.can_undo:
+                table.undo()
+                states.append(table.tobytes())
+            cur = table.tobytes()
+            assert len(table) == len(cur)
+            assert table[0:len(cur)] == cur
+            assert apply_changes(orig, table.changes()) == cur
+        while table.can_undo:
+            table.undo()
+        assert table.tobytes() == orig
+        assert table.changes() == []
+
+
+def test_overwrites_merge_into_one_undo_step():
+    table = PieceTable(b'0123456789')
+    table[2] = ord('a')
+    table[3] = ord('b')
+    table[4] = ord('c')
+    assert len(table.journal) == 1
+    table.seal()
+    table[5] = ord('d')
+    assert len(table.journal) == 2
+    table.undo()
+    table.undo()
+    assert table.tobytes() == b'0123456789'
+    table.redo()
+    assert table.tobytes() == b'01abc56789'
+
+
+def test_changes_are_trimmed_and_net():
+    table = PieceTable(b'abcdefgh')
+    table.replace(1, b'XYZ')
+    table.seal()
+    table.replace(3, b'd')
+    # the run is trimmed to its first and last differing byte
+    assert table.changes() == [(1, 2, b'XY')]
+    table.seal()
+    table.replace(1, b'bc')
+    assert table.changes() == []
+    table.undo()
+    assert apply_patch(b'abcdefgh', make_patch(b'abcdefgh', table)) == table.tobytes()
+
+
+def test_edited_ranges():
+    table = PieceTable(bytes(100))
+    table.replace(10, b'\1\1')
+    table.insert(50, b'\2')
+    assert list(table.edited_ranges()) == [(10, 2), (50, 1)]
@@ -0,0 +1,40 @@
+from parsers import REGISTRY, GenericParser, LootConfigParser, QuestParser, QuestsParser, InvNamePartParser
+from parsers.registry import HEAD_BYTES, ParserRegistry
+from parsers.schema import Schema, compile_schema
+
+
+def test_longest_token_wins():
+    assert REGISTRY.detect('quests.ncs') is QuestsParser
+    assert REGISTRY.detect('Quest_01.ncs') is QuestParser
+    assert REGISTRY.detect('dump/sub/inv_name_part0.ncs') is InvNamePartParser
+
+
+def test_loot_names():
+    assert REGISTRY.detect('loot_config.ncs') is LootConfigParser
+    assert REGISTRY.detect('loot_pool.ncs') is GenericParser
+
+
+def test_magic_takes_precedence():
+    signed = compile_schema(Schema('SignedParser', ['signed'], magic='SIG1'))
+    reg = ParserRegistry([QuestParser, signed, GenericParser], GenericParser)
+    assert reg.detect('quest.ncs', b'SIG1....') is signed
+    assert reg.detect('quest.ncs', b'NCS\0....') is QuestParser
+
+
+def test_custom_parser_gets_head(tmp_path):
+    seen = []
+
+    class Custom(GenericParser):
+        @staticmethod
+        def can_parse(filename, head):
+            seen.append(head)
+            return head.startswith(b'CUST')
+
+    path = tmp_path / 'thing.ncs'
+    path.write_bytes(b'CUST' + bytes(1000))
+    reg = ParserRegistry([Custom, GenericParser], GenericParser)
+    assert isinstance(reg.parser_for(str(path)), Custom)
+    assert seen == [b'CUST' + bytes(HEAD_BYTES - 4)]
+    # decisions are cached per path, size and mtime
+    reg.parser_for(str(path))
+    assert len(seen) == 1
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from conftest import make_ncs, plain
+from parsers.generic import GenericParser
+from parsers.inv_name_part import InvNamePartParser
+from parsers.loot_config import LootConfigParser
+from parsers.piecetable import PieceTable
+from parsers.schema import SCHEMA_PARSERS
+
+
+# reparse keeps the record boundaries, so the stride guess that produced
+# them is kept too (re-detecting it costs as much as a full parse)
+LAYOUT_KEYS = ('record_stride', 'header_size', 'record_count', 'stride_confidence')
+
+
+def comparable(res):
+    s = plain(res['structured'])
+    for k in LAYOUT_KEYS:
+        s['guessed'].pop(k, None)
+    return s
+
+
+def check(parser, raw, edits):
+    # apply edits one by one through reparse and compare with a full parse
+    res = parser.parse_bytes(raw)
+    table = PieceTable(raw)
+    for offset, new in edits:
+        table.replace(offset, new)
+        res, _ = parser.reparse(res, table, offset, offset + len(new))
+        assert comparable(res) == comparable(parser.parse_bytes(table.tobytes()))
+    return res
+
+
+def test_inv_name_part_display_name():
+    raw = make_ncs(200)
+    res = check(InvNamePartParser(), raw, [(5000, b'B' * 70)])
+    assert 'B' * 70 in res['structured']['guessed']['display_name']
+
+
+def test_loot_config_weights_preview():
+    raw = make_ncs(50)
+    res = check(LootConfigParser(), raw, [(20, b'\x01\x00\x00\x00')])
+    assert res['structured']['guessed']['weights_preview'][5] == 1
+
+
+@pytest.mark.parametrize('parser', [GenericParser(), InvNamePartParser(), SCHEMA_PARSERS['QuestsParser']()],
+                         ids=lambda p: type(p).__name__)
+def test_random_edits(parser):
+    rnd = random.Random(7)
+    raw = make_ncs(150, 64, text_guids=[0, 7, 14])
+    edits = []
+    for _ in range(8):
+        n = rnd.randrange(1, 40)
+        off = rnd.randrange(0, len(raw) - n)
+        edits.append((off, rnd.choice([rnd.randbytes(n), b'Z' * n, b'\0' * n, bytes(range(16)).hex().encode()[:n]])))
+    check(parser, raw, edits)
+
+
+def test_deleting_the_only_guid_and_strings():
+    raw = make_ncs(20, text_guids=[0])
+    text_at = raw.rindex(b'\x00', 0, len(raw) - 1) + 1
+    p = InvNamePartParser()
+    assert 'primary_guid' in p.parse_bytes(raw)['structured']['guessed']
+    res = check(p, raw, [(text_at, b'Z' * 32)])
+    assert 'primary_guid' not in res['structured']['guessed']
+
+    # the record boundaries of an all-zero file differ, so only the guesses are compared
+    raw = bytes(200) + b'Only_String' + bytes(200)
+    res = p.parse_bytes(raw)
+    assert res['structured']['guessed']['display_name'] == 'Only_String'
+    table = PieceTable(raw)
+    table.replace(200, bytes(11))
+    res, _ = p.reparse(res, table, 200, 211)
+    assert 'display_name' not in res['structured']['guessed']
+
@@ -0,0 +1,92 @@
+import mmap
+import random
+import re
+
+import pytest
+
+from conftest import make_ncs
+from parsers import scanner
+from parsers.base import BaseParser
+
+
+# the extractors the scanner replaced, kept as references
+
+def old_ascii_runs(raw, min_len=4):
+    return [r.decode('utf-8', errors='replace') for r in re.findall(rb'[ -~]{%d,}' % (min_len,), raw)]
+
+
+def old_null_strings(raw, min_len=2):
+    res = []
+    i = 0
+    while i < len(raw):
+        j = raw.find(b'\x00', i)
+        if j == -1:
+            if len(raw) - i >= min_len:
+                res.append((i, raw[i:].decode('utf-8', errors='replace')))
+            break
+        if j - i >= min_len:
+            res.append((i, raw[i:j].decode('utf-8', errors='replace')))
+        i = j + 1
+    return res
+
+
+def old_guids(raw):
+    guids = set()
+    candidates = old_ascii_runs(raw, 8) + [s for _, s in old_null_strings(raw, 8)]
+    for s in candidates:
+        for tok in re.split(r'[^0-9A-Fa-f]', s):
+            if len(tok) == 32 and all(c in '0123456789abcdefABCDEF' for c in tok):
+                guids.add(tok.upper())
+    return guids
+
+
+def samples():
+    rnd = random.Random(3)
+    yield make_ncs(100)
+    yield rnd.randbytes(20000)
+    # text-heavy: words, hex runs, NULs and high bytes
+    parts = []
+    for _ in range(2000):
+        parts.append(rnd.choice([b'\0', b'\0\0', b' ', b'\xff', b'-', b'name_' + str(rnd.randrange(999)).encode(),
+                                 rnd.randbytes(16).hex().encode(), rnd.randbytes(17).hex().upper().encode()[:rnd.randrange(40)],
+                                 'ünï'.encode()]))
+    yield b''.join(parts)
+
+
+@pytest.mark.parametrize('raw', list(samples()), ids=['table', 'random', 'text'])
+def test_matches_old_extractors(raw):
+    p = BaseParser()
+    assert p.find_ascii_runs(raw, 4) == old_ascii_runs(raw, 4)
+    assert p.extract_null_strings(raw, 3) == old_null_strings(raw, 3)
+    assert set(p.extract_guids(raw)) == old_guids(raw)
+
+
+def test_token_offsets_are_exact():
+    raw = b'abc\0' + b'abc\0' + b'\x01' * 5 + b'Hello World\0' + bytes(range(16)).hex().encode()
+    for t in scanner.scan(raw, min_string=3, min_ascii=4):
+        if t.kind == scanner.GUID:
+            assert raw[t.offset:t.offset + t.length].decode().upper() == t.text
+        else:
+            assert raw[t.offset:t.offset + t.length].decode('utf-8', errors='replace') == t.text
+    strings = [(t.offset, t.text) for t in scanner.scan(raw, min_string=3) if t.kind == scanner.STRING]
+    assert strings[:2] == [(0, 'abc'), (4, 'abc')]
+
+
+def test_guid_needs_hex_boundaries():
+    g = bytes(range(16)).hex()
+    kinds = lambda raw: [t.text for t in scanner.scan(raw.encode()) if t.kind == scanner.GUID]
+    assert kinds(f'x{g}x') == [g.upper()]
+    assert kinds(f'a{g}') == []
+    assert kinds(f'{g}{g}') == []
+
+
+def test_byte_histogram_inputs(tmp_path):
+    raw = make_ncs(50) + bytes(range(256))
+    want = [raw.count(i) for i in range(256)]
+    p = BaseParser()
+    assert p.byte_histogram(raw) == want
+    assert p.byte_histogram(memoryview(raw)) == want
+    path = tmp_path / 'x.ncs'
+    path.write_bytes(raw)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        assert p.byte_histogram(mm) == want
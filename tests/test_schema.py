@@ -0,0 +1,59 @@
+import struct
+
+import pytest
+
+from conftest import make_ncs
+from parsers.schema import Layout, Schema, compile_schema
+
+RECORD = [('id', 'I'), ('weight', 'f'), ('guid', 'guid'), ('name', '16s'), ('pad', '8x')]
+Table = compile_schema(Schema('TableParser', ['table'], header=[('magic', '4s'), ('version', 'I'), ('count', 'i')],
+                              record=RECORD, count_field='count'))
+
+
+def with_count(raw, count):
+    return raw[:8] + struct.pack('<i', count) + raw[12:]
+
+
+def test_records_from_schema():
+    s = Table().parse_bytes(make_ncs(10))['structured']
+    types = [r['type'] for r in s['records']]
+    assert types == ['header'] + ['record'] * 10
+    assert s['header']['count'] == 10
+    assert s['records'][3]['fields']['name'] == 'Item_00002'
+
+
+@pytest.mark.parametrize('count', [3, 10, 11, 1 << 30])
+def test_count_is_clamped(count):
+    s = Table().parse_bytes(with_count(make_ncs(10), count))['structured']
+    records = [r for r in s['records'] if r['type'] == 'record']
+    assert len(records) == min(count, 10)
+    assert sum(r['length'] for r in s['records']) == 12 + 10 * 48
+
+
+def test_negative_count_is_malformed():
+    s = Table().parse_bytes(with_count(make_ncs(10), -5))['structured']
+    assert [r['type'] for r in s['records']] == ['header', 'malformed']
+    assert s['records'][1]['offset'] == 12 and s['records'][1]['length'] == 480
+    assert 'error' in s['metadata']['segmentation']
+
+
+def test_layout_pack_keeps_unchanged_bytes():
+    layout = Layout(RECORD)
+    old = make_ncs(1)[12:]
+    values = layout.unpack(old)
+    assert layout.pack(values, old) == old
+    values['weight'] = 2.5
+    new = layout.pack(values, old)
+    assert layout.unpack(new)['weight'] == 2.5
+    assert new[:4] == old[:4] and new[8:] == old[8:]
+
+
+def test_to_bytes_writes_edited_fields():
+    raw = make_ncs(10)
+    p = Table()
+    res = p.parse_bytes(raw)
+    res['structured']['records'][4]['fields']['id'] = 99
+    out = p.to_bytes(res)
+    assert len(out) == len(raw)
+    assert struct.unpack_from('<I', out, 12 + 3 * 48)[0] == 99
+    assert out[:12 + 3 * 48] == raw[:12 + 3 * 48] and out[16 + 3 * 48:] == raw[16 + 3 * 48:]
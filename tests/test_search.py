@@ -0,0 +1,56 @@
+import random
+import struct
+
+import pytest
+
+from parsers.piecetable import PieceTable
+from parsers.search import compile_pattern, find_all, iter_search
+
+
+def naive(data, needle):
+    return [i for i in range(len(data) - len(needle) + 1) if data[i:i + len(needle)] == needle]
+
+
+@pytest.fixture
+def data():
+    rnd = random.Random(4)
+    raw = bytearray(rnd.randbytes(5000))
+    for off in (0, 1234, 4000, 4996):
+        raw[off:off + 4] = b'NcS\x07'
+    raw[2000:2008] = 'Ab'.encode('utf-16-le') + struct.pack('<f', 1.5)
+    return bytes(raw)
+
+
+def test_hex_with_wildcards(data):
+    p = compile_pattern('4E 63 ?? 07')
+    assert find_all(data, p) == naive(data, b'NcS\x07')
+    with pytest.raises(ValueError):
+        compile_pattern('4E 6')
+    with pytest.raises(ValueError):
+        compile_pattern('?? ??')
+
+
+def test_text_modes(data):
+    assert find_all(data, compile_pattern('NcS', 'ascii')) == naive(data, b'NcS')
+    assert find_all(data, compile_pattern('ncs', 'ascii', ignore_case=True)) == naive(data.lower(), b'ncs')
+    assert find_all(data, compile_pattern('Ab', 'utf16')) == [2000]
+    assert find_all(data, compile_pattern('1.5', 'float32')) == naive(data, struct.pack('<f', 1.5))
+    assert find_all(b'\0\xff\xff\xff\xff', compile_pattern('-1', 'int32')) == [1]
+    assert find_all(struct.pack('<I', 0xFFFFFFFE), compile_pattern('0xFFFFFFFE', 'int32')) == [0]
+
+
+def test_matches_across_chunks(data):
+    p = compile_pattern('NcS', 'ascii')
+    hits = [h for chunk in iter_search(data, p, chunk=7) for h in chunk]
+    assert hits == naive(data, b'NcS')
+
+
+def test_edited_piece_table(data):
+    table = PieceTable(data)
+    table.replace(3000, b'NcS\x07')
+    table.delete(10, 5)
+    p = compile_pattern('4E 63 53 07')
+    expected = naive(table.tobytes(), b'NcS\x07')
+    assert find_all(table, p) == expected
+    assert [h for c in iter_search(table, p, chunk=100) for h in c] == expected
+    assert find_all(table, p, start=expected[1], end=expected[-1]) == expected[1:-1]
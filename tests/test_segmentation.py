@@ -0,0 +1,48 @@
+import pytest
+
+from conftest import make_ncs
+from parsers import segmentation
+from parsers.generic import GenericParser
+from parsers.segmentation import DetectedStrideSegmenter, Segmenter, make_segmenter
+
+
+class EveryK(Segmenter):
+    name = 'every_k'
+
+    def boundaries(self, raw, tokens, guid_occ, layout=None, layout_known=False):
+        return set(range(0, len(raw), 100)) | {len(raw)}
+
+
+def test_segmenter_is_abstract():
+    with pytest.raises(TypeError):
+        Segmenter()
+
+
+def test_plain_strategy_in_parser():
+    class P(GenericParser):
+        def segmenter(self):
+            return EveryK()
+
+    raw = make_ncs(20)
+    records = P().parse_bytes(raw)['structured']['records']
+    assert [r['offset'] for r in records] == list(range(0, len(raw), 100))
+    assert records[-1]['offset'] + records[-1]['length'] == len(raw)
+
+
+def test_known_layout_skips_detection(monkeypatch):
+    calls = []
+    monkeypatch.setattr(segmentation, 'detect_stride', lambda raw: calls.append(1))
+    seg = DetectedStrideSegmenter()
+    seg.boundaries(b'x' * 64, [], [], None, layout_known=True)
+    assert calls == [] and seg.describe()['fallback'] == 'tokens'
+    seg.boundaries(b'x' * 64, [], [])
+    assert calls == [1]
+
+
+def test_budget_thins_records():
+    raw = make_ncs(200)
+    P = type('P', (GenericParser,), {'segmentation': {'strategy': 'detected', 'max_records': 50}})
+    s = P().parse_bytes(raw)['structured']
+    assert len(s['records']) <= 50
+    assert s['metadata']['segmentation']['thinned_by'] > 1
+    assert make_segmenter('fixed').limit([0, 1, 2]) == [0, 1, 2]
@@ -0,0 +1,37 @@
+import logging
+
+from parsers.base import find_bytes
+from parsers.source import FileSource
+
+
+def make(tmp_path, data):
+    path = tmp_path / 'f.ncs'
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_close_unmaps(tmp_path):
+    src = FileSource(make(tmp_path, b'abc' * 100), mmap_threshold=1)
+    assert src.mapped
+    src.close()
+    assert not src.mapped and len(src) == 0
+
+
+def test_close_with_live_slice_leaves_mapping_open(tmp_path, caplog):
+    src = FileSource(make(tmp_path, b'abc' * 100), mmap_threshold=1)
+    view = src.buffer[3:9]
+    with caplog.at_level(logging.DEBUG, logger='parsers.source'):
+        src.close()
+    assert src.mapped and 'left mapped' in caplog.text
+    assert bytes(view) == b'abcabc'
+    view.release()
+    src.close()
+    assert not src.mapped
+
+
+def test_find_bytes_on_views():
+    data = b'xx\0yy\0zz'
+    for raw in (data, memoryview(data), memoryview(data)[1:]):
+        assert find_bytes(raw, b'\0') == bytes(raw).find(b'\0')
+        assert find_bytes(raw, b'\0', 4) == bytes(raw).find(b'\0', 4)
+        assert find_bytes(raw, b'q') == -1
@@ -0,0 +1,22 @@
+import random
+
+import pytest
+
+from conftest import make_ncs
+from parsers.stride import detect_stride
+
+
+@pytest.mark.parametrize('stride', [32, 48, 64])
+def test_detects_stride_and_header(stride):
+    raw = make_ncs(400, stride)
+    guess = detect_stride(raw)
+    assert guess is not None
+    assert (guess.stride, guess.header, guess.count) == (stride, 12, 400)
+
+
+def test_random_bytes_have_no_stride():
+    assert detect_stride(random.Random(2).randbytes(50000)) is None
+
+
+def test_too_small():
+    assert detect_stride(b'abcd' * 4) is None
@@ -0,0 +1,739 @@
+import tkinter as tk
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from tkinter import ttk
+import tkinter.font as tkfont
+
+from parsers.piecetable import PieceTable
+from parsers.search import MODES, MAX_HITS, compile_pattern, iter_search
+
+
+class VirtualTable(tk.Frame):
+    # A Treeview that only holds the rows currently on screen. Records stay in
+    # a plain sequence and format_row(record) is called for visible rows only,
+    # so the widget cost is independent of the record count.
+    def __init__(self, parent, columns, format_row, widths=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.format_row = format_row
+        self.records = []
+        self.top = 0
+        self.selected = None
+        self.on_select = None
+        self._row_height = None
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', selectmode='browse')
+        for c in columns:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=(widths or {}).get(c, 140), anchor='w')
+        self.tree.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
+        self.scroll = ttk.Scrollbar(self, command=self.yview)
+        self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind('<Configure>', lambda e: self.refresh())
+        self.tree.bind('<<TreeviewSelect>>', self._on_tree_select)
+        self.tree.bind('<MouseWheel>', self._on_wheel)
+        self.tree.bind('<Button-4>', lambda e: self._scroll_rows(-3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll_rows(3))
+        self.tree.bind('<Up>', lambda e: self._move(-1))
+        self.tree.bind('<Down>', lambda e: self._move(1))
+        self.tree.bind('<Prior>', lambda e: self._move(-self.visible_rows()))
+        self.tree.bind('<Next>', lambda e: self._move(self.visible_rows()))
+        self.tree.bind('<Home>', lambda e: self._move(-len(self.records)))
+        self.tree.bind('<End>', lambda e: self._move(len(self.records)))
+
+    def set_records(self, records, keep_position=False):
+        self.records = records
+        if not keep_position:
+            self.top = 0
+            self.selected = None
+        elif self.selected is not None and self.selected >= len(records):
+            self.selected = None
+        self.top = self._clamp(self.top)
+        self.refresh()
+
+    def visible_rows(self):
+        items = self.tree.get_children()
+        if items and self._row_height is None:
+            box = self.tree.bbox(items[0])
+            if box:
+                self._row_height = (box[1], box[3])
+        head, h = self._row_height or (24, 20)
+        return max(1, (self.tree.winfo_height() - head) // h)
+
+    def _clamp(self, top):
+        return max(0, min(top, len(self.records) - self.visible_rows()))
+
+    def refresh(self):
+        n = max(0, min(self.visible_rows(), len(self.records) - self.top))
+        items = self.tree.get_children()
+        for i in range(n):
+            values = self.format_row(self.records[self.top + i])
+            if i < len(items):
+                self.tree.item(items[i], values=values)
+            else:
+                self.tree.insert('', 'end', iid=str(i), values=values)
+        if len(items) > n:
+            self.tree.delete(*items[n:])
+        sel = self.selected
+        if sel is not None and self.top <= sel < self.top + n:
+            self.tree.selection_set(str(sel - self.top))
+        else:
+            self.tree.selection_set(())
+        total = len(self.records)
+        if total:
+            self.scroll.set(self.top / total, (self.top + n) / total)
+        else:
+            self.scroll.set(0, 1)
+
+    def yview(self, *args):
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * len(self.records)))
+        elif args[0] == 'scroll':
+            n = int(args[1])
+            self._scroll_rows(n * self.visible_rows() if args[2] == 'pages' else n)
+
+    def scroll_to(self, top):
+        top = self._clamp(top)
+        if top != self.top:
+            self.top = top
+            self.refresh()
+
+    def see(self, index):
+        rows = self.visible_rows()
+        if index < self.top:
+            self.scroll_to(index)
+        elif index >= self.top + rows:
+            self.scroll_to(index - rows + 1)
+
+    def select(self, index):
+        if not self.records:
+            return
+        self.selected = max(0, min(index, len(self.records) - 1))
+        self.see(self.selected)
+        self.refresh()
+        if self.on_select:
+            self.on_select(self.selected, self.records[self.selected])
+
+    def _scroll_rows(self, n):
+        self.scroll_to(self.top + n)
+        return 'break'
+
+    def _on_wheel(self, event):
+        step = -event.delta // 120 if abs(event.delta) >= 120 else (-1 if event.delta > 0 else 1)
+        return self._scroll_rows(3 * step)
+
+    def _move(self, n):
+        self.select((self.top if self.selected is None else self.selected) + n)
+        return 'break'
+
+    def _on_tree_select(self, event=None):
+        sel = self.tree.selection()
+        if not sel:
+            return
+        index = self.top + int(sel[0])
+        if index != self.selected:
+            self.selected = index
+            if self.on_select:
+                self.on_select(index, self.records[index])
+
+
+# children of big containers are shown in ranges of at most this many
+GROUP = 1000
+
+
+def preview(value, limit=200):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        head = bytes(value[:32]).hex(' ').upper()
+        return f'<{len(value)} bytes> {head}' + (' ...' if len(value) > 32 else '')
+    if isinstance(value, Mapping):
+        return f'{{{len(value)} keys}}'
+    if isinstance(value, (list, tuple)):
+        return f'[{len(value)} items]'
+    text = repr(value) if isinstance(value, str) else str(value)
+    return text if len(text) <= limit else text[:limit] + ' ...'
+
+
+def _open_order(path):
+    # parents first; a range node before the elements and smaller ranges it holds
+    last = path[-1] if path else None
+    if isinstance(last, tuple):
+        return len(path), 0, last[1] - last[2]
+    return len(path), 1, 0
+
+
+def _expandable(value):
+    return isinstance(value, (Mapping, list, tuple)) and len(value) > 0
+
+
+class JsonTree(tk.Frame):
+    # Collapsible view of a parse result. Nodes are created when their parent
+    # is expanded and values are only formatted for created nodes, so the
+    # cost follows what is on screen rather than the size of the result.
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.root = None
+        self.tree = ttk.Treeview(self, columns=('value',), selectmode='browse')
+        self.tree.heading('#0', text='Key')
+        self.tree.heading('value', text='Value')
+        self.tree.column('#0', width=260, stretch=False)
+        self.tree.column('value', width=600, anchor='w')
+        self.tree.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
+        scroll = ttk.Scrollbar(self, command=self.tree.yview)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.config(yscrollcommand=scroll.set)
+        self.tree.bind('<<TreeviewOpen>>', self._on_open)
+        self._nodes = {}
+        self._by_path = {}
+
+    def set_data(self, obj, keep_open=False):
+        opened = []
+        first = self.tree.yview()[0]
+        if keep_open:
+            opened = sorted((self._nodes[i][0] for i in self._nodes if self.tree.item(i, 'open')), key=_open_order)
+        self.tree.delete(*self.tree.get_children())
+        self._nodes.clear()
+        self._by_path.clear()
+        self.root = obj
+        if obj is None:
+            return
+        self._fill('', (), obj)
+        for path in opened:
+            iid = self._by_path.get(path)
+            if iid is not None:
+                self.tree.item(iid, open=True)
+                self._expand(iid)
+        if keep_open:
+            self.tree.yview_moveto(first)
+
+    def refresh(self):
+        # re-read every created node, e.g. after the result was patched in place
+        self.set_data(self.root, keep_open=True)
+
+    def _add(self, parent, path, key, value):
+        iid = self.tree.insert(parent, 'end', text=str(key), values=(preview(value),))
+        self._nodes[iid] = (path, value)
+        self._by_path[path] = iid
+        if _expandable(value):
+            # placeholder so the node shows an expander
+            self.tree.insert(iid, 'end', text='...')
+        return iid
+
+    def _fill(self, parent, path, value, lo=0, hi=None):
+        if isinstance(value, Mapping):
+            for k in value:
+                self._add(parent, path + (k,), k, value[k])
+            return
+        hi = len(value) if hi is None else hi
+        span = 1
+        while (hi - lo) > span * GROUP:
+            span *= GROUP
+        if span == 1:
+            for i in range(lo, hi):
+                self._add(parent, path + (i,), i, value[i])
+            return
+        for a in range(lo, hi, span):
+            b = min(a + span, hi)
+            iid = self.tree.insert(parent, 'end', text=f'[{a} .. {b - 1}]', values=(f'{b - a} items',))
+            gpath = path + (('range', a, b),)
+            self._nodes[iid] = (gpath, (value, a, b))
+            self._by_path[gpath] = iid
+            self.tree.insert(iid, 'end', text='...')
+
+    def _expand(self, iid):
+        children = self.tree.get_children(iid)
+        if len(children) != 1 or children[0] in self._nodes:
+            return
+        self.tree.delete(children[0])
+        path, value = self._nodes[iid]
+        if path and isinstance(path[-1], tuple) and path[-1][0] == 'range':
+            seq, a, b = value
+            # elements keep their list index in the path, not the range
+            self._fill(iid, path[:-1], seq, a, b)
+        else:
+            self._fill(iid, path, value)
+
+    def _on_open(self, event=None):
+        iid = self.tree.focus()
+        if iid:
+            self._expand(iid)
+
+
+HEX_COL = 11
+WIDTH = 16
+ASCII_COL = HEX_COL + WIDTH * 3 + 2
+
+
+def format_hex(data, width=WIDTH, base=0):
+    lines = []
+    for offset in range(0, len(data), width):
+        chunk = data[offset:offset + width]
+        hex_part = " ".join(f"{b:02X}" for b in chunk).ljust(width * 3)
+        ascii_part = "".join(chr(b) if 32 <= b <= 126 else "." for b in chunk)
+        lines.append(f"{base + offset:08X}:  {hex_part}  {ascii_part}")
+    return "\n".join(lines)
+
+
+class HexEditor(tk.Frame):
+    # Paged hex/ASCII view over a PieceTable wrapping the parse buffer (which
+    # may be a memoryview of an mmap). Only the lines on screen are formatted;
+    # cursor and selection are byte offsets, so they survive scrolling.
+    # Editing overwrites bytes as piece-table patches, redraws the touched
+    # line and reports on_change(start, end).
+    def __init__(self, parent, data=b'', on_change=None, **kwargs):
+        bg = kwargs.get('bg', '#1e1e1e')
+        super().__init__(parent, bg=bg)
+        self.on_change = on_change
+        self.data = PieceTable(data)
+        self.top = 0
+        self.cursor = 0
+        self.nibble = 0
+        self.anchor = None
+        self.area = 'hex'
+        # sorted match offsets of the last search, all hit_length bytes long
+        self.hits = []
+        self.hit_length = 0
+        self._search_key = None
+        self._search_job = None
+        # sorted, non-overlapping (start, end) ranges drawn with the 'mark' tag
+        self.marks = []
+        self._mark_starts = []
+
+        bar = tk.Frame(self, bg='#2b2b2b')
+        bar.pack(side=tk.TOP, fill=tk.X)
+        tk.Label(bar, text='Go to offset', bg='#2b2b2b', fg='#cccccc').pack(side=tk.LEFT, padx=4)
+        self.goto_entry = tk.Entry(bar, width=14)
+        self.goto_entry.pack(side=tk.LEFT, padx=4, pady=3)
+        self.goto_entry.bind('<Return>', lambda e: self.goto_text(self.goto_entry.get()))
+        tk.Button(bar, text='Go', command=lambda: self.goto_text(self.goto_entry.get())).pack(side=tk.LEFT)
+        tk.Label(bar, text='Find', bg='#2b2b2b', fg='#cccccc').pack(side=tk.LEFT, padx=(12, 4))
+        self.find_mode = ttk.Combobox(bar, values=MODES, width=7, state='readonly')
+        self.find_mode.set(MODES[0])
+        self.find_mode.pack(side=tk.LEFT, padx=2)
+        self.find_entry = tk.Entry(bar, width=28)
+        self.find_entry.pack(side=tk.LEFT, padx=4, pady=3)
+        self.find_entry.bind('<Return>', lambda e: self.find(1))
+        self.find_entry.bind('<Shift-Return>', lambda e: self.find(-1))
+        self.find_case = tk.BooleanVar(value=False)
+        tk.Checkbutton(bar, text='Ignore case', variable=self.find_case, bg='#2b2b2b', fg='#cccccc',
+                       selectcolor='#1e1e1e', activebackground='#2b2b2b').pack(side=tk.LEFT)
+        tk.Button(bar, text='<', command=lambda: self.find(-1)).pack(side=tk.LEFT)
+        tk.Button(bar, text='>', command=lambda: self.find(1)).pack(side=tk.LEFT)
+        self.info = tk.Label(bar, text='', bg='#2b2b2b', fg='#cccccc')
+        self.info.pack(side=tk.RIGHT, padx=6)
+
+        self.text = tk.Text(self, wrap='none', padx=4, pady=4, font=("Courier New", 10), **kwargs)
+        self.text.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
+        self.scroll = ttk.Scrollbar(self, command=self.yview)
+        self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        # created first so the selection and cursor draw over them
+        self.text.tag_configure('mark', background='#4b1818')
+        self.text.tag_configure('match', background='#613214')
+        self.text.tag_configure('sel_bytes', background='#264f78')
+        self.text.tag_configure('cursor', background='#007acc', foreground='white')
+        self._line_height = tkfont.Font(font=self.text.cget('font')).metrics('linespace')
+
+        t = self.text
+        t.bind('<Configure>', lambda e: self.render())
+        t.bind('<Key>', self._on_key)
+        t.bind('<Button-1>', self._on_click)
+        t.bind('<Shift-Button-1>', lambda e: self._on_click(e, extend=True))
+        t.bind('<B1-Motion>', self._on_drag)
+        t.bind('<Double-Button-1>', lambda e: 'break')
+        t.bind('<Triple-Button-1>', lambda e: 'break')
+        t.bind('<MouseWheel>', self._on_wheel)
+        t.bind('<Button-4>', lambda e: self._scroll_lines(-3))
+        t.bind('<Button-5>', lambda e: self._scroll_lines(3))
+        for ev in ('<<Paste>>', '<<Cut>>', '<<Clear>>', '<<Undo>>', '<<Redo>>', '<Button-2>', '<ButtonRelease-2>'):
+            t.bind(ev, lambda e: 'break')
+        self.render()
+
+    # buffer
+
+    def set_data(self, data, keep_position=False):
+        self.cancel_search()
+        self.hits = []
+        self.marks, self._mark_starts = [], []
+        self.data = data if isinstance(data, PieceTable) else PieceTable(data)
+        if not keep_position:
+            self.top = self.cursor = self.nibble = 0
+            self.anchor = None
+        self.cursor = min(self.cursor, max(0, len(data) - 1))
+        self.top = self._clamp(self.top)
+        self.render()
+
+    def get_bytes(self) -> bytes:
+        return self.data.tobytes()
+
+    def write(self, offset, value):
+        self.data.replace(offset, bytes((value,)))
+        # hits stay drawn, but the next Find searches again
+        self._search_key = None
+        self._redraw_line(offset)
+        if self.on_change:
+            self.on_change(offset, offset + 1)
+
+    def undo(self, redo=False):
+        p = self.data.redo() if redo else self.data.undo()
+        if p is None:
+            self.bell()
+            return 'break'
+        self._search_key = None
+        self.anchor = None
+        self.cursor, self.nibble = min(p.offset, max(0, len(self.data) - 1)), 0
+        self.see(self.cursor)
+        self.render()
+        if self.on_change:
+            self.on_change(p.offset, p.offset + max(len(p.old), len(p.new)))
+        return 'break'
+
+    def set_marks(self, ranges):
+        self.marks = sorted((a, b) for a, b in ranges if b > a)
+        self._mark_starts = [a for a, _ in self.marks]
+        self.render()
+
+    def selection(self):
+        if self.anchor is None or self.anchor == self.cursor:
+            return None
+        lo, hi = sorted((self.anchor, self.cursor))
+        return lo, hi + 1
+
+    # geometry
+
+    def visible_lines(self):
+        h = self.text.winfo_height() - 2 * int(self.text.cget('pady')) - 2 * int(self.text.cget('bd'))
+        return max(1, h // self._line_height)
+
+    def total_lines(self):
+        return (len(self.data) + WIDTH - 1) // WIDTH
+
+    def _clamp(self, top):
+        return max(0, min(top, self.total_lines() - self.visible_lines()))
+
+    def render(self):
+        lines = self.visible_lines()
+        start = self.top * WIDTH
+        chunk = self.data[start:start + lines * WIDTH]
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', format_hex(chunk, WIDTH, start))
+        self._decorate()
+
+    def _redraw_line(self, offset):
+        line_start = offset - offset % WIDTH
+        line, _ = self._index(line_start)
+        if not 1 <= line <= self.visible_lines():
+            return
+        chunk = self.data[line_start:line_start + WIDTH]
+        self.text.delete(f'{line}.0', f'{line}.end')
+        self.text.insert(f'{line}.0', format_hex(chunk, WIDTH, line_start))
+
+    def _decorate(self):
+        # selection, cursor, scrollbar and status for the lines on screen
+        t = self.text
+        t.tag_remove('mark', '1.0', tk.END)
+        t.tag_remove('match', '1.0', tk.END)
+        t.tag_remove('sel_bytes', '1.0', tk.END)
+        t.tag_remove('cursor', '1.0', tk.END)
+        lines = self.visible_lines()
+        start = self.top * WIDTH
+        end = min(start + lines * WIDTH, len(self.data))
+        i = max(0, bisect_right(self._mark_starts, start) - 1)
+        while i < len(self.marks) and self.marks[i][0] < end:
+            self._tag_range('mark', *self.marks[i], start, end)
+            i += 1
+        if self.hits:
+            lo = bisect_left(self.hits, start - self.hit_length + 1)
+            for h in self.hits[lo:bisect_left(self.hits, end)]:
+                self._tag_range('match', h, h + self.hit_length, start, end)
+        sel = self.selection()
+        if sel:
+            self._tag_range('sel_bytes', sel[0], sel[1], start, end)
+        if start <= self.cursor < end:
+            line, col = self._index(self.cursor)
+            hc = HEX_COL + 3 * col + self.nibble
+            t.tag_add('cursor', f'{line}.{hc}', f'{line}.{hc + 1}')
+            t.tag_add('cursor', f'{line}.{ASCII_COL + col}', f'{line}.{ASCII_COL + col + 1}')
+            t.mark_set(tk.INSERT, f'{line}.{hc}' if self.area == 'hex' else f'{line}.{ASCII_COL + col}')
+        total = self.total_lines()
+        if total:
+            self.scroll.set(self.top / total, min(1.0, (self.top + lines) / total))
+        else:
+            self.scroll.set(0, 1)
+        msg = f'Offset 0x{self.cursor:X} ({self.cursor})'
+        if sel:
+            msg += f'  Selected {sel[1] - sel[0]} bytes'
+        if self.hits:
+            n = f"{len(self.hits)}{'+' if len(self.hits) >= MAX_HITS else ''}"
+            span = sel or (self.cursor, self.cursor + 1)
+            i = bisect_left(self.hits, span[0])
+            if i < len(self.hits) and self.hits[i] == span[0] and span[1] - span[0] == self.hit_length:
+                msg += f'  Match {i + 1} of {n}'
+            else:
+                msg += f'  {n} matches'
+        self.info.config(text=msg)
+
+    def _index(self, offset):
+        rel = offset - self.top * WIDTH
+        return rel // WIDTH + 1, rel % WIDTH
+
+    def _tag_range(self, tag, lo, hi, start, end):
+        # tag bytes lo..hi, clipped to the page start..end
+        lo, hi = max(lo, start), min(hi, end)
+        for line_start in range(lo - (lo - start) % WIDTH, hi, WIDTH):
+            self._tag_bytes(tag, max(lo, line_start), min(hi, line_start + WIDTH))
+
+    def _tag_bytes(self, tag, a, b):
+        # a..b lie on one line
+        line, c0 = self._index(a)
+        c1 = c0 + (b - a)
+        self.text.tag_add(tag, f'{line}.{HEX_COL + 3 * c0}', f'{line}.{HEX_COL + 3 * c1 - 1}')
+        self.text.tag_add(tag, f'{line}.{ASCII_COL + c0}', f'{line}.{ASCII_COL + c1}')
+
+    # navigation
+
+    def yview(self, *args):
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * self.total_lines()))
+        elif args[0] == 'scroll':
+            n = int(args[1])
+            self._scroll_lines(n * self.visible_lines() if args[2] == 'pages' else n)
+
+    def scroll_to(self, top):
+        top = self._clamp(top)
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def _scroll_lines(self, n):
+        self.scroll_to(self.top + n)
+        return 'break'
+
+    def see(self, offset):
+        line = offset // WIDTH
+        lines = self.visible_lines()
+        if line < self.top:
+            self.top = self._clamp(line)
+        elif line >= self.top + lines:
+            self.top = self._clamp(line - lines + 1)
+
+    def goto(self, offset, select_to=None):
+        if not len(self.data):
+            return
+        offset = max(0, min(offset, len(self.data) - 1))
+        self.data.seal()
+        self.anchor = None if select_to is None else offset
+        self.cursor = offset if select_to is None else max(0, min(select_to, len(self.data)) - 1)
+        self.nibble = 0
+        self.see(offset)
+        self.render()
+
+    def goto_text(self, s):
+        try:
+            s = s.strip()
+            # like the offset column, bare digits are hex; a leading '#' means decimal
+            self.goto(int(s[1:]) if s.startswith('#') else int(s, 16))
+        except ValueError:
+            self.bell()
+        self.text.focus_set()
+        return 'break'
+
+    # search
+
+    def find(self, direction=1):
+        # Return / the arrow buttons: search when the query changed, else step
+        key = (self.find_mode.get(), self.find_entry.get().strip(), self.find_case.get())
+        if key != self._search_key:
+            self.start_search(*key, then=direction)
+        elif self._search_job is None:
+            self.next_hit(direction)
+        return 'break'
+
+    def start_search(self, mode, query, ignore_case=False, then=1):
+        self.cancel_search()
+        self.hits = []
+        try:
+            pattern = compile_pattern(query, mode, ignore_case)
+        except ValueError as e:
+            self._search_key = None
+            self.render()
+            self.info.config(text=str(e))
+            self.bell()
+            return
+        self._search_key = (mode, query, ignore_case)
+        self.hit_length = pattern.length
+        # one chunk per event-loop turn so the window stays responsive
+        steps = iter_search(self.data, pattern)
+        self._search_job = self.after(1, self._search_step, steps, then)
+
+    def _search_step(self, steps, then):
+        hits = next(steps, None)
+        if hits is not None and len(self.hits) < MAX_HITS:
+            self.hits.extend(hits[:MAX_HITS - len(self.hits)])
+            self.info.config(text=f'Searching... {len(self.hits)} matches')
+            self._search_job = self.after(1, self._search_step, steps, then)
+            return
+        self._search_job = None
+        if self.hits:
+            self.next_hit(then, first=True)
+        else:
+            self.render()
+            self.info.config(text='No matches')
+
+    def cancel_search(self):
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+            self._search_job = None
+        self._search_key = None
+
+    def next_hit(self, direction=1, first=False):
+        # the next hit after the current one (or at/after the cursor for a
+        # new search), wrapping around the file
+        if not self.hits:
+            self.bell()
+            return
+        pos = self.anchor if self.anchor is not None else self.cursor
+        if direction > 0:
+            i = (bisect_left if first else bisect_right)(self.hits, pos)
+            h = self.hits[i % len(self.hits)]
+        else:
+            h = self.hits[bisect_left(self.hits, pos) - 1]
+        self.goto(h, h + self.hit_length)
+
+    def move(self, n, extend=False):
+        if not len(self.data):
+            return 'break'
+        # moving the cursor ends the current undo step
+        self.data.seal()
+        if extend and self.anchor is None:
+            self.anchor = self.cursor
+        elif not extend:
+            self.anchor = None
+        self.cursor = max(0, min(self.cursor + n, len(self.data) - 1))
+        self.nibble = 0
+        self.see(self.cursor)
+        self.render()
+        return 'break'
+
+    def _on_wheel(self, event):
+        step = -event.delta // 120 if abs(event.delta) >= 120 else (-1 if event.delta > 0 else 1)
+        return self._scroll_lines(3 * step)
+
+    def _hit(self, event):
+        index = self.text.index(f'@{event.x},{event.y}')
+        line, col = map(int, index.split('.'))
+        base = (self.top + line - 1) * WIDTH
+        if col >= ASCII_COL - 1:
+            area, i, nib = 'ascii', col - ASCII_COL, 0
+        elif col >= HEX_COL:
+            area, i, nib = 'hex', (col - HEX_COL) // 3, min((col - HEX_COL) % 3, 1)
+        else:
+            area, i, nib = self.area, 0, 0
+        i = max(0, min(i, WIDTH - 1))
+        return area, max(0, min(base + i, len(self.data) - 1)), nib
+
+    def _on_click(self, event, extend=False):
+        self.text.focus_set()
+        if not len(self.data):
+            return 'break'
+        area, offset, nib = self._hit(event)
+        self.data.seal()
+        if extend:
+            if self.anchor is None:
+                self.anchor = self.cursor
+        else:
+            self.anchor = offset
+        self.area, self.cursor, self.nibble = area, offset, nib
+        self.render()
+        return 'break'
+
+    def _on_drag(self, event):
+        if not len(self.data):
+            return 'break'
+        if event.y < 0:
+            self.top = self._clamp(self.top - 1)
+        elif event.y > self.text.winfo_height():
+            self.top = self._clamp(self.top + 1)
+        _, offset, _ = self._hit(event)
+        if self.anchor is None:
+            self.anchor = self.cursor
+        self.cursor, self.nibble = offset, 0
+        self.render()
+        return 'break'
+
+    def _on_key(self, event):
+        shift = bool(event.state & 0x1)
+        ctrl = bool(event.state & 0x4)
+        k = event.keysym
+        lines = self.visible_lines()
+        moves = {'Left': -1, 'Right': 1, 'Up': -WIDTH, 'Down': WIDTH,
+                 'Prior': -WIDTH * lines, 'Next': WIDTH * lines}
+        if k in moves:
+            return self.move(moves[k], shift)
+        if k == 'Home':
+            return self.move(-self.cursor if ctrl else -(self.cursor % WIDTH), shift)
+        if k == 'End':
+            return self.move(len(self.data) if ctrl else WIDTH - 1 - self.cursor % WIDTH, shift)
+        if k == 'Tab':
+            self.area = 'ascii' if self.area == 'hex' else 'hex'
+            self.nibble = 0
+            self.render()
+            return 'break'
+        if ctrl and k.lower() == 'z':
+            return self.undo(redo=shift)
+        if ctrl and k.lower() == 'y':
+            return self.undo(redo=True)
+        if ctrl and k.lower() == 'c':
+            self.copy_selection()
+            return 'break'
+        if k == 'F3':
+            self.find(-1 if shift else 1)
+            return 'break'
+        if ctrl and k.lower() == 'f':
+            self.find_entry.focus_set()
+            self.find_entry.select_range(0, tk.END)
+            return 'break'
+        if ctrl and k.lower() == 'g':
+            self.goto_entry.focus_set()
+            self.goto_entry.select_range(0, tk.END)
+            return 'break'
+        if ctrl or not event.char or not len(self.data):
+            return 'break'
+        ch = event.char
+        if self.area == 'hex' and ch in '0123456789abcdefABCDEF':
+            v = int(ch, 16)
+            b = self.data[self.cursor]
+            b = (v << 4) | (b & 0x0F) if self.nibble == 0 else (b & 0xF0) | v
+            off = self.cursor
+            if self.nibble == 0:
+                self.nibble = 1
+            else:
+                self.nibble = 0
+                self.cursor = min(self.cursor + 1, len(self.data) - 1)
+            self.anchor = None
+            self.write(off, b)
+        elif self.area == 'ascii' and 32 <= ord(ch) <= 126:
+            off = self.cursor
+            self.cursor = min(self.cursor + 1, len(self.data) - 1)
+            self.anchor = None
+            self.write(off, ord(ch))
+        else:
+            return 'break'
+        top = self.top
+        self.see(self.cursor)
+        if self.top != top:
+            self.render()
+        else:
+            self._decorate()
+        return 'break'
+
+    def copy_selection(self):
+        sel = self.selection() or (self.cursor, self.cursor + 1)
+        chunk = bytes(self.data[sel[0]:sel[1]])
+        if self.area == 'ascii':
+            text = ''.join(chr(b) if 32 <= b <= 126 else '.' for b in chunk)
+        else:
+            text = ' '.join(f'{b:02X}' for b in chunk)
+        self.clipboard_clear()
+        self.clipboard_append(text)